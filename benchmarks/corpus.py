@@ -0,0 +1,109 @@
+"""
+Generate a synthetic HW-FRENCH corpus, in the on-disk layout the readers expect, to benchmark the project without the patients' data.
+
+Usage:
+    python -m benchmarks.corpus PARENT_DIR [--participants N] [--seed S]
+"""
+from pathlib import Path
+import argparse
+import numpy as np
+
+
+PATHOLOGIES = ['None', 'Parkinson', 'Alzheimer']
+
+MALFORMED_LINES = ['', 'Time X Y', '0 12 x4 0 0 0', 'Pen up', '12\t340\t']
+
+
+def _write_task_file(path, preamble, header, rng, n_rows, malformed_rate):
+    """
+    Write a task file of random, but plausible, handwriting samples.
+
+    Args:
+        path (pathlib.Path): The task file.
+        preamble (list[str]): The lines written before the header, e.g. the participant's info.
+        header (list[str]): The names of the columns of the samples.
+        rng (numpy.random.Generator): The random generator.
+        n_rows (int): The number of samples.
+        malformed_rate (float): The probability of a malformed line being written after every sample.
+    """
+    time = np.cumsum(rng.choice([7, 8, 8, 8, 15], size=n_rows))
+    x = np.clip(2500 + np.cumsum(rng.integers(-40, 41, size=n_rows)), 0, 5000)
+    y = np.clip(2500 + np.cumsum(rng.integers(-40, 41, size=n_rows)), 0, 5000)
+    p = rng.integers(0, 1024, size=n_rows)
+    az = rng.integers(0, 3600, size=n_rows)
+    al = rng.integers(0, 900, size=n_rows)
+
+    samples = np.column_stack([time, x, y, p, az, al])[:, :len(header)]
+    lines = ['\t'.join(map(str, row)) for row in samples.tolist()]
+
+    for position in np.flatnonzero(rng.random(n_rows) < malformed_rate)[::-1]:
+        lines.insert(position + 1, MALFORMED_LINES[rng.integers(len(MALFORMED_LINES))])
+
+    f = open(path, 'w', encoding='ISO-8859-1')
+    f.write('\n'.join(preamble + ['\t'.join(header)] + lines) + '\n')
+    f.close()
+
+
+def generate_corpus(parent_dir, n_participants=10, french_dir_name='HW-FRENCH', info_filename='Info.txt',
+    french_tasks=["Test1.txt", "Test2.txt", "Test3.txt", "Test4.txt", "Test5.txt", "Test6.txt", "Test7.txt"],
+    data_header=['Time', 'X', 'Y', 'P', 'Az', 'Al'],
+    min_rows=200, max_rows=2000, missing_task_rate=0.05, malformed_rate=0.002, seed=0):
+    """
+    Generate a synthetic HW-FRENCH corpus, with a directory per participant holding its info file and a session subdirectory of task files.
+
+    The corpus is deterministic for a given seed, and participant i is the same whatever n_participants, so corpora of different sizes share their first participants.
+
+    Args:
+        parent_dir (str or pathlib.Path): The parent directory of the corpus, the french directory is created inside it.
+        n_participants (int): The number of participants, from a few to tens of thousands.
+        french_dir_name (str): The french data directory name, defaults to 'HW-FRENCH'.
+        info_filename (str): The name of the info file for each participant, defaults to 'Info.txt'.
+        french_tasks (list): The ordered list of french tasks' files' names.
+        data_header (list): The ordered headers of the tasks' data, defaults to ['Time', 'X', 'Y', 'P', 'Az', 'Al'].
+        min_rows (int): The minimum number of samples per task.
+        max_rows (int): The maximum number of samples per task.
+        missing_task_rate (float): The probability of a task file being missing.
+        malformed_rate (float): The probability of a malformed line being written after every sample.
+        seed (int): The seed of the corpus.
+
+    Returns:
+        french_dir (pathlib.Path): The french data directory.
+    """
+    french_dir = Path(parent_dir) / french_dir_name
+
+    for i in range(n_participants):
+        rng = np.random.default_rng([seed, i])
+
+        participant_dir = french_dir / ('P' + str(i).zfill(5))
+        session_dir = participant_dir / 'Session1'
+        session_dir.mkdir(parents=True, exist_ok=True)
+
+        pathology = PATHOLOGIES[rng.choice(3, p=[0.45, 0.45, 0.1])]
+        info = [
+            'Pathology: ' + pathology,
+            'Dementia: ' + ('Yes' if pathology == 'Alzheimer' else 'No'),
+            'Age: ' + str(rng.integers(40, 91)),
+            'Gender: ' + ['Male', 'Female'][rng.integers(2)],
+        ]
+
+        f = open(participant_dir / info_filename, 'w', encoding='ISO-8859-1')
+        f.write('\n'.join(info) + '\n')
+        f.close()
+
+        for task_file in french_tasks:
+            if rng.random() < missing_task_rate:
+                continue
+
+            _write_task_file(session_dir / task_file, info, data_header, rng, int(rng.integers(min_rows, max_rows + 1)), malformed_rate)
+
+    return french_dir
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic HW-FRENCH corpus.')
+    parser.add_argument('parent_dir', help='The parent directory of the corpus.')
+    parser.add_argument('--participants', type=int, default=10, help='The number of participants.')
+    parser.add_argument('--seed', type=int, default=0, help='The seed of the corpus.')
+    args = parser.parse_args()
+
+    print('Generated', generate_corpus(args.parent_dir, args.participants, seed=args.seed))
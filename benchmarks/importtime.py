@@ -0,0 +1,109 @@
+"""
+Check the import time of every module against its budget.
+
+Usage:
+    python -m benchmarks.importtime [--repeat N]
+"""
+from pathlib import Path
+import argparse
+import json
+import subprocess
+import sys
+
+
+# module: (budget in seconds, heavy modules it mustn't import)
+IMPORT_BUDGETS = {
+    'dataaccess.taskparser': (0.3, ['pandas', 'sklearn', 'tensorflow']),
+    'monitoring.stages': (0.1, ['numpy', 'pandas', 'sklearn', 'tensorflow']),
+    'monitoring.memory': (0.1, ['numpy', 'pandas', 'sklearn', 'tensorflow']),
+    'dataaccess.asyncread': (0.1, ['numpy', 'pandas', 'sklearn', 'tensorflow']),
+    'dataaccess.recordingstore': (1.0, ['sklearn', 'tensorflow']),
+    'dataaccess.filedatareader': (1.0, ['sklearn', 'tensorflow']),
+    'dataaccess.filedatareader_v2': (1.0, ['sklearn', 'tensorflow']),
+    'dataaccess.filedatareader_v3': (1.0, ['sklearn', 'tensorflow']),
+    'datamanipulation.grouping': (1.0, ['sklearn', 'tensorflow']),
+    'datamanipulation.dtypes': (1.0, ['sklearn', 'tensorflow']),
+    'datamanipulation.bucketing': (0.3, ['pandas', 'sklearn', 'tensorflow']),
+    'datamanipulation.datageneration': (1.0, ['sklearn', 'tensorflow']),
+    'datamanipulation.extraction': (2.0, ['tensorflow']),
+    'datamanipulation.incremental': (2.0, ['tensorflow']),
+    'datamanipulation.interpolation': (2.0, ['tensorflow']),
+    'datamanipulation.resampling': (2.0, ['tensorflow']),
+    'datamanipulation.scaling': (2.0, ['tensorflow']),
+    'modeling.crossvalidation': (0.3, ['pandas', 'sklearn', 'tensorflow']),
+    'modeling.bundle': (0.3, ['pandas', 'sklearn', 'tensorflow']),
+    'modeling.preprocessing': (2.0, ['tensorflow']),
+    'modeling.serving': (0.3, ['pandas', 'sklearn', 'tensorflow']),
+}
+
+HEAVY_MODULES = ['numpy', 'pandas', 'sklearn', 'scipy', 'tensorflow']
+
+_MEASURE = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+
+def measure_import(module, repeat=3):
+    """
+    Measure the import time of a module, each time in a fresh interpreter.
+
+    Args:
+        module (str): The dotted name of the module.
+        repeat (int): The number of measures, the fastest one is kept.
+
+    Returns:
+        elapsed (float): The fastest import time, in seconds.
+        loaded (list[str]): The heavy modules that were imported along with the module.
+    """
+    root = Path(__file__).resolve().parent.parent
+    code = _MEASURE.format(module=module, heavy=HEAVY_MODULES)
+
+    results = list()
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    return min(result['elapsed'] for result in results), results[0]['loaded']
+
+
+def check_budgets(budgets=IMPORT_BUDGETS, repeat=3):
+    """
+    Measure every module of budgets and compare it to its budget.
+
+    Args:
+        budgets (dict): A dictionary mapping module names to their (budget in seconds, forbidden modules).
+        repeat (int): The number of measures per module.
+
+    Returns:
+        failures (list[str]): A description of every exceeded budget, empty if all the budgets hold.
+    """
+    failures = list()
+
+    for module, (budget, forbidden) in budgets.items():
+        elapsed, loaded = measure_import(module, repeat)
+        forbidden_loaded = [m for m in loaded if m in forbidden]
+
+        print('{:<36} {:>7.3f}s / {:.1f}s  {}'.format(module, elapsed, budget, ', '.join(loaded)))
+
+        if elapsed > budget:
+            failures.append(module + ' took ' + '{:.3f}'.format(elapsed) + 's to import, the budget is ' + str(budget) + 's.')
+        if forbidden_loaded:
+            failures.append(module + ' imported ' + str(forbidden_loaded) + '.')
+
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check the import time of every module against its budget.')
+    parser.add_argument('--repeat', type=int, default=3, help='The number of measures per module.')
+    args = parser.parse_args()
+
+    failures = check_budgets(repeat=args.repeat)
+    for failure in failures:
+        print(failure)
+
+    sys.exit(1 if failures else 0)
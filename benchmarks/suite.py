@@ -0,0 +1,204 @@
+"""
+Benchmark the hot paths of the project on a synthetic corpus, and compare them against a stored baseline.
+
+Usage:
+    python -m benchmarks.suite [--participants N] [--repeat R] [--corpus-dir DIR] [--baseline FILE] [--save-baseline] [--tolerance T]
+"""
+from pathlib import Path
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baseline.json'
+
+# the order the benchmarks run in, each one is fed with the outputs of the previous ones
+BENCHMARKS = ['load_french', 'load_ml_pd_data', 'extract_features', 'standardization', 'get_samples', 'padding', 'Interpolator']
+
+
+def measure(func, repeat=3):
+    """
+    Measure the wall time and the peak memory of a function.
+
+    The time is measured without tracing the allocations, which would slow the function down, and the peak memory in one extra traced run.
+
+    Args:
+        func (function): The function to measure, called without arguments, and silenced.
+        repeat (int): The number of timed runs, the fastest one is kept.
+
+    Returns:
+        result (object): What func returned.
+        measures (dict): The 'seconds' of the fastest run, and the 'peak_mb' allocated by the traced run.
+    """
+    times = list()
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result, {'seconds': min(times), 'peak_mb': peak / 2 ** 20}
+
+
+def run_suite(corpus_dir, repeat=3, workers=1):
+    """
+    Run every benchmark of BENCHMARKS on a corpus.
+
+    Args:
+        corpus_dir (str or pathlib.Path): The parent directory of the HW-FRENCH corpus, e.g. as generated by benchmarks.corpus.generate_corpus.
+        repeat (int): The number of timed runs of every benchmark.
+        workers (int): The number of processes the readers parse the files with.
+
+    Returns:
+        results (dict): A dictionary mapping every benchmark to its measures, see measure.
+    """
+    from dataaccess.filedatareader import FileDataReader
+    from dataaccess.filedatareader_v3 import FileDataReader as FileDataReaderV3
+    from datamanipulation.datageneration import get_pd_hc_only, get_samples
+    from datamanipulation.extraction import extract_features
+    from datamanipulation.interpolation import Interpolator
+    from datamanipulation.scaling import StreamingStandardScaler
+
+    def pad(X):
+        padded = np.zeros((len(X), max(x.shape[0] for x in X), X[0].shape[1]), dtype=np.float32)
+        for i, x in enumerate(X):
+            padded[i, :x.shape[0]] = x
+        return padded
+
+    results = dict()
+    outputs = dict()
+
+    outputs['load_french'], results['load_french'] = measure(lambda: FileDataReader(corpus_dir).load_french(workers=workers), repeat)
+    _, results['load_ml_pd_data'] = measure(lambda: FileDataReaderV3(corpus_dir).load_ml_pd_data({'fr': list(range(7))}, workers=workers), repeat)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        info, data = get_pd_hc_only(*outputs['load_french'])
+
+    extracted, results['extract_features'] = measure(lambda: extract_features(data), repeat)
+    standardized, results['standardization'] = measure(lambda: StreamingStandardScaler(copy=True).fit(extracted).transform(extracted), repeat)
+    (X, y), results['get_samples'] = measure(lambda: get_samples(standardized, 'PD'), repeat)
+    _, results['padding'] = measure(lambda: pad(X), repeat)
+    _, results['Interpolator'] = measure(lambda: Interpolator('PD').fit(standardized).transform(standardized), repeat)
+
+    for name in BENCHMARKS:
+        results[name] = {key: round(value, 6) for key, value in results[name].items()}
+
+    return results
+
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    Compare benchmark results against a baseline.
+
+    Args:
+        results (dict): The measures of every benchmark, see run_suite.
+        baseline (dict): The baseline, as saved by save_baseline.
+        tolerance (float): The relative slowdown or memory growth above which a benchmark is reported as a regression.
+
+    Returns:
+        regressions (list[str]): A description of every regression, empty if there is none.
+    """
+    regressions = list()
+
+    for name, measures in results.items():
+        if name not in baseline['results']:
+            continue
+
+        for key, value in measures.items():
+            reference = baseline['results'][name][key]
+            ratio = value / reference if reference else 1.0
+
+            print('{:<18} {:<8} {:>10.4f} {:>10.4f}  x{:.2f}'.format(name, key, value, reference, ratio))
+
+            if ratio > 1 + tolerance:
+                regressions.append(name + ' ' + key + ' went from ' + str(reference) + ' to ' + str(value) + '.')
+
+    return regressions
+
+
+def save_baseline(results, path, corpus_settings):
+    """
+    Save benchmark results as the baseline, along with the corpus and the machine they were measured on.
+
+    Args:
+        results (dict): The measures of every benchmark, see run_suite.
+        path (str or pathlib.Path): The baseline file.
+        corpus_settings (dict): The settings the corpus was generated with.
+    """
+    baseline = {
+        'corpus': corpus_settings,
+        'machine': {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(), 'processor': platform.machine()},
+        'results': results,
+    }
+
+    f = open(path, 'w')
+    json.dump(baseline, f, indent=2)
+    f.write('\n')
+    f.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the hot paths of the project on a synthetic corpus.')
+    parser.add_argument('--participants', type=int, default=40, help='The number of participants of the generated corpus.')
+    parser.add_argument('--seed', type=int, default=0, help='The seed of the generated corpus.')
+    parser.add_argument('--corpus-dir', default=None, help='An existing corpus to benchmark instead of generating one.')
+    parser.add_argument('--repeat', type=int, default=3, help='The number of timed runs of every benchmark.')
+    parser.add_argument('--workers', type=int, default=1, help='The number of processes the readers parse the files with.')
+    parser.add_argument('--baseline', default=str(BASELINE_PATH), help='The baseline file.')
+    parser.add_argument('--save-baseline', action='store_true', help='Save the results as the new baseline instead of comparing them.')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='The relative slowdown above which a benchmark is a regression.')
+    args = parser.parse_args()
+
+    from benchmarks.corpus import generate_corpus
+
+    corpus_settings = {'participants': args.participants, 'seed': args.seed}
+
+    tmp_dir = None
+    corpus_dir = args.corpus_dir
+    if corpus_dir is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        corpus_dir = tmp_dir.name
+        generate_corpus(corpus_dir, args.participants, seed=args.seed)
+    else:
+        corpus_settings = {'corpus_dir': str(Path(corpus_dir).absolute())}
+
+    results = run_suite(corpus_dir, repeat=args.repeat, workers=args.workers)
+
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline, corpus_settings)
+        print('Saved the baseline to', args.baseline)
+        sys.exit(0)
+
+    if not Path(args.baseline).exists():
+        print(json.dumps(results, indent=2))
+        print('There is no baseline at', args.baseline, 'run with --save-baseline to create it.')
+        sys.exit(0)
+
+    f = open(args.baseline, 'r')
+    baseline = json.load(f)
+    f.close()
+
+    if baseline['corpus'] != corpus_settings:
+        print('The baseline was measured on another corpus', baseline['corpus'], 'the comparison may not be meaningful.')
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(regression)
+
+    sys.exit(1 if regressions else 0)
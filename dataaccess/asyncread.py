@@ -0,0 +1,101 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _read_bytes(path):
+    # like the sync reader, a file that can't be read is skipped, whether it is missing, a directory, or unreadable
+    try:
+        f = open(path, 'rb')
+    except OSError:
+        return None
+
+    try:
+        data = f.read()
+    except OSError:
+        data = None
+    f.close()
+
+    return data
+
+
+class BoundedIO:
+    """
+    Blocking file operations run in threads from a coroutine, with at most max_in_flight of them pending at once, so that the latency of every open and read on a slow storage, e.g. an NFS share, overlaps with the others.
+
+    Attributes:
+        max_in_flight (int): The maximum number of pending operations.
+    """
+
+
+    def __init__(self, max_in_flight, executor):
+        """
+        Initializes a new BoundedIO, which must be created in the event loop it is used from.
+
+        Args:
+            max_in_flight (int): The maximum number of pending operations.
+            executor (concurrent.futures.ThreadPoolExecutor): The threads the operations run in, with at least max_in_flight workers.
+        """
+        self.max_in_flight = max_in_flight
+        self._executor = executor
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+
+    async def call(self, func, *args):
+        """
+        Run a blocking function in a thread, e.g. a directory listing.
+
+        Args:
+            func (function): The function.
+            *args: The arguments of the function.
+
+        Returns:
+            result (object): What func returned.
+        """
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+
+    async def read(self, path):
+        """
+        Read the raw bytes of a file.
+
+        Args:
+            path (pathlib.Path): The file.
+
+        Returns:
+            data (bytes): The content of the file, None if it can't be read, e.g. it doesn't exist.
+        """
+        return await self.call(_read_bytes, path)
+
+
+def map_participants_async(func, items, max_in_flight=16):
+    """
+    Apply a coroutine function to every participant concurrently, its file operations being bounded by a BoundedIO.
+
+    The results are returned in the order of items, like map_participants. When called from a running event loop, e.g. in a notebook, the participants are processed in a loop of their own in another thread.
+
+    Args:
+        func (function): A coroutine function taking a BoundedIO and a single item, e.g. a functools.partial of a reader method.
+        items (list): The items to process, e.g. the participants' directories.
+        max_in_flight (int): The maximum number of file operations pending at once.
+
+    Returns:
+        results (list): The results of func for each item, in the order of items.
+    """
+    assert max_in_flight >= 1, "The number of operations in flight should be a positive integer."
+
+    async def gather(executor):
+        io = BoundedIO(max_in_flight, executor)
+        return await asyncio.gather(*[func(io, item) for item in items])
+
+    def run():
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            return list(asyncio.run(gather(executor)))
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return run()
+
+    with ThreadPoolExecutor(max_workers=1) as runner:
+        return runner.submit(run).result()
@@ -0,0 +1,399 @@
+from pathlib import Path
+import json
+import os
+from .taskparser import find_data_start, parse_samples, count_samples
+
+
+CATALOG_FORMAT_VERSION = 1
+
+
+class CorpusCatalog:
+    """
+    A persistent catalog of the task files of a corpus, so that a recording is located without walking the directories, and read without scanning for its header.
+
+    The catalog is saved as a JSON file, and trusted once loaded: a task file is scanned again when it's read if its size or modification time changed, and a participant's directories are scanned again when one of its recordings isn't cataloged and the modification time of the directories changed since they were scanned, e.g. a task file was added. refresh rebuilds the whole catalog, scanning only the task files that are new or changed.
+
+    Every recording, keyed by (participant ID, language, task), is described by:
+        path: The task file, relative to the language directory.
+        size, mtime_ns: The fingerprint of the task file.
+        data_offset: The byte offset where the numeric data starts, after the header line, None if there is no header.
+        n_samples, n_rejected: The number of well formed and malformed data lines.
+
+    Attributes:
+        catalog_path (pathlib.Path): The JSON file of the catalog.
+        lang_paths (dict): A dictionary mapping every language to its directory.
+        tasks_file_names (dict): A dictionary mapping every language to the ordered list of its tasks' files' names.
+        info_file_name (str): The name of the info file of each participant.
+        header_reg (regex str): The regular expression used to capture the header of the data in a task file.
+        n_cols (int): The number of columns in a data line.
+        participants (dict): A dictionary mapping every participant ID to its 'lang' and 'info_path'.
+        recordings (dict): A dictionary mapping every (participant ID, language, task) to the description of its recording.
+        directories (dict): A dictionary mapping every scanned 'participant ID/language' to the name of the participant's task directory and the modification times of both directories, or to None if the participant has no directory in the language.
+        autosave (bool): Whether to save the catalog when a lookup scans a participant again, False in the copies of the catalog sent to worker processes, so that only the loader's process saves it.
+    """
+
+
+    def __init__(self, catalog_path, lang_paths, tasks_file_names, info_file_name, header_reg, n_cols):
+        """
+        Initializes a new CorpusCatalog, loading the saved catalog if it was built with the same settings.
+
+        Args:
+            catalog_path (str or pathlib.Path): The JSON file of the catalog.
+            lang_paths (dict): A dictionary mapping every language to its directory, e.g. {'fr': Path('.../HW-FRENCH')}.
+            tasks_file_names (dict): A dictionary mapping every language to the ordered list of its tasks' files' names.
+            info_file_name (str): The name of the info file of each participant.
+            header_reg (regex str): The regular expression used to capture the header of the data in a task file.
+            n_cols (int): The number of columns in a data line.
+        """
+        self.catalog_path = Path(catalog_path)
+        self.lang_paths = {lang: Path(path) for lang, path in lang_paths.items()}
+        self.tasks_file_names = tasks_file_names
+        self.info_file_name = info_file_name
+        self.header_reg = header_reg
+        self.n_cols = n_cols
+
+        self.participants = dict()
+        self.recordings = dict()
+        self.directories = dict()
+        self.autosave = True
+        self._built = False
+
+        self._load()
+
+
+    def _settings(self):
+        return {
+            'version': CATALOG_FORMAT_VERSION,
+            'lang_paths': {lang: str(path.absolute()) for lang, path in self.lang_paths.items()},
+            'tasks_file_names': self.tasks_file_names,
+            'info_file_name': self.info_file_name,
+            'header_reg': self.header_reg,
+            'n_cols': self.n_cols,
+        }
+
+
+    def _load(self):
+        try:
+            f = open(self.catalog_path, 'r', encoding='utf-8')
+            saved = json.load(f)
+            f.close()
+        except (OSError, ValueError):
+            return
+
+        if saved.get('settings') != self._settings():
+            return
+
+        self.participants = saved['participants']
+        self.recordings = {(r['ID'], r['lang'], r['task']): r for r in saved['recordings']}
+        self.directories = saved.get('directories', dict())
+        self._built = True
+
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['autosave'] = False
+
+        return state
+
+
+    def save(self):
+        """
+        Save the catalog atomically into its JSON file.
+        """
+        self.catalog_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # a name per process, since the workers of a loader may save the catalog at the same time
+        tmp_path = self.catalog_path.with_name(self.catalog_path.name + '.' + str(os.getpid()) + '.tmp')
+        f = open(tmp_path, 'w', encoding='utf-8')
+        json.dump({'settings': self._settings(), 'participants': self.participants, 'recordings': list(self.recordings.values()), 'directories': self.directories}, f)
+        f.close()
+        os.replace(tmp_path, self.catalog_path)
+
+
+    def _scan(self, participant_id, lang, task, path, stat):
+        """
+        Scan a task file for the offset of its data and its number of samples.
+
+        Args:
+            participant_id (str): The ID of the participant.
+            lang (str): The language.
+            task (int): The task number.
+            path (pathlib.Path): The task file.
+            stat (os.stat_result): The stat of the task file.
+
+        Returns:
+            recording (dict): The description of the recording.
+        """
+        # ISO-8859-1 maps every byte to a single character, and newline='' keeps the line endings, so character offsets are byte offsets
+        f = open(path, 'r', encoding='ISO-8859-1', newline='')
+        text = f.read()
+        f.close()
+
+        data_offset = find_data_start(text, self.header_reg)
+
+        n_samples, n_rejected = (0, 0) if data_offset is None else count_samples(text[data_offset:], self.n_cols)
+
+        return {
+            'ID': participant_id,
+            'lang': lang,
+            'task': task,
+            'path': str(path.relative_to(self.lang_paths[lang])),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'data_offset': data_offset,
+            'n_samples': n_samples,
+            'n_rejected': n_rejected,
+        }
+
+
+    def _scan_participant(self, lang, p_dir, participants, recordings, directories):
+        """
+        Scan the task files of a participant that are new or changed since they were cataloged.
+
+        Args:
+            lang (str): The language.
+            p_dir (pathlib.Path): The directory of the participant.
+            participants (dict): The participants, where the participant is added.
+            recordings (dict): The recordings, where the participant's recordings are added.
+            directories (dict): The scanned directories, where the participant's directories are added.
+
+        Returns:
+            n_scanned (int): The number of task files that were scanned.
+        """
+        participants.setdefault(p_dir.name, {'lang': lang, 'info_path': str(p_dir / self.info_file_name)})
+
+        mtimes = [p_dir.stat().st_mtime_ns]
+        t_dir = next((d for d in p_dir.iterdir() if d.is_dir()), None)
+        if t_dir is not None:
+            mtimes.append(t_dir.stat().st_mtime_ns)
+        directories[p_dir.name + '/' + lang] = {'task_dir': None if t_dir is None else t_dir.name, 'mtimes': mtimes}
+
+        if t_dir is None:
+            return 0
+
+        n_scanned = 0
+        for task, file_name in enumerate(self.tasks_file_names[lang]):
+            try:
+                stat = (t_dir / file_name).stat()
+            except OSError:
+                continue
+
+            key = (p_dir.name, lang, task)
+            recording = self.recordings.get(key)
+
+            if recording is None or recording['size'] != stat.st_size or recording['mtime_ns'] != stat.st_mtime_ns:
+                recording = self._scan(p_dir.name, lang, task, t_dir / file_name, stat)
+                n_scanned += 1
+
+            recordings[key] = recording
+
+        return n_scanned
+
+
+    def refresh(self, save=True):
+        """
+        Rebuild the catalog, walking the whole corpus and scanning the task files that are new or changed since they were cataloged.
+
+        Args:
+            save (bool): Whether to save the catalog afterwards, if anything changed.
+
+        Returns:
+            n_scanned (int): The number of task files that were scanned.
+        """
+        participants = dict()
+        recordings = dict()
+        directories = dict()
+        n_scanned = 0
+
+        for lang, lang_path in self.lang_paths.items():
+            if not lang_path.is_dir():
+                continue
+
+            for p_dir in lang_path.iterdir():
+                if p_dir.is_dir():
+                    n_scanned += self._scan_participant(lang, p_dir, participants, recordings, directories)
+
+        changed = n_scanned > 0 or recordings.keys() != self.recordings.keys() or participants != self.participants or directories != self.directories
+
+        self.participants = participants
+        self.recordings = recordings
+        self.directories = directories
+        self._built = True
+
+        if save and changed:
+            self.save()
+
+        return n_scanned
+
+
+    def refresh_participant(self, participant_id, save=True):
+        """
+        Catalog the directories of a participant again, in every language, e.g. when a task file was added after the catalog was built.
+
+        Args:
+            participant_id (str): The ID of the participant.
+            save (bool): Whether to save the catalog afterwards, if anything changed.
+
+        Returns:
+            n_scanned (int): The number of task files that were scanned.
+        """
+        participants = {pid: participant for pid, participant in self.participants.items() if pid != participant_id}
+        recordings = {key: recording for key, recording in self.recordings.items() if key[0] != participant_id}
+        directories = dict(self.directories)
+        n_scanned = 0
+
+        for lang, lang_path in self.lang_paths.items():
+            if (lang_path / participant_id).is_dir():
+                n_scanned += self._scan_participant(lang, lang_path / participant_id, participants, recordings, directories)
+            else:
+                directories[participant_id + '/' + lang] = None
+
+        changed = n_scanned > 0 or recordings.keys() != self.recordings.keys() or participants != self.participants or directories != self.directories
+
+        self.participants = participants
+        self.recordings = recordings
+        self.directories = directories
+
+        if save and changed:
+            self.save()
+
+        return n_scanned
+
+
+    def _unchanged(self, participant_id, lang):
+        """
+        Check whether the directories of a participant in a language are the same as when they were scanned, looking only at their modification times.
+
+        Args:
+            participant_id (str): The ID of the participant.
+            lang (str): The language.
+
+        Returns:
+            unchanged (bool): False if they were never scanned, or changed since.
+        """
+        key = participant_id + '/' + lang
+        if key not in self.directories:
+            return False
+
+        p_dir = self.lang_paths[lang] / participant_id
+        scanned = self.directories[key]
+        if scanned is None:
+            return not p_dir.is_dir()
+
+        try:
+            mtimes = [p_dir.stat().st_mtime_ns]
+            if scanned['task_dir'] is not None:
+                mtimes.append((p_dir / scanned['task_dir']).stat().st_mtime_ns)
+        except OSError:
+            return False
+
+        return mtimes == scanned['mtimes']
+
+
+    def ensure_built(self):
+        """
+        Build the catalog by walking the corpus, unless it was loaded or already built.
+        """
+        if not self._built:
+            self.refresh()
+
+
+    def participant_ids(self, lang):
+        """
+        List the participants of a language, cataloging again the directories of the ones that aren't cataloged yet or whose directories changed, without looking at the task files of the others.
+
+        Args:
+            lang (str): The language.
+
+        Returns:
+            participant_ids (list[str]): The IDs of the participants.
+        """
+        self.ensure_built()
+
+        if not self.lang_paths[lang].is_dir():
+            return list()
+
+        participant_ids = [d.name for d in self.lang_paths[lang].iterdir() if d.is_dir()]
+        for participant_id in participant_ids:
+            if participant_id not in self.participants or not self._unchanged(participant_id, lang):
+                self.refresh_participant(participant_id, save=self.autosave)
+
+        return participant_ids
+
+
+    def participant(self, participant_id):
+        """
+        Look up a participant, cataloging its directories if it isn't cataloged and they changed since they were last scanned.
+
+        Args:
+            participant_id (str): The ID of the participant.
+
+        Returns:
+            participant (dict): The 'lang' and 'info_path' of the participant, None if it doesn't exist.
+        """
+        self.ensure_built()
+
+        if participant_id not in self.participants and not all(self._unchanged(participant_id, lang) for lang in self.lang_paths):
+            self.refresh_participant(participant_id, save=self.autosave)
+
+        return self.participants.get(participant_id)
+
+
+    def get(self, participant_id, lang, task):
+        """
+        Look up a recording, cataloging the directories of its participant again if it isn't cataloged and they changed since they were last scanned, e.g. because it was added after the catalog was built.
+
+        Args:
+            participant_id (str): The ID of the participant.
+            lang (str): The language.
+            task (int): The task number from (0, n - 1) where n the number of tasks for the language.
+
+        Returns:
+            recording (dict): The description of the recording, None if it doesn't exist.
+        """
+        self.ensure_built()
+
+        key = (participant_id, lang, task)
+        if key not in self.recordings and not self._unchanged(participant_id, lang):
+            self.refresh_participant(participant_id, save=self.autosave)
+
+        return self.recordings.get(key)
+
+
+    def read(self, participant_id, lang, task):
+        """
+        Read a recording, seeking directly to its numeric data.
+
+        If the task file changed since it was cataloged, it is scanned again first. The number of samples of the catalog is the size of the array the samples are decoded into.
+
+        Args:
+            participant_id (str): The ID of the participant.
+            lang (str): The language.
+            task (int): The task number from (0, n - 1) where n the number of tasks for the language.
+
+        Returns:
+            hw_data (numpy.ndarray): An int32 array of shape (n_samples, n_cols).
+            n_rejected (int): The number of malformed lines that were ignored.
+            n_bytes (int): The size of the task file.
+        """
+        recording = self.get(participant_id, lang, task)
+        assert recording is not None, "There is no recording of task " + str(task) + " in " + str(lang) + " for " + str(participant_id) + "."
+
+        path = self.lang_paths[lang] / recording['path']
+        stat = path.stat()
+
+        if recording['size'] != stat.st_size or recording['mtime_ns'] != stat.st_mtime_ns:
+            recording = self._scan(participant_id, lang, task, path, stat)
+            self.recordings[(participant_id, lang, task)] = recording
+
+        if recording['data_offset'] is None:
+            return parse_samples('', self.n_cols)[0], 0, recording['size']
+
+        f = open(path, 'rb')
+        f.seek(recording['data_offset'])
+        body = f.read().decode('ISO-8859-1')
+        f.close()
+
+        hw_data, n_rejected = parse_samples(body, self.n_cols, n_samples=recording['n_samples'] if recording['n_rejected'] == 0 else None)
+
+        return hw_data, n_rejected, recording['size']
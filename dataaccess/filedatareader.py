@@ -1,7 +1,22 @@
+import logging
 from pathlib import Path
+from functools import partial
+import asyncio
+import io
 import pandas as pd
 import re
 import numpy as np
+from .taskparser import read_task_file, parse_task_text, build_projection, projected_header
+from .loadcache import LoadCache
+from .parallel import map_participants
+from .asyncread import map_participants_async
+from datamanipulation.helpers import is_parkinsonian
+from datamanipulation.dtypes import get_policy
+from monitoring.stages import stage
+
+
+logger = logging.getLogger('pd_classification')
+
 
 class FileDataReader:
     """
@@ -16,7 +31,8 @@ class FileDataReader:
     def __init__(self, parent_dir, french_dir_name="HW-FRENCH", info_filename="Info.txt",
     french_tasks=["Test1.txt", "Test2.txt", "Test3.txt", "Test4.txt", "Test5.txt", "Test6.txt", "Test7.txt"],
     data_header=['Time', 'X', 'Y', 'P', 'Az', 'Al'],
-    header_reg=r'^[ \t]*Time[ \t]+X'):
+    header_reg=r'^[ \t]*Time[ \t]+X',
+    cache_dir=None):
         """
         Initializes a new FileDataReader.
 
@@ -27,6 +43,7 @@ class FileDataReader:
             french_tasks (list): The ordered list of french tasks' files' names, defaults to ['Test1.txt', 'Test2.txt', 'Test3.txt', 'Test4.txt', 'Test5.txt', 'Test6.txt', 'Test7.txt'].
             data_header (list): The ordered headers of the tasks' data, defaults to ['Time', 'X', 'Y', 'P', 'Az', 'Al'].
             header_reg (regex str): The regular expression used to capture the header of the data in a task file, defaults to r'.*[tT]ime.*[xX].*[yY].*[pP].*[aA]z.*[aA]l.*'.
+            cache_dir (str): A directory where the parsed data is cached between loads, by default nothing is cached.
         """
         self.parent_dir = Path(parent_dir)
         self.french_dir = self.parent_dir / french_dir_name
@@ -34,6 +51,7 @@ class FileDataReader:
         self.french_tasks = french_tasks
         self.data_header = data_header
         self.header_reg = header_reg
+        self.cache_dir = cache_dir
 
 
     def _fetch_info(self, patient_dir):
@@ -48,78 +66,217 @@ class FileDataReader:
         """
         infofile_path = patient_dir / self.info_filename
         f = open(infofile_path, "r", encoding='ISO-8859-1')
-        
+        text = f.read()
+        f.close()
+
+        return self._parse_info(text)
+
+
+    def _parse_info(self, text):
+        """
+        Maps the key/value lines of the content of an info file into a dictionary.
+
+        Args:
+            text (str): The content of the info file.
+
+        Returns:
+            patient_info (dict): A dictionary of the patient's data.
+        """
         patient_info = dict()
 
-        for line in f.readlines():
+        for line in io.StringIO(text, newline=None).readlines():
             line = re.sub(':[ ]*', ':', line.strip())
             keyvalue = line.split(':')
             patient_info[keyvalue[0]] = ": ".join(keyvalue[1:])
-        
-        f.close()
 
         return patient_info
 
     
-    def _fetch_data(self, patient_info, patient_dir, tasks):
+    def _find_tasks_dir(self, patient_dir):
         """
-        Gather tasks data for a participant into a array.
+        Find the directory containing the task files of a participant.
+
+        Args:
+            patient_dir (pathlib.Path): Path of the files of the patient.
+
+        Returns:
+            tasks_dir (pathlib.Path): The first subdirectory of patient_dir, None if there is none.
+        """
+        for d in patient_dir.iterdir():
+            if d.is_dir():
+                return d
+
+        return None
+
+
+    def _fingerprint(self, patient_dir, tasks):
+        """
+        Fingerprint the files a participant's data is parsed from, to detect changes on disk.
 
         Args:
-            patient_info (dict): Patient's information.
             patient_dir (pathlib.Path): Path of the files of the patient.
             tasks (list): An array of the numbers of tasks.
 
         Returns:
-            tasks_data (pandas): A dictionary of the tasks data of the participant.
+            fingerprint (list): A list of [file name, size, modification time in ns] for every existing file.
         """
-        indexes = np.array(tasks) - 1
+        paths = [patient_dir / self.info_filename]
 
-        tasks_dir = None
-        for d in patient_dir.iterdir():
-            if not d.is_dir():
+        tasks_dir = self._find_tasks_dir(patient_dir)
+        if tasks_dir:
+            paths += [tasks_dir / self.french_tasks[i - 1] for i in sorted(set(tasks))]
+
+        fingerprint = list()
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:
                 continue
-            tasks_dir = d
-            break
+            fingerprint.append([str(path.relative_to(patient_dir)), stat.st_size, stat.st_mtime_ns])
+
+        return fingerprint
+
+
+    def _iter_task_data(self, patient_dir, tasks, projection={}):
+        """
+        Read the tasks data of a participant, one task file at a time, skipping the task files that are missing or can't be read.
+
+        Args:
+            patient_dir (pathlib.Path): Path of the files of the patient.
+            tasks (list): An array of the numbers of tasks.
+            projection (dict): The projection of the data, see taskparser.build_projection.
+
+        Yields:
+            task (int): The number of the task.
+            hw_data (numpy.ndarray): An int32 array of the samples of the task, with a column per projected data header.
+            n_rejected (int): The number of malformed lines that were ignored.
+            n_bytes (int): The size of the task file.
+        """
+        tasks_dir = self._find_tasks_dir(patient_dir)
         if not tasks_dir:
-            return list()
+            return
 
-        tasks_data = list()
-        for i in indexes:
+        for i in np.array(tasks) - 1:
             task_file_path = tasks_dir / self.french_tasks[i]
 
-            if not task_file_path.exists():
+            try:
+                hw_data, n_rejected = read_task_file(task_file_path, self.header_reg, len(self.data_header), **projection)
+                n_bytes = task_file_path.stat().st_size
+            except OSError:
                 continue
 
-            f = open(task_file_path, "r", encoding='ISO-8859-1')
-            lines = f.readlines()
-            reg_match = None
+            yield int(i + 1), hw_data, n_rejected, n_bytes
 
-            for line in lines:
-                line = re.sub(r"[ \t]+", " ", line).strip()
-                
-                if not reg_match:
-                    reg_match = re.match(self.header_reg, line)
-                    continue
-                
-                try:
-                    line_data = np.array(line.split(" ")).astype(np.int32).tolist()
-                except:
-                    print("Problem in line:",  line)
-                    print("Ignored the line because it couldn't be converted into a float.")
-                    continue
-                
-                data = dict()
-                for header, value in zip(self.data_header, line_data):
-                    data[header] = value
-                data["ID"] = patient_info['ID']
-                data["Task"] = i+1
 
-                tasks_data.append(data)
+    def _fetch_data(self, patient_dir, tasks, projection={}):
+        """
+        Gather tasks data for a participant into a single block.
+
+        Args:
+            patient_dir (pathlib.Path): Path of the files of the patient.
+            tasks (list): An array of the numbers of tasks.
+            projection (dict): The projection of the data, see taskparser.build_projection.
+
+        Returns:
+            hw_data (numpy.ndarray): An int32 array of the samples of all the tasks, with a column per projected data header.
+            task_col (numpy.ndarray): The task number of each row of hw_data.
+            n_rejected (int): The number of malformed lines that were ignored.
+            n_files (int): The number of task files that were read.
+            n_bytes (int): The size of the task files that were read.
+        """
+        blocks = list()
+        task_cols = list()
+        n_rejected = 0
+        n_bytes = 0
+        for task, hw_data, task_rejected, task_bytes in self._iter_task_data(patient_dir, tasks, projection):
+            n_rejected += task_rejected
+            n_bytes += task_bytes
+
+            blocks.append(hw_data)
+            task_cols.append(np.full(hw_data.shape[0], task, dtype=np.int64))
+
+        if not blocks:
+            return np.empty((0, len(projected_header(self.data_header, projection))), dtype=np.int32), np.empty(0, dtype=np.int64), n_rejected, 0, n_bytes
+
+        return np.concatenate(blocks), np.concatenate(task_cols), n_rejected, len(blocks), n_bytes
+
+
+    def _fetch_participant(self, patient_dir, tasks, info_only=False, projection={}):
+        """
+        Gather the info, and unless info_only is set the tasks data, of a participant.
+
+        Args:
+            patient_dir (pathlib.Path): Path of the files of the patient.
+            tasks (list): An array of the numbers of tasks.
+            info_only (bool): Set to True to skip the tasks data.
+            projection (dict): The projection of the data, see taskparser.build_projection.
+
+        Returns:
+            participant (dict): A dictionary with the keys 'ID', 'info', 'n_rejected', 'n_files' and 'n_bytes', plus 'hw_data' and 'task_col' unless info_only is set.
+        """
+        participant_info = self._fetch_info(patient_dir)
+        participant_info["ID"] = str(patient_dir.absolute()).split("/")[-1]
+
+        participant = {'ID': participant_info["ID"], 'info': participant_info, 'n_rejected': 0, 'n_files': 0, 'n_bytes': 0}
+
+        if not info_only:
+            participant['hw_data'], participant['task_col'], participant['n_rejected'], participant['n_files'], participant['n_bytes'] = self._fetch_data(patient_dir, tasks, projection)
+
+        return participant
+
+
+    async def _fetch_participant_async(self, bounded_io, patient_dir, tasks, info_only=False, projection={}):
+        """
+        Gather the info, and unless info_only is set the tasks data, of a participant, like _fetch_participant, but with every file read concurrently, and parsed as soon as its bytes arrive.
+
+        Args:
+            bounded_io (BoundedIO): The bounded file operations.
+            patient_dir (pathlib.Path): Path of the files of the patient.
+            tasks (list): An array of the numbers of tasks.
+            info_only (bool): Set to True to skip the tasks data.
+            projection (dict): The projection of the data, see taskparser.build_projection.
+
+        Returns:
+            participant (dict): A dictionary with the keys 'ID', 'info', 'n_rejected', 'n_files' and 'n_bytes', plus 'hw_data' and 'task_col' unless info_only is set.
+        """
+        async def fetch_info():
+            # an info file that can't be read raises like in _fetch_participant
+            return await bounded_io.call(self._fetch_info, patient_dir)
+
+        async def fetch_task(tasks_dir, task):
+            raw = await bounded_io.read(tasks_dir / self.french_tasks[task - 1])
+            if raw is None:
+                return None
+
+            hw_data, n_rejected = parse_task_text(raw.decode('ISO-8859-1'), self.header_reg, len(self.data_header), **projection)
+
+            return task, hw_data, n_rejected, len(raw)
+
+        async def fetch_tasks():
+            tasks_dir = await bounded_io.call(self._find_tasks_dir, patient_dir)
+            if not tasks_dir:
+                return list()
+            return await asyncio.gather(*[fetch_task(tasks_dir, int(task)) for task in tasks])
+
+        if info_only:
+            participant_info, task_results = await fetch_info(), list()
+        else:
+            participant_info, task_results = await asyncio.gather(fetch_info(), fetch_tasks())
+        participant_info["ID"] = str(patient_dir.absolute()).split("/")[-1]
+
+        participant = {'ID': participant_info["ID"], 'info': participant_info, 'n_rejected': 0, 'n_files': 0, 'n_bytes': 0}
+
+        if not info_only:
+            task_results = [result for result in task_results if result is not None]
+            header = projected_header(self.data_header, projection)
 
-            f.close()
+            participant['hw_data'] = np.concatenate([hw_data for _, hw_data, _, _ in task_results]) if task_results else np.empty((0, len(header)), dtype=np.int32)
+            participant['task_col'] = np.concatenate([np.full(hw_data.shape[0], task, dtype=np.int64) for task, hw_data, _, _ in task_results]) if task_results else np.empty(0, dtype=np.int64)
+            participant['n_rejected'] = sum(n_rejected for _, _, n_rejected, _ in task_results)
+            participant['n_files'] = len(task_results)
+            participant['n_bytes'] = sum(n_bytes for _, _, _, n_bytes in task_results)
 
-        return tasks_data
+        return participant
 
 
     def _postprocess_info_dataframe(self, info):
@@ -138,6 +295,57 @@ class FileDataReader:
         return info
 
 
+    def _build_tasks_dataframe(self, participants, header, policy):
+        """
+        Merge the per participant blocks into a single tasks dataframe.
+
+        Args:
+            participants (list[dict]): The participants, each a dictionary with the keys 'ID', 'hw_data' and 'task_col'.
+            header (list[str]): The names of the columns of hw_data.
+            policy (DtypePolicy): The dtypes of the columns.
+
+        Returns:
+            data (pandas.core.frame.DataFrame): A DataFrame with a column per header, plus 'ID', 'Language' and 'Task'.
+        """
+        counts = [p['hw_data'].shape[0] for p in participants]
+
+        hw_data = np.concatenate([p['hw_data'] for p in participants]) if participants else np.empty((0, len(header)), dtype=np.int32)
+        task_col = np.concatenate([p['task_col'] for p in participants]) if participants else np.empty(0, dtype=np.int64)
+
+        data = policy.raw_dataframe(hw_data, header)
+        data['ID'] = policy.repeated_column([p['ID'] for p in participants], counts)
+        data['Language'] = policy.repeated_column(['French'], [hw_data.shape[0]])
+        data['Task'] = pd.Categorical(task_col) if policy.categorical else task_col
+
+        return data
+
+
+    def _cache_settings(self, tasks, projection={}):
+        """
+        Gather the settings the loaded data depends on, used to key the cache.
+
+        Args:
+            tasks (list): An array of the numbers of tasks.
+            projection (dict): The projection of the data, see taskparser.build_projection.
+
+        Returns:
+            settings (dict): A JSON serializable dictionary of the settings.
+        """
+        settings = {
+            'french_dir': str(self.french_dir.absolute()),
+            'tasks': [int(task) for task in tasks],
+            'info_filename': self.info_filename,
+            'french_tasks': list(self.french_tasks),
+            'data_header': list(self.data_header),
+            'header_reg': self.header_reg,
+        }
+
+        if projection:
+            settings['projection'] = {key: (list(value) if isinstance(value, tuple) else value) for key, value in projection.items()}
+
+        return settings
+
+
     def _postprocess_tasks_dataframe(self, data):
         """
         Turn the python object data into a pandas dataframe.
@@ -154,21 +362,30 @@ class FileDataReader:
         return data
 
 
-    def load_french(self, tasks=[1, 2, 3, 4, 5, 6, 7], info_only=False, data_only=False):
+    def load_french(self, tasks=[1, 2, 3, 4, 5, 6, 7], info_only=False, data_only=False, workers=1, participants=None, columns=None, sample_window=None, time_window=None, dtype_policy=None, max_in_flight=None):
         """
         Loads the french handwriting data for all participants.
 
+        When the reader has a cache_dir, the parsed data is cached on disk, and only the participants whose files changed since the last load are parsed again.
+
         Args:
             tasks (list[int]): A list of the numbers of the tasks to load, in the range of [1-7], by default it loads all the tasks.
             info_only (bool): default value False, Set to True if you want only the info data.
             data_only (bool): default value False, Set to True if you want only the tasks' data.
+            workers (int): default value 1, The number of processes the participants' files are parsed with.
+            participants (list[str]): default value None, The IDs of the participants to load, e.g. the index of a cohort chosen with select_cohort on the info only, the files of the others are never read, by default all the participants are loaded.
+            columns (list[str]): default value None, The data headers to load, e.g. ['X', 'Y', 'P'], the other columns are dropped while parsing, by default all of them are loaded.
+            sample_window (tuple): default value None, The (start, stop) positions of the samples to load from every recording, like a slice, e.g. (0, 500), the other samples are never converted.
+            time_window (tuple): default value None, The (start, stop) times to load from every recording, relative to its first sample and in the unit of the 'Time' column, e.g. (0, 3000) for the first 3 seconds timed in ms, the other samples are never converted.
+            dtype_policy (DtypePolicy or str): default value None, The dtypes of the tasks' data, e.g. 'compact' for int16 raw columns and categorical 'ID', 'Language' and 'Task' levels, by default the raw columns are int32.
+            max_in_flight (int): default value None, Set to read the files with asyncio, with at most max_in_flight opens and reads pending at once, to hide the latency of every file on a slow storage such as an NFS share, each file being parsed as soon as its bytes arrive, it can't be combined with workers.
 
         Returns:
             info, data (pandas.core.frame.DataFrame, pandas.core.frame.DataFrame): Default return, a tuple of 2 dataFrames, containing participants' data, and the tasks' data of all the participants, respectively, from the french directory.
             info (pandas.core.frame.DataFrame): A DataFrame of the information of all the participants in the french directory, if infoOnly is set to True.
             data (pandas.core.frame.DataFrame): A DataFrame containing the tasks' data of all the participants in the french directory, if dataOnly is set to True.
         """
-        print("Loading the data, please wait.")
+        logger.info("Loading the data, please wait.")
 
         assert not (info_only and data_only), "The infoOnly and dataOnly arguments can't bith be True."
 
@@ -177,32 +394,124 @@ class FileDataReader:
             alien_tasks = [task for task in unique_tasks if task < 1 or task > 7]
             assert len(alien_tasks) == 0, "The following tasks don't exist: " + str(alien_tasks)
 
-        info = list() if not data_only else None
-        data = list() if not info_only else None
+        assert max_in_flight is None or workers == 1, "The files are either read asynchronously, or parsed by several workers, not both."
+
+        projection = build_projection(self.data_header, columns, sample_window, time_window)
+        policy = get_policy(dtype_policy)
+
+        with stage('load_french', workers=workers, max_in_flight=max_in_flight) as load_record:
+            cache = LoadCache(self.cache_dir, self._cache_settings(tasks, projection)) if self.cache_dir is not None and not info_only else None
+            cached = cache.load() if cache else dict()
+
+            selected = None if participants is None else set(participants)
+            records = list()
+            to_parse = list()
+
+            for d in self.french_dir.iterdir():
+                if not d.is_dir():
+                    continue
+
+                participant_id = str(d.absolute()).split("/")[-1]
+                if selected is not None and participant_id not in selected:
+                    continue
+
+                fingerprint = self._fingerprint(d, tasks) if cache else None
+
+                if participant_id in cached and cached[participant_id]['fingerprint'] == fingerprint:
+                    records.append(dict(cached[participant_id], ID=participant_id))
+                    continue
+
+                to_parse.append((len(records), d, fingerprint))
+                records.append(None)
+
+            load_record.count('participants', len(records))
+            load_record.count('cache_hits', len(records) - len(to_parse))
+
+            with stage('parse') as record:
+                if max_in_flight is None:
+                    parsed = map_participants(partial(self._fetch_participant, tasks=tasks, info_only=info_only, projection=projection), [d for _, d, _ in to_parse], workers)
+                else:
+                    parsed = map_participants_async(partial(self._fetch_participant_async, tasks=tasks, info_only=info_only, projection=projection), [d for _, d, _ in to_parse], max_in_flight)
+
+                n_parsed = len(parsed)
+                n_rejected = 0
+                for (position, _, fingerprint), participant in zip(to_parse, parsed):
+                    participant['fingerprint'] = fingerprint
+                    records[position] = participant
+                    n_rejected += participant['n_rejected']
+
+                    record.count('files_read', participant['n_files'])
+                    record.count('bytes_read', participant['n_bytes'])
+                    record.count('lines_parsed', participant['hw_data'].shape[0] if 'hw_data' in participant else 0)
+
+                record.count('lines_rejected', n_rejected)
+
+            # the cached participants that weren't selected stay in the cache
+            unselected = [dict(entry, ID=participant_id) for participant_id, entry in cached.items() if selected is not None and participant_id not in selected]
+
+            if cache and (n_parsed or len(records) + len(unselected) != len(cached)):
+                with stage('save_cache'):
+                    cache.save(records + unselected, len(projected_header(self.data_header, projection)))
+
+            with stage('build') as record:
+                if not data_only:
+                    info = pd.DataFrame([p['info'] for p in records])
+                    info = self._postprocess_info_dataframe(info)
+
+                if not info_only:
+                    data = self._build_tasks_dataframe(records, projected_header(self.data_header, projection), policy)
+                    data = self._postprocess_tasks_dataframe(data)
+
+                    record.count('recordings', sum(np.unique(p['task_col']).shape[0] for p in records))
+
+        if n_rejected:
+            logger.warning("Ignored %d lines because they couldn't be converted into numbers.", n_rejected)
+
+        logger.info("Data loaded successfully.")
+
+        return info if info_only else (data if data_only else (info, data))
+
+
+    def iter_recordings(self, tasks=[1, 2, 3, 4, 5, 6, 7], label_key='PD', participants=None):
+        """
+        Stream the french handwriting data one recording at a time, so that the whole corpus never has to fit in memory.
+
+        Args:
+            tasks (list[int]): A list of the numbers of the tasks to load, in the range of [1-7], by default it loads all the tasks.
+            label_key (str): The name of the label column added to every recording, defaults to 'PD'.
+            participants (list[str]): The IDs of the participants to stream, by default all of them.
+
+        Yields:
+            participant_info (dict): The information of the participant.
+            recording (pandas.core.frame.DataFrame): The samples of a single task, indexed by ['ID', 'Language', 'Task'] like the data returned by load_french, with the label column (1 for PD, 0 for HC and -1 otherwise).
+        """
+        alien_tasks = [task for task in set(tasks) if task < 1 or task > 7]
+        assert len(alien_tasks) == 0, "The following tasks don't exist: " + str(alien_tasks)
+
+        n_rejected = 0
+
+        selected = None if participants is None else set(participants)
 
         for d in self.french_dir.iterdir():
-            if not d.is_dir():
+            if not d.is_dir() or (selected is not None and d.name not in selected):
                 continue
 
             participant_info = self._fetch_info(d)
             participant_info["ID"] = str(d.absolute()).split("/")[-1]
 
-            participant_data = self._fetch_data(participant_info, d, tasks) if not info_only else None
+            label = is_parkinsonian(pd.Series(participant_info))
 
-            info.append(participant_info) if not data_only else None
+            for task, hw_data, task_rejected, _ in self._iter_task_data(d, tasks):
+                n_rejected += task_rejected
 
-            data = data + participant_data if not info_only else None
+                recording = pd.DataFrame(hw_data, columns=self.data_header)
+                recording['ID'] = participant_info["ID"]
+                recording['Language'] = 'French'
+                recording['Task'] = task
+                recording[label_key] = label
+                recording.set_index(['ID', 'Language', 'Task'], inplace=True)
 
-        if not data_only:
-            info = pd.DataFrame(info)
-            info = self._postprocess_info_dataframe(info)
-        
-        if not info_only:
-            data = pd.DataFrame(data)
-            data['Language'] = 'French'
-            data = self._postprocess_tasks_dataframe(data)
-
-        print("Data loaded successfully.")
-
-        return info if info_only else (data if data_only else (info, data))
+                yield participant_info, recording
 
+        if n_rejected:
+            logger.warning("Ignored %d lines because they couldn't be converted into numbers.", n_rejected)
@@ -1,8 +1,19 @@
+import logging
 from pathlib import Path
+from functools import partial
 import pandas as pd
 import re
 import numpy as np
 from .datareader import DataReader
+from .taskparser import read_task_file
+from .catalog import CorpusCatalog
+from .parallel import map_participants
+from datamanipulation.dtypes import get_policy
+from monitoring.stages import stage
+
+
+logger = logging.getLogger('pd_classification')
+
 
 class FileDataReader:
     def __init__(self, 
@@ -12,12 +23,13 @@ class FileDataReader:
     tasks_file_names={
         'fr': ["Test1.txt", "Test2.txt", "Test3.txt", "Test4.txt", "Test5.txt", "Test6.txt", "Test7.txt"], 'ar': ["Test1.txt", "Test2.txt", "Test3.txt"]
         },
-    data_header=['Time', 'X', 'Y', 'P', 'Az', 'Al']):
+    data_header=['Time', 'X', 'Y', 'P', 'Az', 'Al'],
+    catalog_path=None):
         """
         Initializes a new FileDataReader.
 
         Args:
-            
+            catalog_path (str): A JSON file where a CorpusCatalog of the task files is kept, so that recordings are read without walking the directories or scanning for the header, by default there is no catalog.
         """
         self.parent_path = Path(parent_path)
 
@@ -28,6 +40,11 @@ class FileDataReader:
         self.info_file_name = info_file_name
         self.tasks_file_names = tasks_file_names
         self.data_header = data_header
+        self.header_reg = r'^[ \t]*' + r'[ \t]+'.join(re.escape(col) for col in self.data_header) + r'[ \t\r]*$'
+
+        self.catalog = None
+        if catalog_path is not None:
+            self.catalog = CorpusCatalog(catalog_path, self.lang_paths, self.tasks_file_names, self.info_file_name, self.header_reg, len(self.data_header))
 
 
     def __postprocess_info_df(self, df):
@@ -70,7 +87,13 @@ class FileDataReader:
         Returns:
             participant_info (pandas.core.series.Series): A series containing the information of the participant.
         """
-        if not isinstance(participant_id, Path):
+        if not isinstance(participant_id, Path) and self.catalog is not None:
+            participant = self.catalog.participant(participant_id)
+            if participant is None:
+                raise FileNotFoundError(participant_id + " isn't a participant of the corpus.")
+            participant_info_file = Path(participant['info_path'])
+
+        elif not isinstance(participant_id, Path):
             for key in self.lang_paths.keys():
                 lang = key
                 break
@@ -125,9 +148,9 @@ class FileDataReader:
         return df
 
 
-    def load_hw(self, participant_id, lang, task):
+    def _read_hw(self, participant_id, lang, task):
         """
-        Load and return a single image of handwriting data, of a certain participant, in a certain language, for a certain task.
+        Read a single image of handwriting data into an array.
 
         Args:
             participant_id (str): The name of the directory of the participant (the participant's name in uppercase).
@@ -135,39 +158,115 @@ class FileDataReader:
             task (int): The task number from (0, n - 1) where n the number of tasks for the chosen language.
 
         Returns:
-            hw_data (np.ndarray): An array of the handwriting data.
+            hw_data (np.ndarray): An int32 array of the handwriting data, with a column per data header.
+            n_rejected (int): The number of malformed lines that were ignored.
+            n_bytes (int): The size of the task file.
         """
+        if self.catalog is not None:
+            if self.catalog.get(participant_id, lang, task) is None:
+                raise FileNotFoundError(participant_id + ' has no ' + lang + ' task ' + str(task) + '.')
+
+            return self.catalog.read(participant_id, lang, task)
+
         hw_file = self.lang_paths[lang] / participant_id
         for d in hw_file.iterdir():
             if d.is_dir():
                 hw_file = d / self.tasks_file_names[lang][task]
                 break
 
-        f = open(hw_file, "r", encoding='ISO-8859-1')
-        header = ' '.join(self.data_header)
-        in_data = False
+        hw_data, n_rejected = read_task_file(hw_file, self.header_reg, len(self.data_header))
 
-        hw_data = np.zeros((1, len(self.data_header)))
+        return hw_data, n_rejected, hw_file.stat().st_size
 
-        for line in f:
-            line = re.sub(r"[ \t]+", " ", line).strip()
-            
-            if not in_data:
-                in_data = line == header
-                continue
-            
-            try:
-                line_data = np.array(line.split(" ")).astype(np.int32)
-            except:
-                print("Problem in line:",  line)
-                print("Ignored the line because it couldn't be converted into a number.")
-                continue
-            
-            hw_data = np.vstack([hw_data, line_data])
 
-        f.close()
+    def _read_participant_hw(self, participant_id, tasks_per_lang):
+        """
+        Read the images of handwriting data of a participant into contiguous arrays.
+
+        Args:
+            participant_id (str): The name of the directory of the participant (the participant's name in uppercase).
+            tasks_per_lang (dict): A dictionary with languages as keys, and a list of task numbers from (0, n - 1) where n the number of tasks for the chosen language as values for each key.
+
+        Returns:
+            hw_data (np.ndarray): An int32 array of the samples of all the images, with a column per data header.
+            lang_col (np.ndarray): The language of each row of hw_data.
+            task_col (np.ndarray): The task number of each row of hw_data.
+            n_rejected (int): The number of malformed lines that were ignored.
+            n_files (int): The number of task files that were read.
+            n_bytes (int): The size of the task files that were read.
+        """
+        blocks = list()
+        lang_cols = list()
+        task_cols = list()
+        n_rejected = 0
+        n_bytes = 0
+
+        for lang, tasks in tasks_per_lang.items():
+            for task in tasks:
+                try:
+                    hw, hw_rejected, hw_bytes = self._read_hw(participant_id, lang, task)
+                except:
+                    continue
+                blocks.append(hw)
+                lang_cols.append(np.full(hw.shape[0], lang, dtype=object))
+                task_cols.append(np.full(hw.shape[0], task, dtype=np.int64))
+                n_rejected += hw_rejected
+                n_bytes += hw_bytes
+
+        if not blocks:
+            return np.empty((0, len(self.data_header)), dtype=np.int32), np.empty(0, dtype=object), np.empty(0, dtype=np.int64), n_rejected, 0, n_bytes
+
+        return np.concatenate(blocks), np.concatenate(lang_cols), np.concatenate(task_cols), n_rejected, len(blocks), n_bytes
+
+
+    def __build_hw_df(self, participant_ids, participants_hw, policy):
+        """
+        Merge the arrays read for several participants into a single dataframe.
+
+        Args:
+            participant_ids (list[str]): The participants' IDs.
+            participants_hw (list[tuple]): The results of _read_participant_hw for each participant, in the same order.
+            policy (DtypePolicy): The dtypes of the columns.
+
+        Returns:
+            df (pandas.core.frame.DataFrame): A dataframe with a column per data header, plus 'Participant', 'Language' and 'Task'.
+        """
+        if not participants_hw:
+            participant_ids = list()
+            participants_hw = [self._read_participant_hw(None, dict())]
+
+        counts = [hw[0].shape[0] for hw in participants_hw]
+
+        hw_data = np.concatenate([hw[0] for hw in participants_hw])
+        lang_col = np.concatenate([hw[1] for hw in participants_hw])
+        task_col = np.concatenate([hw[2] for hw in participants_hw])
 
-        hw_data = pd.DataFrame(hw_data[1:,:], columns=self.data_header, dtype=int)
+        df = policy.raw_dataframe(hw_data, self.data_header)
+        df['Participant'] = policy.repeated_column(participant_ids, counts)
+        df['Language'] = pd.Categorical(lang_col) if policy.categorical else lang_col
+        df['Task'] = pd.Categorical(task_col) if policy.categorical else task_col
+
+        return df
+
+
+    def load_hw(self, participant_id, lang, task):
+        """
+        Load and return a single image of handwriting data, of a certain participant, in a certain language, for a certain task.
+
+        Args:
+            participant_id (str): The name of the directory of the participant (the participant's name in uppercase).
+            lang (str): The language.
+            task (int): The task number from (0, n - 1) where n the number of tasks for the chosen language.
+
+        Returns:
+            hw_data (np.ndarray): An array of the handwriting data.
+        """
+        hw_data, n_rejected, _ = self._read_hw(participant_id, lang, task)
+
+        if n_rejected:
+            logger.warning("Ignored %d lines because they couldn't be converted into numbers.", n_rejected)
+
+        hw_data = pd.DataFrame(hw_data, columns=self.data_header)
         hw_data['Participant'] = participant_id
         hw_data['Language'] = lang
         hw_data['Task'] = task
@@ -186,48 +285,61 @@ class FileDataReader:
         Returns:
             df (pandas.core.frame.DataFrame): A dataframe containing the results of the selection criteria.
         """
-        df = pd.DataFrame()
-        for lang, tasks in tasks_per_lang.items():
-            for task in tasks:
-                try:
-                    hw = self.load_hw(participant_id, lang, task)
-                except:
-                    continue
-                df = pd.concat((df, hw))
+        participant_hw = self._read_participant_hw(participant_id, tasks_per_lang)
 
-        return df
+        if participant_hw[3]:
+            logger.warning("Ignored %d lines because they couldn't be converted into numbers.", participant_hw[3])
+
+        return self.__build_hw_df([participant_id], [participant_hw], get_policy(None))
         
         
-    def load_data(self, tasks_per_lang):
+    def load_data(self, tasks_per_lang, workers=1, dtype_policy=None):
         """
         Load and return a dataframe containing images of handwriting data of all participants, in specific languages, for specific tasks.
 
         Args:
             tasks_per_lang (dict): A dictionary with languages as keys, and a list of task numbers from (0, n - 1) where n the number of tasks for the chosen language as values for each key.
+            workers (int): The number of processes the participants' files are parsed with, defaults to 1.
+            dtype_policy (DtypePolicy or str): The dtypes of the dataframe, e.g. 'compact' for int16 raw columns and categorical 'Participant', 'Language' and 'Task', by default the raw columns are int32.
 
         Returns:
             df (pandas.core.frame.DataFrame): A dataframe containing the results of the selection criteria.
         """
-        print('Loading the data, this may take a few minutes, please be patient.')
+        logger.info('Loading the data, this may take a few minutes, please be patient.')
 
-        df = pd.DataFrame()
+        policy = get_policy(dtype_policy)
 
-        for value in self.lang_paths.values():
-                lang_dir = value
-                break
+        with stage('load_data', workers=workers) as load_record:
+            for value in self.lang_paths.values():
+                    lang_dir = value
+                    break
 
-        for d in lang_dir.iterdir():
-            if not d.is_dir():
-                continue
-            
-            participant_id = d.absolute().name
+            if self.catalog is not None:
+                # the new participants are cataloged here rather than in every worker
+                participant_ids = self.catalog.participant_ids(next(iter(self.lang_paths)))
+            else:
+                participant_ids = [d.absolute().name for d in lang_dir.iterdir() if d.is_dir()]
+            load_record.count('participants', len(participant_ids))
 
-            df = pd.concat((df, self.load_participant_hw(participant_id, tasks_per_lang)))
+            with stage('parse') as record:
+                participants_hw = map_participants(partial(self._read_participant_hw, tasks_per_lang=tasks_per_lang), participant_ids, workers)
 
-        df = self.__postprocess_tasks_df(df)
-        
-        print("Data fully loaded.")
+                n_rejected = sum(hw[3] for hw in participants_hw)
 
-        return df
+                record.count('files_read', sum(hw[4] for hw in participants_hw))
+                record.count('bytes_read', sum(hw[5] for hw in participants_hw))
+                record.count('lines_parsed', sum(hw[0].shape[0] for hw in participants_hw))
+                record.count('lines_rejected', n_rejected)
+
+            with stage('build') as record:
+                df = self.__build_hw_df(participant_ids, participants_hw, policy)
+                df = self.__postprocess_tasks_df(df)
 
-    
\ No newline at end of file
+                record.count('recordings', sum(hw[4] for hw in participants_hw))
+
+        if n_rejected:
+            logger.warning("Ignored %d lines because they couldn't be converted into numbers.", n_rejected)
+
+        logger.info("Data fully loaded.")
+
+        return df
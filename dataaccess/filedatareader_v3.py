@@ -1,8 +1,20 @@
+import logging
 from pathlib import Path
+import os
+from functools import partial
 import pandas as pd
 import re
 import numpy as np
 from .datareader import DataReader
+from .taskparser import find_data_start, parse_samples, build_projection, projected_header
+from .parallel import map_participants
+from datamanipulation.helpers import is_parkinsonian
+from datamanipulation.dtypes import get_policy
+from monitoring.stages import stage
+
+
+logger = logging.getLogger('pd_classification')
+
 
 class FileDataReader:
     def __init__(self, 
@@ -32,91 +44,192 @@ class FileDataReader:
         self.header_reg = header_reg
 
 
-    def load_ml_pd_data(self, tasks_per_lang):
+    def _iter_participant_ml_pd(self, p_dir, lang, tasks, projection={}):
+        """
+        Read the images of handwriting data of a participant one task file at a time, along with their PD/HC label.
+
+        Args:
+            p_dir (pathlib.Path): The directory of the participant.
+            lang (str): The language.
+            tasks (list[int]): A list of task numbers from (0, n - 1) where n the number of tasks for the chosen language.
+            projection (dict): The projection of the data, see taskparser.build_projection.
+
+        Yields:
+            task (int): The task number.
+            hw_data (numpy.ndarray): An int32 array of the samples of the image, with a column per projected data header.
+            is_pd (int): The label of the image, 1 for PD, 0 for HC.
+            n_rejected (int): The number of malformed lines that were ignored.
+            n_bytes (int): The size of the task file.
+        """
+        pathology = None
+        dementia = None
+        other_dementia = None
+
+        is_pd = None
+        
+        for t_dir in p_dir.iterdir():
+            if t_dir.is_dir():
+                for task in tasks:
+                    try:
+                        f = open(t_dir / self.tasks_file_names[lang][task], "r", encoding='ISO-8859-1')
+                    except:
+                        continue
+
+                    text = f.read()
+                    n_bytes = os.fstat(f.fileno()).st_size
+                    f.close()
+
+                    data_start = find_data_start(text, self.header_reg)
+
+                    if is_pd is None:
+                        for line in text[:data_start].splitlines():
+                            if (dementia and other_dementia) or pathology:
+                                break
+
+                            if re.match(r'^[ \t]*[pP]athology', line):
+                                pathology = line.split(':')[1].strip()
+                            elif re.match(r'^[ \t]*[dD]ementia[ \t]*:', line):
+                                dementia = line.split(':')[1].strip()
+                            elif re.match(r'^[ \t]*[oO]ther[ \t]*[dD]ementia[ \t]*:', line):
+                                other_dementia = line.split(':')[1].strip()
+
+                        if (dementia and other_dementia) or pathology:
+                            is_pd = is_parkinsonian(pd.Series({'Pathology': pathology, 'Dementia': dementia, 'Other Dementia': other_dementia}))
+
+                    if is_pd == -1:
+                        return
+
+                    if data_start is None:
+                        hw_data, n_rejected = np.empty((0, len(projected_header(self.data_header, projection))), dtype=np.int32), 0
+                    else:
+                        hw_data, n_rejected = parse_samples(text[data_start:], len(self.data_header), **projection)
+
+                    yield task, hw_data, is_pd, n_rejected, n_bytes
+                    
+                break
+
+
+    def _load_participant_ml_pd(self, p_dir, lang, tasks, projection={}):
+        """
+        Load the images of handwriting data of a participant, and their PD/HC label.
+
+        Args:
+            p_dir (pathlib.Path): The directory of the participant.
+            lang (str): The language.
+            tasks (list[int]): A list of task numbers from (0, n - 1) where n the number of tasks for the chosen language.
+            projection (dict): The projection of the data, see taskparser.build_projection.
+
+        Returns:
+            hw_data (numpy.ndarray): An int32 array of the samples of all the images, one after the other.
+            lengths (list[int]): The number of samples of each image.
+            labels (list): The label of each image, 1 for PD, 0 for HC.
+            n_rejected (int): The number of malformed lines that were ignored.
+            n_bytes (int): The size of the task files that were read.
+        """
+        blocks = list()
+        labels = list()
+        n_rejected = 0
+        n_bytes = 0
+
+        for _, hw_data, is_pd, task_rejected, task_bytes in self._iter_participant_ml_pd(p_dir, lang, tasks, projection):
+            blocks.append(hw_data)
+            labels.append(is_pd)
+            n_rejected += task_rejected
+            n_bytes += task_bytes
+
+        lengths = [block.shape[0] for block in blocks]
+        hw_data = np.concatenate(blocks) if blocks else np.empty((0, len(projected_header(self.data_header, projection))), dtype=np.int32)
+
+        return hw_data, lengths, labels, n_rejected, n_bytes
+
+
+    def load_ml_pd_data(self, tasks_per_lang, workers=1, participants=None, columns=None, sample_window=None, time_window=None, dtype_policy=None):
         """
         Load and return images of handwriting data, and their PD/HC labels of all participants, in specific languages, for specific tasks.
 
         Args:
             tasks_per_lang (dict): A dictionary with languages as keys, and a list of task numbers from (0, n - 1) where n the number of tasks for the chosen language as values for each key.
+            workers (int): The number of processes the participants' files are parsed with, defaults to 1.
+            participants (list[str]): The IDs of the participants to load, the files of the others are never read, by default all the participants are loaded.
+            columns (list[str]): The data headers to load, e.g. ['X', 'Y', 'P'], the other columns are dropped while parsing, by default all of them are loaded.
+            sample_window (tuple): The (start, stop) positions of the samples to load from every image, like a slice, e.g. (0, 500), the other samples are never converted.
+            time_window (tuple): The (start, stop) times to load from every image, relative to its first sample and in the unit of the 'Time' column, e.g. (0, 3000) for the first 3 seconds timed in ms, the other samples are never converted.
+            dtype_policy (DtypePolicy or str): The dtypes of the images, e.g. 'compact' for int16 samples when all their values fit, by default the samples are int32.
 
         Returns:
-            X (list(numpy.ndarray)): A list of HW images with respect to the selection criteria.
+            X (list(numpy.ndarray)): A list of HW images with respect to the selection criteria, views into a single contiguous array, with a column per loaded data header.
             y (numpy.ndarray): The array of labels, 1 for PD, 0 for HC.
         """
-        print('Loading the data, please be patient, this may take a few minutes.')
-        X = list()
-        y = list()
+        logger.info('Loading the data, please be patient, this may take a few minutes.')
 
-        for lang, tasks in tasks_per_lang.items():
-            for p_dir in self.lang_paths[lang].iterdir():
-                if not p_dir.is_dir():
-                    continue
+        projection = build_projection(self.data_header, columns, sample_window, time_window)
+        selected = None if participants is None else set(participants)
+        policy = get_policy(dtype_policy)
 
-                pathology = None
-                dementia = None
-                other_dementia = None
-
-                is_pd = None
-                
-                for t_dir in p_dir.iterdir():
-                    if t_dir.is_dir():
-                        for task in tasks:
-                            try:
-                                f = open(t_dir / self.tasks_file_names[lang][task], "r", encoding='ISO-8859-1')
-                            except:
-                                continue
-
-                            hw_data = np.zeros((1, len(self.data_header)))
-
-                            header_found = None
-
-                            for line in f:
-                                if not header_found:
-                                    header_found = re.match(self.header_reg, line)
-                                    
-                                    if not ((dementia and other_dementia) or pathology):
-                                        if re.match(r'^[ \t]*[pP]athology', line):
-                                            pathology = line.split(':')[1].strip()
-                                            continue
-                                        
-                                        if re.match(r'^[ \t]*[dD]ementia[ \t]*:', line):
-                                            dementia = line.split(':')[1].strip()
-                                            continue
-
-                                        if re.match(r'^[ \t]*[oO]ther[ \t]*[dD]ementia[ \t]*:', line):
-                                            other_dementia = line.split(':')[1].strip()
-                                            continue
-
-                                    elif is_pd is None and (is_pd := is_parkinsonian(pathology, dementia, other_dementia) == -1):
-                                        break
-
-                                    continue
-
-                                try:
-                                    line_data = np.array(line.split(" ")).astype(np.int32)
-                                except:
-                                    print("Problem in line:",  line, " so it was ignored the line because it couldn't be converted into a number.")
-                                    continue
-                                
-                                try:
-                                    hw_data = np.vstack([hw_data, line_data])
-                                except:
-                                    print('There was a problem with adding this line to the image:', line, "so it was ignored.")
-
-                            f.close()
-
-                            if is_pd == -1:
-                                break
+        with stage('load_ml_pd_data', workers=workers):
+            with stage('parse') as record:
+                participants = list()
+
+                for lang, tasks in tasks_per_lang.items():
+                    p_dirs = [p_dir for p_dir in self.lang_paths[lang].iterdir() if p_dir.is_dir() and (selected is None or p_dir.name in selected)]
+                    participants += map_participants(partial(self._load_participant_ml_pd, lang=lang, tasks=tasks, projection=projection), p_dirs, workers)
+
+                n_rejected = sum(participant[3] for participant in participants)
 
-                            X.append(hw_data[1:,:])
-                            y.append(is_pd)
-                            
-                        break
+                record.count('participants', len(participants))
+                record.count('files_read', sum(len(participant[1]) for participant in participants))
+                record.count('bytes_read', sum(participant[4] for participant in participants))
+                record.count('lines_parsed', sum(participant[0].shape[0] for participant in participants))
+                record.count('lines_rejected', n_rejected)
 
-        y = np.array(y)
+            if n_rejected:
+                logger.warning("Ignored %d lines because they couldn't be converted into numbers.", n_rejected)
+
+            with stage('build') as record:
+                lengths = [length for participant in participants for length in participant[1]]
+                hw_data = np.concatenate([participant[0] for participant in participants]) if participants else np.empty((0, len(projected_header(self.data_header, projection))), dtype=np.int32)
+                hw_data = policy.cast_raw(hw_data)
+
+                X = np.split(hw_data, np.cumsum(lengths)[:-1]) if lengths else list()
+                y = np.array([label for participant in participants for label in participant[2]])
+
+                record.count('recordings', len(X))
 
         print('Data loaded.')
 
         return X, y
 
 
+    def iter_recordings(self, tasks_per_lang, label_key='PD'):
+        """
+        Stream images of handwriting data, and their PD/HC labels, one image at a time, so that the whole corpus never has to fit in memory.
+
+        Args:
+            tasks_per_lang (dict): A dictionary with languages as keys, and a list of task numbers from (0, n - 1) where n the number of tasks for the chosen language as values for each key.
+            label_key (str): The name of the label column added to every image, defaults to 'PD'.
+
+        Yields:
+            participant_info (dict): The ID of the participant, and its label under label_key.
+            recording (pandas.core.frame.DataFrame): The samples of the image, indexed by ['ID', 'Language', 'Task'], with the label column.
+        """
+        n_rejected = 0
+
+        for lang, tasks in tasks_per_lang.items():
+            for p_dir in self.lang_paths[lang].iterdir():
+                if not p_dir.is_dir():
+                    continue
+
+                for task, hw_data, is_pd, task_rejected, _ in self._iter_participant_ml_pd(p_dir, lang, tasks):
+                    n_rejected += task_rejected
+
+                    recording = pd.DataFrame(hw_data, columns=self.data_header)
+                    recording['ID'] = p_dir.name
+                    recording['Language'] = lang
+                    recording['Task'] = task
+                    recording[label_key] = is_pd
+                    recording.set_index(['ID', 'Language', 'Task'], inplace=True)
+
+                    yield {'ID': p_dir.name, label_key: is_pd}, recording
+
+        if n_rejected:
+            logger.warning("Ignored %d lines because they couldn't be converted into numbers.", n_rejected)
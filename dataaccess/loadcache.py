@@ -0,0 +1,128 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+
+CACHE_FORMAT_VERSION = 1
+
+
+class LoadCache:
+    """
+    An on-disk columnar cache of the participants' info and tasks' data parsed by a FileDataReader.
+
+    Every cache entry lives in its own directory, named after a hash of the settings that produced it, and holds:
+        manifest.json: The per participant info, file fingerprints and row ranges.
+        samples.npy: An int32 array of shape (n_samples, n_cols) of all the parsed samples.
+        tasks.npy: The task number of each row of samples.npy.
+
+    An entry is written in a temporary directory then moved into place, the entry it replaces being moved aside first and deleted last, so that a load never mixes the files of two entries, and the previous entry is kept if the process dies in between.
+
+    Attributes:
+        entry_dir (pathlib.Path): The directory of the cache entry.
+    """
+
+
+    def __init__(self, cache_dir, settings):
+        """
+        Initializes a new LoadCache.
+
+        Args:
+            cache_dir (str or pathlib.Path): The root directory of the cache.
+            settings (dict): The JSON serializable settings the cached data depends on (corpus root, tasks, reader settings...).
+        """
+        settings = dict(settings, version=CACHE_FORMAT_VERSION)
+        key = hashlib.sha1(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+        self.cache_dir = Path(cache_dir)
+        self.entry_dir = self.cache_dir / key
+        self.old_dir = self.cache_dir / (key + '.old')
+
+
+    def load(self):
+        """
+        Load the cache entry, the samples are memory-mapped rather than read.
+
+        Returns:
+            participants (dict): A dictionary mapping each cached participant ID to a dictionary with the keys 'fingerprint', 'info', 'n_rejected', 'hw_data' and 'task_col', empty if there is no valid entry.
+        """
+        # the entry is moved aside while save replaces it, or if the process died doing so
+        entry_dir = self.entry_dir if self.entry_dir.exists() else self.old_dir
+
+        try:
+            f = open(entry_dir / 'manifest.json', 'r', encoding='utf-8')
+            manifest = json.load(f)
+            f.close()
+            samples = np.load(entry_dir / 'samples.npy', mmap_mode='r')
+            task_col = np.load(entry_dir / 'tasks.npy', mmap_mode='r')
+        except (OSError, ValueError):
+            return dict()
+
+        if manifest.get('version') != CACHE_FORMAT_VERSION or manifest.get('n_samples') != samples.shape[0]:
+            return dict()
+
+        participants = dict()
+        for entry in manifest['participants']:
+            start, stop = entry['rows']
+            participants[entry['ID']] = {
+                'fingerprint': entry['fingerprint'],
+                'info': entry['info'],
+                'n_rejected': entry['n_rejected'],
+                'hw_data': samples[start:stop],
+                'task_col': task_col[start:stop],
+            }
+
+        return participants
+
+
+    def save(self, participants, n_cols):
+        """
+        Replace the cache entry with the given participants.
+
+        Args:
+            participants (list[dict]): The participants in load order, each a dictionary with the keys 'ID', 'fingerprint', 'info', 'n_rejected', 'hw_data' and 'task_col'.
+            n_cols (int): The number of columns of the samples.
+        """
+        entries = list()
+        stop = 0
+        for participant in participants:
+            start, stop = stop, stop + participant['hw_data'].shape[0]
+            entries.append({
+                'ID': participant['ID'],
+                'fingerprint': participant['fingerprint'],
+                'info': participant['info'],
+                'n_rejected': participant['n_rejected'],
+                'rows': [start, stop],
+            })
+
+        samples = np.concatenate([p['hw_data'] for p in participants]) if participants else np.empty((0, n_cols), dtype=np.int32)
+        task_col = np.concatenate([p['task_col'] for p in participants]) if participants else np.empty(0, dtype=np.int64)
+
+        # a directory of its own, so that concurrent loads never write into the same one
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(prefix=self.entry_dir.name + '.', suffix='.tmp', dir=self.cache_dir))
+
+        np.save(tmp_dir / 'samples.npy', samples)
+        np.save(tmp_dir / 'tasks.npy', task_col)
+
+        f = open(tmp_dir / 'manifest.json', 'w', encoding='utf-8')
+        json.dump({'version': CACHE_FORMAT_VERSION, 'n_samples': stop, 'participants': entries}, f)
+        f.close()
+
+        # the old entry is moved aside rather than deleted first, so that there is always a whole entry, or an old one if the process dies in between
+        if self.old_dir.exists():
+            shutil.rmtree(self.old_dir, ignore_errors=True)
+
+        try:
+            if self.entry_dir.exists():
+                os.replace(self.entry_dir, self.old_dir)
+            os.replace(tmp_dir, self.entry_dir)
+        except OSError:
+            # another load swapped its entry in first, which is as recent as this one
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        # the old entry may still be memory-mapped by the load that replaced it, which only prevents deleting it on Windows
+        shutil.rmtree(self.old_dir, ignore_errors=True)
@@ -0,0 +1,26 @@
+from concurrent.futures import ProcessPoolExecutor
+
+
+def map_participants(func, items, workers=1):
+    """
+    Apply a function to every participant, either serially or in a pool of processes.
+
+    The results are returned in the order of items whatever the number of workers, so the parallel and serial paths give identical outputs.
+
+    Args:
+        func (function): A picklable function taking a single item, e.g. a functools.partial of a reader method.
+        items (list): The items to process, e.g. the participants' directories.
+        workers (int): The number of worker processes, 1 to process the items in the current process.
+
+    Returns:
+        results (list): The results of func for each item, in the order of items.
+    """
+    assert workers >= 1, "The number of workers should be a positive integer."
+
+    if workers == 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    chunksize = max(1, len(items) // (workers * 4))
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        return list(executor.map(func, items, chunksize=chunksize))
@@ -0,0 +1,169 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+
+class RecordingStore:
+    """
+    A compact store of handwriting recordings, packed one after the other in a single contiguous array.
+
+    Recording i spans the rows offsets[i]:offsets[i + 1] of samples, so getting a recording is an O(1) slice that returns a view, without any MultiIndex lookup.
+
+    Attributes:
+        samples (numpy.ndarray): The samples of all the recordings, of shape (n_samples, n_columns).
+        offsets (numpy.ndarray): The int64 start of every recording in samples, followed by n_samples.
+        columns (list[str]): The names of the columns of samples.
+        meta (pandas.core.frame.DataFrame): One row per recording, indexed by the recording key (e.g. ['ID', 'Language', 'Task']), holding the per recording columns (e.g. the label).
+        column_order (list[str]): The order of the sample and meta columns in the unpacked dataframe, e.g. ['PD', 'Time', 'X', ...] like the readers give them.
+    """
+
+
+    def __init__(self, samples, offsets, columns, meta, column_order=None):
+        """
+        Initializes a new RecordingStore.
+
+        Args:
+            samples (numpy.ndarray): The samples of all the recordings, of shape (n_samples, n_columns).
+            offsets (numpy.ndarray): The start of every recording in samples, followed by n_samples.
+            columns (list[str]): The names of the columns of samples.
+            meta (pandas.core.frame.DataFrame): One row per recording, indexed by the recording key.
+            column_order (list[str]): The order of the columns in the unpacked dataframe, by default the sample columns then the meta columns.
+        """
+        assert len(offsets) == len(meta) + 1, "There should be one offset per recording, plus the total number of samples."
+        assert offsets[-1] == samples.shape[0], "The last offset should be the number of samples."
+
+        self.samples = samples
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.columns = list(columns)
+        self.meta = meta
+        self.column_order = self.columns + list(meta.columns) if column_order is None else list(column_order)
+
+
+    @classmethod
+    def from_dataframe(cls, data, meta_columns=[], dtype=None):
+        """
+        Pack a HW dataframe, in the layout returned by the readers, into a store.
+
+        Args:
+            data (pandas.core.frame.DataFrame): The HW dataframe, indexed by the recording key (e.g. ['ID', 'Language', 'Task']).
+            meta_columns (list[str]): The columns that are constant within a recording (e.g. ['PD']), they are kept once per recording in meta.
+            dtype (numpy.dtype): The dtype of samples, by default the common dtype of the sample columns.
+
+        Returns:
+            store (RecordingStore): The packed recordings.
+        """
+        if not data.index.is_monotonic_increasing:
+            data = data.sort_index(kind='stable')
+
+        columns = [col for col in data.columns if col not in meta_columns]
+        samples = np.ascontiguousarray(data[columns].to_numpy(dtype=dtype))
+
+        starts = np.flatnonzero(~data.index.duplicated())
+        offsets = np.append(starts, data.shape[0])
+
+        meta = data[list(meta_columns)].iloc[starts]
+
+        return cls(samples, offsets, columns, meta, list(data.columns))
+
+
+    def __len__(self):
+        return len(self.meta)
+
+
+    def __getitem__(self, i):
+        """
+        Get the samples of the i-th recording.
+
+        Args:
+            i (int): The position of the recording.
+
+        Returns:
+            recording (numpy.ndarray): A view of the samples of the recording.
+        """
+        return self.samples[self.offsets[i]:self.offsets[i + 1]]
+
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+    @property
+    def index(self):
+        """
+        The keys of the recordings, in storage order.
+        """
+        return self.meta.index
+
+
+    @property
+    def lengths(self):
+        """
+        The number of samples of every recording.
+        """
+        return np.diff(self.offsets)
+
+
+    def get(self, key):
+        """
+        Get the samples of a recording from its key.
+
+        Args:
+            key (tuple): The key of the recording, e.g. (ID, Language, Task).
+
+        Returns:
+            recording (numpy.ndarray): A view of the samples of the recording.
+        """
+        return self[self.index.get_loc(key)]
+
+
+    def to_dataframe(self):
+        """
+        Unpack the store into a HW dataframe, in the layout returned by the readers.
+
+        Returns:
+            data (pandas.core.frame.DataFrame): The HW dataframe, indexed by the recording key, with the columns in the order of the packed dataframe.
+        """
+        lengths = self.lengths
+
+        data = pd.DataFrame(self.samples, columns=self.columns, index=self.index.repeat(lengths))
+        for col in self.meta.columns:
+            data[col] = np.repeat(self.meta[col].to_numpy(), lengths)
+
+        return data[self.column_order]
+
+
+    def save(self, store_dir):
+        """
+        Save the store into a directory, as samples.npy, offsets.npy and meta.pkl.
+
+        Args:
+            store_dir (str or pathlib.Path): The directory to save the store into, it is created if needed.
+        """
+        store_dir = Path(store_dir)
+        store_dir.mkdir(parents=True, exist_ok=True)
+
+        np.save(store_dir / 'samples.npy', self.samples)
+        np.save(store_dir / 'offsets.npy', self.offsets)
+        pd.to_pickle((self.columns, self.meta, self.column_order), store_dir / 'meta.pkl')
+
+
+    @classmethod
+    def load(cls, store_dir, mmap_mode='r'):
+        """
+        Load a store saved with save.
+
+        Args:
+            store_dir (str or pathlib.Path): The directory the store was saved into.
+            mmap_mode (str): The numpy memory-map mode of samples, defaults to 'r', None reads it into memory.
+
+        Returns:
+            store (RecordingStore): The loaded store.
+        """
+        store_dir = Path(store_dir)
+
+        samples = np.load(store_dir / 'samples.npy', mmap_mode=mmap_mode)
+        offsets = np.load(store_dir / 'offsets.npy')
+        columns, meta, column_order = pd.read_pickle(store_dir / 'meta.pkl')
+
+        return cls(samples, offsets, columns, meta, column_order)
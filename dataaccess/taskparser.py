@@ -0,0 +1,246 @@
+import re
+import warnings
+from functools import lru_cache
+import numpy as np
+
+
+_NON_BLANK_LINE_REG = re.compile(r'^[ \t]*\S', re.MULTILINE)
+
+
+@lru_cache(maxsize=None)
+def _sample_line_reg(n_cols):
+    """
+    Build the regular expression matching a well formed line of n_cols integers.
+
+    Args:
+        n_cols (int): The number of columns in a data line.
+
+    Returns:
+        reg (re.Pattern): The compiled multiline regular expression.
+    """
+    return re.compile(r'^[ \t]*[-+]?\d+(?:[ \t]+[-+]?\d+){%d}[ \t\r]*$' % (n_cols - 1), re.MULTILINE)
+
+
+def find_data_start(text, header_reg):
+    """
+    Find the offset of the first character after the header line of a task file.
+
+    Args:
+        text (str): The content of the task file.
+        header_reg (regex str): The regular expression used to capture the header of the data.
+
+    Returns:
+        start (int or None): The offset where the numeric data starts, None if no header was found.
+    """
+    match = re.search(header_reg, text, re.MULTILINE)
+    if not match:
+        return None
+
+    end_of_line = text.find('\n', match.end())
+
+    return len(text) if end_of_line == -1 else end_of_line + 1
+
+
+def _window_lines(lines, sample_window=None, time_window=None, time_col=0):
+    """
+    Keep the lines of a window of samples, before they are decoded.
+
+    The time window is found with a binary search on the time column, which is assumed to be non decreasing, so only a logarithmic number of lines are decoded to find it.
+
+    Args:
+        lines (list[str]): The well formed data lines.
+        sample_window (tuple): The (start, stop) positions of the samples to keep, like a slice, None to keep them all.
+        time_window (tuple): The (start, stop) times to keep, relative to the first sample's time, start included and stop excluded, None to keep them all.
+        time_col (int): The position of the time column.
+
+    Returns:
+        lines (list[str]): The lines in the windows.
+    """
+    if sample_window is not None:
+        lines = lines[slice(*sample_window)]
+
+    if time_window is not None and lines:
+        origin = int(lines[0].split()[time_col])
+
+        start = 0 if time_window[0] is None else _first_line_at(lines, origin + time_window[0], time_col)
+        stop = len(lines) if time_window[1] is None else _first_line_at(lines, origin + time_window[1], time_col)
+        lines = lines[start:stop]
+
+    return lines
+
+
+def _first_line_at(lines, time, time_col):
+    """
+    Binary search the first line whose time is at least time.
+
+    Args:
+        lines (list[str]): The data lines, with a non decreasing time column.
+        time (int): The time to search.
+        time_col (int): The position of the time column.
+
+    Returns:
+        position (int): The position of the first line at or after time, len(lines) if there is none.
+    """
+    low, high = 0, len(lines)
+    while low < high:
+        middle = (low + high) // 2
+        if int(lines[middle].split()[time_col]) < time:
+            low = middle + 1
+        else:
+            high = middle
+
+    return low
+
+
+def parse_samples(body, n_cols, usecols=None, sample_window=None, time_window=None, time_col=0, n_samples=None):
+    """
+    Decode the numeric body of a task file into an int32 block in one pass.
+
+    Blank lines are skipped silently, any other line that is not made of exactly n_cols integers is rejected. The windows are applied before decoding, so the samples outside of them are never converted.
+    When the number of samples is known, e.g. from a CorpusCatalog, and there is no window, the body is decoded straight into an array of that size without matching its lines, falling back to matching them if it doesn't hold exactly n_samples samples.
+
+    Args:
+        body (str): The part of the task file that follows the header line.
+        n_cols (int): The number of columns in a data line.
+        usecols (list[int]): The positions of the columns to keep, by default all of them.
+        sample_window (tuple): The (start, stop) positions of the samples to keep, like a slice, e.g. (0, 500) for the first 500 samples.
+        time_window (tuple): The (start, stop) times to keep, relative to the time of the first sample of sample_window and in the unit of the time column, e.g. (0, 3000) for the first 3 seconds of a recording timed in ms.
+        time_col (int): The position of the time column, used by time_window.
+        n_samples (int): The number of lines of the body, which must have no malformed line, by default the lines are matched.
+
+    Returns:
+        hw_data (numpy.ndarray): An int32 array of shape (n_samples, n_cols), or (n_samples, len(usecols)).
+        n_rejected (int): The number of malformed lines that were ignored, whether they are in the windows or not.
+    """
+    if n_samples is not None and sample_window is None and time_window is None:
+        # numpy warns about the text it couldn't decode, and will raise instead, in both cases the lines are matched
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            try:
+                values = np.fromstring(body, dtype=np.int32, sep=' ')
+            except (DeprecationWarning, ValueError):
+                values = np.empty(0, dtype=np.int32)
+
+        if values.shape[0] == n_samples * n_cols:
+            hw_data = values.reshape((n_samples, n_cols))
+            return (hw_data if usecols is None else np.ascontiguousarray(hw_data[:, usecols])), 0
+
+    lines = _sample_line_reg(n_cols).findall(body)
+    n_rejected = len(_NON_BLANK_LINE_REG.findall(body)) - len(lines)
+
+    lines = _window_lines(lines, sample_window, time_window, time_col)
+
+    if not lines:
+        return np.empty((0, n_cols if usecols is None else len(usecols)), dtype=np.int32), n_rejected
+
+    hw_data = np.fromstring(' '.join(lines), dtype=np.int32, count=len(lines) * n_cols, sep=' ').reshape((len(lines), n_cols))
+
+    if usecols is not None:
+        hw_data = np.ascontiguousarray(hw_data[:, usecols])
+
+    return hw_data, n_rejected
+
+
+def count_samples(body, n_cols):
+    """
+    Count the well formed and malformed lines of the numeric body of a task file, without decoding them.
+
+    Args:
+        body (str): The part of the task file that follows the header line.
+        n_cols (int): The number of columns in a data line.
+
+    Returns:
+        n_samples (int): The number of well formed lines.
+        n_rejected (int): The number of malformed lines, blank lines excluded.
+    """
+    n_samples = len(_sample_line_reg(n_cols).findall(body))
+
+    return n_samples, len(_NON_BLANK_LINE_REG.findall(body)) - n_samples
+
+
+def parse_task_text(text, header_reg, n_cols, **projection):
+    """
+    Locate the header of a task file once, then decode everything after it.
+
+    Args:
+        text (str): The content of the task file.
+        header_reg (regex str): The regular expression used to capture the header of the data.
+        n_cols (int): The number of columns in a data line.
+        **projection: The usecols, sample_window, time_window and time_col of parse_samples.
+
+    Returns:
+        hw_data (numpy.ndarray): An int32 array of shape (n_samples, n_cols), empty if the header is missing.
+        n_rejected (int): The number of malformed lines that were ignored.
+    """
+    start = find_data_start(text, header_reg)
+
+    return parse_samples('' if start is None else text[start:], n_cols, **projection)
+
+
+def read_task_file(task_file_path, header_reg, n_cols, **projection):
+    """
+    Read and parse a task file.
+
+    Args:
+        task_file_path (pathlib.Path): The path of the task file.
+        header_reg (regex str): The regular expression used to capture the header of the data.
+        n_cols (int): The number of columns in a data line.
+        **projection: The usecols, sample_window, time_window and time_col of parse_samples.
+
+    Returns:
+        hw_data (numpy.ndarray): An int32 array of shape (n_samples, n_cols).
+        n_rejected (int): The number of malformed lines that were ignored.
+    """
+    f = open(task_file_path, "r", encoding='ISO-8859-1')
+    text = f.read()
+    f.close()
+
+    return parse_task_text(text, header_reg, n_cols, **projection)
+
+
+def build_projection(data_header, columns=None, sample_window=None, time_window=None):
+    """
+    Turn the projection arguments of the loaders into the keyword arguments of parse_samples.
+
+    Args:
+        data_header (list[str]): The ordered headers of the tasks' data.
+        columns (list[str]): The data headers to keep, by default all of them.
+        sample_window (tuple): The (start, stop) positions of the samples to keep in every recording, like a slice.
+        time_window (tuple): The (start, stop) times to keep in every recording, relative to its first sample, in the unit of the 'Time' column.
+
+    Returns:
+        projection (dict): The usecols, sample_window, time_window and time_col of parse_samples that are set, empty if nothing is projected.
+    """
+    projection = dict()
+
+    if columns is not None:
+        unknown_columns = [col for col in columns if col not in data_header]
+        assert len(unknown_columns) == 0, "The following columns don't exist: " + str(unknown_columns)
+        projection['usecols'] = [data_header.index(col) for col in columns]
+
+    if sample_window is not None:
+        projection['sample_window'] = tuple(sample_window)
+
+    if time_window is not None:
+        assert 'Time' in data_header, "A time window needs a 'Time' data header."
+        projection['time_window'] = tuple(time_window)
+        projection['time_col'] = data_header.index('Time')
+
+    return projection
+
+
+def projected_header(data_header, projection):
+    """
+    Get the names of the columns of the projected data.
+
+    Args:
+        data_header (list[str]): The ordered headers of the tasks' data.
+        projection (dict): The projection of the data, see build_projection.
+
+    Returns:
+        header (list[str]): The data headers that are kept.
+    """
+    if 'usecols' not in projection:
+        return list(data_header)
+
+    return [data_header[i] for i in projection['usecols']]
@@ -0,0 +1,159 @@
+import numpy as np
+
+
+def bucket_boundaries(lengths, n_buckets=8):
+    """
+    Choose bucket boundaries at the quantiles of the images' lengths, so that the buckets hold about as many images each.
+
+    Args:
+        lengths (array-like): The length of every image.
+        n_buckets (int): The maximum number of buckets.
+
+    Returns:
+        boundaries (numpy.ndarray): The sorted unique boundaries, the last one being the longest length.
+    """
+    quantiles = np.linspace(0, 100, n_buckets + 1)[1:]
+    return np.unique(np.ceil(np.percentile(lengths, quantiles)).astype(np.int64))
+
+
+class BucketedBatches:
+    """
+    Batches of variable length images, where every batch is drawn from a single length bucket, and padded up to that bucket's boundary only, instead of the longest image of the dataset.
+
+    Attributes:
+        boundaries (numpy.ndarray): The length every batch of each bucket is padded to.
+        epoch_stats_ (list[dict]): The padding statistics of every epoch iterated so far.
+    """
+
+
+    def __init__(self, X, y, indices=None, batch_size=32, boundaries=None, n_buckets=8, shuffle=True, padding_value=0, dtype='float32', random_state=None):
+        """
+        Initializes new BucketedBatches.
+
+        Args:
+            X (list(numpy.ndarray)): The images, of shape (length, n_features) each, e.g. as returned by get_samples.
+            y (numpy.ndarray): The label of each image.
+            indices (numpy.ndarray): The images to batch, at least one, e.g. the train_index of a StratifiedKFold split, by default all of them.
+            batch_size (int): The maximum number of images per batch.
+            boundaries (list[int]): The bucket boundaries, by default chosen at the quantiles of the lengths with bucket_boundaries.
+            n_buckets (int): The number of buckets if boundaries isn't given.
+            shuffle (bool): Whether to shuffle the images within their bucket, and the order of the batches, at every epoch.
+            padding_value (float): The value used for padding, e.g. the mask value of a Masking layer.
+            dtype (str): The dtype of the batches.
+            random_state (int): The seed of the shuffling.
+        """
+        self.X = X
+        self.y = np.asarray(y)
+        self.indices = np.arange(len(X)) if indices is None else np.asarray(indices)
+        assert self.indices.shape[0] > 0, "There should be at least one image to batch, but " + ("X is empty." if indices is None else "indices is empty.")
+
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.padding_value = padding_value
+        self.dtype = dtype
+        self.n_features = X[self.indices[0]].shape[1]
+
+        self.lengths = np.array([X[i].shape[0] for i in self.indices])
+        self.boundaries = bucket_boundaries(self.lengths, n_buckets) if boundaries is None else np.sort(np.asarray(boundaries))
+        assert self.boundaries[-1] >= self.lengths.max(), "The last boundary should be at least the longest length, " + str(self.lengths.max()) + "."
+
+        self.buckets = np.searchsorted(self.boundaries, self.lengths)
+        self.epoch_stats_ = list()
+        self._random = np.random.default_rng(random_state)
+
+
+    def plan_epoch(self):
+        """
+        Split the images into batches for one epoch.
+
+        Returns:
+            batches (list[tuple]): A list of (positions in indices, padded length) for every batch.
+        """
+        batches = list()
+
+        for bucket in np.unique(self.buckets):
+            positions = np.flatnonzero(self.buckets == bucket)
+            if self.shuffle:
+                positions = self._random.permutation(positions)
+
+            for start in range(0, positions.shape[0], self.batch_size):
+                batches.append((positions[start:start + self.batch_size], int(self.boundaries[bucket])))
+
+        if self.shuffle:
+            batches = [batches[i] for i in self._random.permutation(len(batches))]
+
+        return batches
+
+
+    def __len__(self):
+        return sum(-(-np.count_nonzero(self.buckets == bucket) // self.batch_size) for bucket in np.unique(self.buckets))
+
+
+    def __iter__(self):
+        """
+        Iterate over the padded batches of one epoch, then record the epoch's padding statistics.
+
+        Yields:
+            X_batch (numpy.ndarray): A batch of shape (batch size, padded length, n_features).
+            y_batch (numpy.ndarray): The labels of the batch.
+        """
+        real_steps = 0
+        padded_steps = 0
+
+        for positions, padded_length in self.plan_epoch():
+            X_batch = np.full((positions.shape[0], padded_length, self.n_features), self.padding_value, dtype=self.dtype)
+
+            for row, i in enumerate(self.indices[positions]):
+                X_batch[row, :self.X[i].shape[0]] = self.X[i]
+
+            real_steps += int(self.lengths[positions].sum())
+            padded_steps += X_batch.shape[0] * padded_length
+
+            yield X_batch, self.y[self.indices[positions]]
+
+        self.epoch_stats_.append({
+            'epoch': len(self.epoch_stats_),
+            'real_steps': real_steps,
+            'padded_steps': padded_steps,
+            'padding_overhead': (padded_steps - real_steps) / real_steps if real_steps else 0.0,
+        })
+
+
+    def padding_overhead(self):
+        """
+        Compare the padding of the bucketed batches with padding every image to the longest one.
+
+        Returns:
+            overhead (dict): The fraction of padded time steps per real time step, for the buckets ('bucketed') and for padding to the longest image ('pad_to_max').
+        """
+        real_steps = self.lengths.sum()
+        bucketed_steps = self.boundaries[self.buckets].sum()
+        max_steps = self.lengths.max() * self.lengths.shape[0]
+
+        return {
+            'bucketed': (bucketed_steps - real_steps) / real_steps,
+            'pad_to_max': (max_steps - real_steps) / real_steps,
+        }
+
+
+    def to_tf_dataset(self, prefetch=None):
+        """
+        Wrap the batches into a tensorflow dataset, which reshuffles at every epoch, and prefetches batches while the model trains.
+
+        Args:
+            prefetch (int): The number of batches to prefetch, by default tensorflow.data.AUTOTUNE.
+
+        Returns:
+            dataset (tensorflow.data.Dataset): A dataset of (X_batch, y_batch), with a variable padded length.
+        """
+        import tensorflow as tf
+
+        dataset = tf.data.Dataset.from_generator(
+            self.__iter__,
+            output_signature=(
+                tf.TensorSpec(shape=(None, None, self.n_features), dtype=self.dtype),
+                tf.TensorSpec(shape=(None,), dtype=tf.as_dtype(self.y.dtype)),
+            )
+        )
+
+        return dataset.prefetch(tf.data.AUTOTUNE if prefetch is None else prefetch)
@@ -1,13 +1,16 @@
-from .helpers import is_parkinsonian
+from .helpers import label_parkinsonian
+from .grouping import contiguous_groups
+from dataaccess.recordingstore import RecordingStore
 import numpy as np
-from sklearn.model_selection import train_test_split as sktts
-from dataaccess.filedatareader import FileDataReader
+import pandas as pd
 
 
 def get_pd_hc_only(info, data):
     """
     Return data of only PDs and HCs.
 
+    The info dataframe may already be a cohort returned by select_cohort, in which case only its participants are kept, with their label.
+
     Args:
         info (pandas.core.frame.DataFrame): The info dataframe.
         data (pandas.core.frame.DataFrame): The data dataframe.
@@ -18,21 +21,25 @@ def get_pd_hc_only(info, data):
         data (pandas.core.frame.DataFrame): The filtered data dataframe.
     """
     label_key = 'PD'
-    if label_key in info.columns:
+    if label_key in data.columns:
         return info, data
 
-    info[label_key] = info.apply(is_parkinsonian, axis=1)
+    if label_key not in info.columns:
+        info[label_key] = label_parkinsonian(info)
     info = info[info[label_key]>=0]
     data = data.reset_index(['Language', 'Task'])
     data = info[[label_key]].merge(data, left_on='ID', right_on='ID')
     
     data.reset_index('ID', inplace=True)
-    data = FileDataReader('.')._postprocess_tasks_dataframe(data)
+    data.set_index(['ID', 'Language', 'Task'], inplace=True)
+    data.sort_index(inplace=True)
 
     return info, data
 
 
 def stratified_train_test_split(info, data, label_key, test_size=0.25, random_state=42):
+    from sklearn.model_selection import train_test_split as sktts
+
     df = data.groupby(['ID', 'Language', 'Task']).first()
     df.reset_index(['Language', 'Task'], inplace=True)
     df = df.merge(info, on='ID').reset_index('ID').set_index(['ID', 'Language', 'Task'])
@@ -55,44 +62,129 @@ def stratified_train_test_split(info, data, label_key, test_size=0.25, random_st
     return info_train, info_test, data_train, data_test
 
 
-def match_age_gender_pd(info, data):
+def _age_gender_matched_ids(df, label_key):
     """
-    Match PDs and HCs in age and gender.
+    Choose the participants kept by the age and gender matching, all the PDs, and as many randomly drawn HCs of the PDs' age range and genders.
 
     Args:
-        info (pandas.DataFrame): The info dataframe.
-        data (pandas.DataFrame): The data dataframe.
-        
+        df (pandas.DataFrame): The participants, indexed by ID, with their label, 'Age' and 'Gender'.
+        label_key (str): The label column, 1 for PD and 0 for HC.
+
     Returns:
-        info, data (pandas.DataFrame): An age and gender matched info and data dataframes.
+        to_keep (list): The IDs of the matched participants, the PDs first.
     """
-    df = info.merge(data.groupby('ID').first(), left_on='ID', right_on='ID')
-    min_age, max_age = df[df['PD_x']==1]['Age'].sort_values()[[0, -1]]
-    num_females, num_males = df[(df['PD_x']==1) & (df['Age']>=min_age) & (df['Age']<=max_age)].groupby('Gender').count()['Age'].sort_values()
-    age_matched_hcs = df[(df['PD_x']==0) & (df['Age']>=min_age) & (df['Age']<=max_age)]
+    min_age, max_age = df[df[label_key]==1]['Age'].sort_values().iloc[[0, -1]]
+    num_females, num_males = df[(df[label_key]==1) & (df['Age']>=min_age) & (df['Age']<=max_age)].groupby('Gender').count()['Age'].sort_values()
+    age_matched_hcs = df[(df[label_key]==0) & (df['Age']>=min_age) & (df['Age']<=max_age)]
     f_hcs = age_matched_hcs[age_matched_hcs['Gender']=='Female']
     m_hcs = age_matched_hcs[age_matched_hcs['Gender']=='Male']
 
-    import numpy as np
     np.random.seed(seed=42)
     f_ixs = np.random.choice(f_hcs.shape[0], num_females, replace=False)
     m_ixs = np.random.choice(m_hcs.shape[0], num_males, replace=False)
 
-    to_keep = list(df[df['PD_x']==1].index) + list(f_hcs.iloc[f_ixs].index) + list(m_hcs.iloc[m_ixs].index)
+    return list(df[df[label_key]==1].index) + list(f_hcs.iloc[f_ixs].index) + list(m_hcs.iloc[m_ixs].index)
+
+
+def match_age_gender_pd(info, data):
+    """
+    Match PDs and HCs in age and gender.
+
+    Args:
+        info (pandas.DataFrame): The info dataframe.
+        data (pandas.DataFrame): The data dataframe.
+        
+    Returns:
+        info, data (pandas.DataFrame): An age and gender matched info and data dataframes.
+    """
+    df = info.merge(data.groupby('ID').first(), left_on='ID', right_on='ID')
+    to_keep = _age_gender_matched_ids(df, 'PD_x')
     
     return info.loc[to_keep], data.loc[to_keep]
 
 
-def get_samples(data, label_key):
-    X = list()
-    y = list()
+def select_cohort(info, label_key='PD', match_age_gender=True):
+    """
+    Select the PDs and HCs, and optionally match them in age and gender, from the info dataframe alone, so that only their task files have to be read.
+
+    The cohort is the same as get_pd_hc_only followed by match_age_gender_pd, as long as every participant has data for the loaded tasks.
+
+    Example:
+        cohort = select_cohort(reader.load_french(info_only=True))
+        data = reader.load_french(tasks=[3], data_only=True, participants=cohort.index)
+        info, data = get_pd_hc_only(cohort, data)
+
+    Args:
+        info (pandas.DataFrame): The info dataframe, indexed by ID.
+        label_key (str): The name of the label column added to the cohort.
+        match_age_gender (bool): Whether to keep only as many HCs as PDs, matched in age and gender, like match_age_gender_pd.
+
+    Returns:
+        cohort (pandas.DataFrame): The info of the selected participants, with the label column, 1 for PD and 0 for HC.
+    """
+    cohort = info.assign(**{label_key: label_parkinsonian(info)})
+    cohort = cohort[cohort[label_key]>=0]
+
+    if match_age_gender:
+        cohort = cohort.loc[_age_gender_matched_ids(cohort, label_key)]
+
+    return cohort
+
+
+def get_samples(data, label_key, flat=False, dtype=None):
+    """
+    Turn HW data into a list of images and their labels.
+
+    The dataframe is grouped once, and its values are split into the images in a single pass, the images being views into one contiguous array.
+
+    Args:
+        data (pandas.core.frame.DataFrame, RecordingStore or iterable): The HW dataframe, a RecordingStore whose meta holds the label, e.g. loaded memory-mapped so that the images are views of its file rather than a copy in memory, or an iterable of (participant_info, recording) pairs as yielded by the readers' iter_recordings, which is consumed one recording at a time.
+        label_key (str): The label column.
+        flat (bool): Set to True to get the images as one flat array plus offsets, instead of a list of arrays.
+        dtype (str): The dtype of the images, e.g. 'float32' like the padded sequences fed to the models, by default the common dtype of the columns.
+
+    Returns:
+        X (list(numpy.ndarray)): The images, without the label column, if flat is False.
+        samples, offsets (numpy.ndarray, numpy.ndarray): The rows of all the images one after the other, and the start of every image followed by the number of rows, if flat is True.
+        y (numpy.ndarray): The label of each image.
+    """
+    if isinstance(data, RecordingStore):
+        # the images are the sample columns of the store, without any copy unless a dtype is given
+        samples = data.samples if dtype is None else data.samples.astype(dtype)
+        y = data.meta[label_key].to_numpy()
+
+        if flat:
+            return samples, data.offsets, y
+
+        return [samples[start:stop] for start, stop in zip(data.offsets[:-1], data.offsets[1:])], y
+
+    if not isinstance(data, pd.DataFrame):
+        X = list()
+        y = list()
+
+        for _, recording in data:
+            X.append(recording.drop(columns=label_key).to_numpy(dtype=dtype))
+            y.append(recording[label_key].iloc[0])
+
+        if flat:
+            offsets = np.cumsum([0] + [x.shape[0] for x in X])
+            samples = np.concatenate(X) if X else np.empty((0, 0), dtype=dtype)
+            return samples, offsets, np.array(y)
+
+        return X, np.array(y)
+
+    data, starts = contiguous_groups(data)
+
     cols = list(data.columns)
     cols.remove(label_key)
-    
-    for ix in data.index.unique():
-        X.append(data.loc[ix][cols].values)
-        y.append(data.loc[ix].iloc[0][label_key])
 
-    y = np.array(y)
+    samples = data[cols].to_numpy(dtype=dtype)
+    y = data[label_key].to_numpy()[starts]
+
+    if flat:
+        return samples, np.append(starts, samples.shape[0]), y
+
+    if starts.shape[0] == 0:
+        return list(), y
 
-    return X, y
\ No newline at end of file
+    return np.split(samples, starts[1:]), y
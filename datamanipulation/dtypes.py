@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+
+
+# the integer dtypes the raw columns can be narrowed to, from the narrowest
+_RAW_DTYPES = [np.dtype(np.int8), np.dtype(np.int16), np.dtype(np.int32), np.dtype(np.int64)]
+
+CATEGORICAL_COLUMNS = ['ID', 'Participant', 'Language', 'Task']
+
+
+class DtypePolicy:
+    """
+    The dtypes the HW data is kept in, from the loaders to the samples fed to the models.
+
+    Attributes:
+        raw (str): The integer dtype of the raw columns, e.g. 'int16', a column whose values don't fit in it is kept in the narrowest wider dtype that fits them.
+        categorical (bool): Whether the 'ID', 'Participant', 'Language' and 'Task' columns are stored as pandas categoricals, instead of a python object or an int64 per row.
+        features (str): The float dtype of the extracted features, the standardized columns and the samples.
+    """
+
+
+    def __init__(self, raw='int32', categorical=False, features='float64'):
+        """
+        Initializes a new DtypePolicy.
+
+        Args:
+            raw (str): The integer dtype of the raw columns, one of 'int8', 'int16', 'int32' or 'int64'.
+            categorical (bool): Whether the 'ID', 'Participant', 'Language' and 'Task' columns are stored as pandas categoricals.
+            features (str): The float dtype of the extracted features, 'float32' or 'float64'.
+        """
+        assert np.dtype(raw) in _RAW_DTYPES, "The raw dtype should be one of " + str([str(dtype) for dtype in _RAW_DTYPES]) + "."
+        assert np.dtype(features) in [np.dtype(np.float32), np.dtype(np.float64)], "The features dtype should be 'float32' or 'float64'."
+
+        self.raw = str(np.dtype(raw))
+        self.categorical = categorical
+        self.features = str(np.dtype(features))
+
+
+    def __repr__(self):
+        return 'DtypePolicy(raw=%r, categorical=%r, features=%r)' % (self.raw, self.categorical, self.features)
+
+
+    def raw_dtype(self, values):
+        """
+        Find the narrowest dtype, at least as wide as the raw dtype of the policy, that holds some integer values.
+
+        Args:
+            values (numpy.ndarray): The integer values.
+
+        Returns:
+            dtype (numpy.dtype): The dtype the values can be cast to without overflowing.
+        """
+        candidates = _RAW_DTYPES[_RAW_DTYPES.index(np.dtype(self.raw)):]
+
+        if values.size == 0:
+            return candidates[0]
+
+        low, high = values.min(), values.max()
+        for dtype in candidates:
+            if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                return dtype
+
+        return candidates[-1]
+
+
+    def cast_raw(self, values):
+        """
+        Cast an integer array to the raw dtype of the policy, or to the narrowest wider dtype that holds its values.
+
+        Args:
+            values (numpy.ndarray): The integer values, e.g. the samples of all the images as parsed by the readers.
+
+        Returns:
+            values (numpy.ndarray): The values in their new dtype, the array itself if it doesn't change.
+        """
+        return values.astype(self.raw_dtype(values), copy=False)
+
+
+    def raw_dataframe(self, hw_data, header):
+        """
+        Build a dataframe of raw columns, each cast to the raw dtype of the policy, or to the narrowest wider dtype that holds its values.
+
+        Args:
+            hw_data (numpy.ndarray): The integer samples, with a column per header.
+            header (list[str]): The names of the columns.
+
+        Returns:
+            data (pandas.core.frame.DataFrame): The dataframe, a single block without a copy when all the columns keep the dtype of hw_data.
+        """
+        dtypes = [self.raw_dtype(hw_data[:, i]) for i in range(len(header))]
+
+        if len(set(dtypes)) <= 1:
+            return pd.DataFrame(hw_data.astype(dtypes[0] if dtypes else hw_data.dtype, copy=False), columns=header)
+
+        return pd.DataFrame({col: hw_data[:, i].astype(dtype) for i, (col, dtype) in enumerate(zip(header, dtypes))})
+
+
+    def repeated_column(self, labels, counts, dtype=object):
+        """
+        Build a column repeating every label a number of times, e.g. the ID of every participant for each of its samples, without building a python object per row when the policy is categorical.
+
+        Args:
+            labels (list): The labels.
+            counts (list[int]): The number of times each label is repeated.
+            dtype (numpy.dtype): The dtype of the column when the policy isn't categorical.
+
+        Returns:
+            column (numpy.ndarray or pandas.Categorical): The labels, repeated.
+        """
+        codes = np.repeat(np.arange(len(labels)), counts)
+
+        if not self.categorical:
+            return np.array(labels, dtype=dtype)[codes]
+
+        # the labels may repeat, e.g. the same language for several participants
+        categories, label_codes = np.unique(np.array(labels, dtype=dtype), return_inverse=True)
+
+        return pd.Categorical.from_codes(label_codes[codes], categories=categories)
+
+
+    def cast_features(self, data, exclude=[]):
+        """
+        Cast the float columns of a dataframe to the features dtype of the policy.
+
+        Args:
+            data (pandas.core.frame.DataFrame): The dataframe, which is modified in place.
+            exclude (list[str]): The columns to leave untouched.
+
+        Returns:
+            data (pandas.core.frame.DataFrame): The same dataframe.
+        """
+        for col in data.columns:
+            if col not in exclude and pd.api.types.is_float_dtype(data[col].dtype) and data[col].dtype != np.dtype(self.features):
+                data[col] = data[col].to_numpy().astype(self.features)
+
+        return data
+
+
+    def apply(self, data, exclude=[]):
+        """
+        Cast the columns of a dataframe with respect to the policy: the integer columns to the raw dtype, the float columns to the features dtype, and the 'ID', 'Participant', 'Language' and 'Task' columns to categoricals if the policy is categorical, the index is left untouched.
+
+        Args:
+            data (pandas.core.frame.DataFrame): The dataframe, which is modified in place.
+            exclude (list[str]): The columns to leave untouched, e.g. the label.
+
+        Returns:
+            data (pandas.core.frame.DataFrame): The same dataframe.
+        """
+        for col in data.columns:
+            if col in exclude:
+                continue
+
+            if col in CATEGORICAL_COLUMNS:
+                if self.categorical and not isinstance(data[col].dtype, pd.CategoricalDtype):
+                    data[col] = data[col].astype('category')
+            elif pd.api.types.is_integer_dtype(data[col].dtype):
+                data[col] = self.cast_raw(data[col].to_numpy())
+
+        return self.cast_features(data, exclude + CATEGORICAL_COLUMNS)
+
+
+# the dtypes the data was always kept in
+DEFAULT_POLICY = DtypePolicy()
+
+# the narrowest dtypes that keep the features of a recording of the HW datasets
+COMPACT_POLICY = DtypePolicy(raw='int16', categorical=True, features='float32')
+
+
+def get_policy(policy):
+    """
+    Get a dtype policy by name.
+
+    Args:
+        policy (DtypePolicy or str or None): A policy, 'default' or 'compact', None for the default policy.
+
+    Returns:
+        policy (DtypePolicy): The policy.
+    """
+    if isinstance(policy, DtypePolicy):
+        return policy
+
+    policies = {None: DEFAULT_POLICY, 'default': DEFAULT_POLICY, 'compact': COMPACT_POLICY}
+    assert policy in policies, "The dtype policy should be a DtypePolicy, 'default' or 'compact'."
+
+    return policies[policy]
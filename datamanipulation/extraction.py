@@ -1,7 +1,15 @@
+import logging
 import numpy as np
-from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.base import BaseEstimator, TransformerMixin, clone
 import pandas as pd
 from sklearn.pipeline import Pipeline
+from .featurecache import pipe_signature
+from .grouping import group_starts, grouped_change, replace_inf, contiguous_groups
+from .dtypes import get_policy
+from monitoring.stages import stage
+
+
+logger = logging.getLogger('pd_classification')
 
 
 class ChangeExtractor(BaseEstimator, TransformerMixin):
@@ -20,9 +28,7 @@ class ChangeExtractor(BaseEstimator, TransformerMixin):
 
     def transform(self, X, y=None):
         X_copy = X.copy()
-        change = X_copy[self.col_key].diff()
-        change.iloc[0] = X_copy[self.col_key].iloc[0]
-        X_copy[self.new_col_name] = change
+        X_copy[self.new_col_name] = grouped_change(X_copy[self.col_key], group_starts(X_copy))
         return X_copy
 
 
@@ -46,9 +52,10 @@ class ConvSmoothingExtractor(BaseEstimator, TransformerMixin):
 
     def transform(self, X, y=None):
         X_copy = X.copy()
-        values = X_copy[self.col_key]
-        smoothed = np.convolve(values, np.ones(self.window_size)/self.window_size, mode=self.mode)
-        X_copy[self.new_col_name] = smoothed
+        values = X_copy[self.col_key].to_numpy()
+        kernel = np.ones(self.window_size)/self.window_size
+        smoothed = [np.convolve(recording, kernel, mode=self.mode) for recording in np.split(values, group_starts(X_copy)[1:])]
+        X_copy[self.new_col_name] = np.concatenate(smoothed) if smoothed else values
         return X_copy
 
 
@@ -60,7 +67,7 @@ class ROCExtractor(BaseEstimator, TransformerMixin):
         Args:
             numerator_key (str): The key of the first column, where you want to track the change in numerator_key with respect to the change in denominator_key.
             denominator_key (int): The key of the second column, where you want to track the change in numerator_key with respect to the change in denominator_key.
-            handle_inf (function): A function that takes a number, and returns a new value to replace it, this is used to handle infinity values.
+            handle_inf (bool): Whether to replace the infinities of the rate of change by the finite extremes of their recording, and its NaNs by 0.
         """
         self.numerator_key = numerator_key
         self.denominator_key = denominator_key
@@ -70,16 +77,6 @@ class ROCExtractor(BaseEstimator, TransformerMixin):
     def fit(self, X, y=None):
         return self
 
-    def handle_inf_val(self, x, lowest_finite, highest_finite):
-            if np.isneginf(x):
-                return lowest_finite
-            elif np.isposinf(x):
-                return highest_finite
-            elif np.isnan(x):
-                return 0
-            else:
-                return x
-
     def transform(self, X, y=None):
         X_copy = X.copy()
         num_change_ext = ChangeExtractor(self.numerator_key)
@@ -88,9 +85,7 @@ class ROCExtractor(BaseEstimator, TransformerMixin):
         denom_change = denom_change_ext.transform(X_copy)[denom_change_ext.new_col_name]
         roc = num_change / denom_change
         if self.handle_inf:
-            highest_finite = roc.sort_values().unique()[-3 if True in roc.isna().unique() else -2]
-            lowest_finite = roc.sort_values().unique()[1]
-            roc = roc.apply(lambda x: self.handle_inf_val(x, lowest_finite, highest_finite))
+            roc = replace_inf(roc, group_starts(X_copy))
         X_copy[self.new_col_name] = roc
         return X_copy
 
@@ -133,16 +128,6 @@ class VelocityExtractor(BaseEstimator, TransformerMixin):
     def fit(self, X, y=None):
         return self
 
-    def handle_inf_val(self, x, lowest_finite, highest_finite):
-            if np.isneginf(x):
-                return lowest_finite
-            elif np.isposinf(x):
-                return highest_finite
-            elif np.isnan(x):
-                return 0
-            else:
-                return x
-
     def transform(self, X, y=None):
         X_copy = X.copy()
         num_change_ext = DistanceExtractor(('X', 'Y'))
@@ -151,9 +136,7 @@ class VelocityExtractor(BaseEstimator, TransformerMixin):
         denom_change = denom_change_ext.transform(X_copy)[denom_change_ext.new_col_name]
         roc = num_change / denom_change
         if self.handle_inf:
-            highest_finite = roc.sort_values().unique()[-3 if True in roc.isna().unique() else -2]
-            lowest_finite = roc.sort_values().unique()[1]
-            roc = roc.apply(lambda x: self.handle_inf_val(x, lowest_finite, highest_finite))
+            roc = replace_inf(roc, group_starts(X_copy))
         X_copy[self.new_col_name] = roc
         return X_copy
 
@@ -172,11 +155,146 @@ class SlantExtractor(BaseEstimator, TransformerMixin):
         num_change = num_change_ext.transform(X_copy)[num_change_ext.new_col_name]
         denom_change = denom_change_ext.transform(X_copy)[denom_change_ext.new_col_name]
         roc = np.rad2deg(np.arctan(num_change / denom_change))
-        roc = roc.apply(lambda x: 0 if np.isnan(x) else x)
+        roc = roc.fillna(0)
         X_copy[self.new_col_name] = roc
         return X_copy
 
 
+def _same(starts, handle_inf, values):
+    return values
+
+
+def _distance(starts, handle_inf, change):
+    return np.abs(change)
+
+
+def _distance_2d(starts, handle_inf, change_x, change_y):
+    return np.sqrt(change_x**2 + change_y**2)
+
+
+def _roc(starts, handle_inf, num_change, denom_change):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        roc = num_change / denom_change
+    return replace_inf(roc, starts) if handle_inf else roc
+
+
+def _slant(starts, handle_inf, change_y, change_x):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slant = np.rad2deg(np.arctan(change_y / change_x))
+    slant[np.isnan(slant)] = 0
+    return slant
+
+
+def _change(starts, handle_inf, values):
+    return grouped_change(values, starts)
+
+
+# The kinematic features and their intermediates, each mapped to the function computing it, and the names of its inputs, which are either raw columns or other nodes.
+FEATURE_GRAPH = {
+    'Change time': (_change, ('Time',)),
+    'Change x': (_change, ('X',)),
+    'Change y': (_change, ('Y',)),
+    'Change p': (_change, ('P',)),
+    'Change al': (_change, ('Al',)),
+    'Change az': (_change, ('Az',)),
+
+    'Displacement x': (_same, ('Change x',)),
+    'Displacement y': (_same, ('Change y',)),
+
+    'Distance x': (_distance, ('Change x',)),
+    'Distance y': (_distance, ('Change y',)),
+    'Distance x-y': (_distance_2d, ('Change x', 'Change y')),
+
+    'Velocity x': (_roc, ('Change x', 'Change time')),
+    'Velocity y': (_roc, ('Change y', 'Change time')),
+    'Velocity x-y': (_roc, ('Distance x-y', 'Change time')),
+
+    'Change velocity x': (_change, ('Velocity x',)),
+    'Change velocity y': (_change, ('Velocity y',)),
+    'Change velocity x-y': (_change, ('Velocity x-y',)),
+    'Acceleration x': (_roc, ('Change velocity x', 'Change time')),
+    'Acceleration y': (_roc, ('Change velocity y', 'Change time')),
+    'Acceleration x-y': (_roc, ('Change velocity x-y', 'Change time')),
+
+    'Change acceleration x': (_change, ('Acceleration x',)),
+    'Change acceleration y': (_change, ('Acceleration y',)),
+    'Change acceleration x-y': (_change, ('Acceleration x-y',)),
+    'Jerk x': (_roc, ('Change acceleration x', 'Change time')),
+    'Jerk y': (_roc, ('Change acceleration y', 'Change time')),
+    'Jerk x-y': (_roc, ('Change acceleration x-y', 'Change time')),
+
+    'ROC p / time': (_roc, ('Change p', 'Change time')),
+    'ROC al / time': (_roc, ('Change al', 'Change time')),
+    'ROC az / time': (_roc, ('Change az', 'Change time')),
+
+    'Slope': (_roc, ('Change y', 'Change x')),
+    'Slant': (_slant, ('Change y', 'Change x')),
+}
+
+DEFAULT_FEATURES = [
+    'Displacement x', 'Displacement y',
+    'Distance x', 'Distance y', 'Distance x-y',
+    'Velocity x', 'Velocity y', 'Velocity x-y',
+    'Acceleration x', 'Acceleration y', 'Acceleration x-y',
+    'Jerk x', 'Jerk y', 'Jerk x-y',
+    'ROC p / time', 'ROC al / time', 'ROC az / time',
+    'Slope', 'Slant',
+]
+
+
+class FeatureGraphExtractor(BaseEstimator, TransformerMixin):
+    def __init__(self, features=None, handle_inf=True, copy=True, dtype=None):
+        """
+        Initilize the feature graph extractor, which computes every intermediate of FEATURE_GRAPH (e.g. the change in time) once, and only the nodes needed by the requested features.
+
+        Args:
+            features (list[str]): The features to add as columns, in order, defaults to DEFAULT_FEATURES, which gives the same columns as feature_extraction_pipe.
+            handle_inf (bool): Whether to replace the infinities of the rates of change by the finite extremes of their recording, and their NaNs by 0.
+            copy (bool): Whether to add the features to a copy of X, or to X itself.
+            dtype (str): The dtype of the feature columns, e.g. 'float32', the intermediates are still computed in float64, by default the features are float64.
+        """
+        self.features = features
+        self.handle_inf = handle_inf
+        self.copy = copy
+        self.dtype = dtype
+
+    def fit(self, X, y=None):
+        features = DEFAULT_FEATURES if self.features is None else self.features
+        unknown_features = [feature for feature in features if feature not in FEATURE_GRAPH]
+        assert len(unknown_features) == 0, "The following features don't exist: " + str(unknown_features)
+        return self
+
+    def _compute(self, node, X, starts, values):
+        if node in values:
+            return values[node]
+
+        if node not in FEATURE_GRAPH:
+            values[node] = X[node].to_numpy()
+            return values[node]
+
+        func, inputs = FEATURE_GRAPH[node]
+        args = [self._compute(input_node, X, starts, values) for input_node in inputs]
+        values[node] = func(starts, self.handle_inf, *args)
+
+        return values[node]
+
+    def transform(self, X, y=None):
+        self.fit(X)
+
+        X_out = X.copy() if self.copy else X
+        starts = group_starts(X)
+        values = dict()
+
+        for feature in (DEFAULT_FEATURES if self.features is None else self.features):
+            feature_values = self._compute(feature, X, starts, values)
+            X_out[feature] = feature_values if self.dtype is None else feature_values.astype(self.dtype)
+
+        return X_out
+
+
+feature_extraction_graph = FeatureGraphExtractor()
+
+
 feature_extraction_pipe = Pipeline([
     ('disp_x', ChangeExtractor('X', new_col_name='Displacement x')),
     ('disp_y', ChangeExtractor('Y', new_col_name='Displacement y')),
@@ -208,32 +326,119 @@ feature_extraction_pipe = Pipeline([
 ])
 
 
-def extract_features(data, pipe=feature_extraction_pipe):
+def _iter_extract_features(recordings, pipe, policy=None):
     """
-    Extract features from data, using a pipeline that can be applied to each image in the data.
+    Extract features from a stream of recordings, one recording at a time.
 
     Args:
-        data (pandas.core.frame.DataFrame): The HW dataframe.
-        pipe (scikit-learn Pipeline object): The pipeline to be applied to each image in 'data'.
+        recordings (iterable): An iterable of (participant_info, recording) pairs, as yielded by the readers' iter_recordings.
+        pipe (scikit-learn Pipeline object): The pipeline to be applied to each recording.
+        policy (DtypePolicy): The dtypes of the features, by default they are left as the pipeline computes them.
+
+    Yields:
+        participant_info (dict): The information of the participant.
+        ext_recording (pandas.core.frame.DataFrame): The recording with the extracted features.
+    """
+    for participant_info, recording in recordings:
+        ext_recording = pipe.transform(recording)
+        yield participant_info, ext_recording if policy is None else policy.cast_features(ext_recording)
+
+
+def _extract_features_cached(data, pipe, cache):
+    """
+    Extract features from data, taking the images that are in the cache from it, and computing the others in a single pass.
+
+    Args:
+        data (pandas.core.frame.DataFrame): The HW dataframe, with the rows of each image next to each other.
+        pipe (scikit-learn transformer): The pipeline to be applied to each image in 'data'.
+        cache (FeatureCache): The cache of the features.
 
     Returns:
         data_extracted (Pandas DataFrame): The new dataframe with extracted features.
     """
-    print('Started extracting features.')
-    indexes = data.index.unique()
+    signature = pipe_signature(pipe) + str(list(data.columns)) + str(list(data.dtypes))
+    # a column at a time, since the array of the whole dataframe would hold pointers if any column is an object column
+    columns = [data[col].to_numpy() for col in data.columns]
+    bounds = np.append(group_starts(data), data.shape[0])
+
+    keys = [cache.key(signature, [values[start:stop] for values in columns]) for start, stop in zip(bounds[:-1], bounds[1:])]
+    results = [cache.get(key) for key in keys]
+
+    for i, features in enumerate(results):
+        if features is not None:
+            results[i] = features.set_axis(data.index[bounds[i]:bounds[i + 1]], axis=0)
+
+    missing = [i for i, features in enumerate(results) if features is None]
+    if missing:
+        rows = np.concatenate([np.arange(bounds[i], bounds[i + 1]) for i in missing])
+        computed = pipe.transform(data.iloc[rows])
+        computed_bounds = np.cumsum([0] + [bounds[i + 1] - bounds[i] for i in missing])
+
+        for i, start, stop in zip(missing, computed_bounds[:-1], computed_bounds[1:]):
+            results[i] = computed.iloc[start:stop]
+            cache.put(keys[i], results[i])
+
+    return pd.concat(results)
+
+
+def _with_policy(pipe, policy):
+    """
+    Make the feature graph extractor compute its features directly in the dtype of a policy, so that a float64 copy of the features is never built.
+
+    Args:
+        pipe (scikit-learn transformer): The pipeline.
+        policy (DtypePolicy): The dtypes of the features.
+
+    Returns:
+        pipe (scikit-learn transformer): The pipeline, or a copy of the feature graph extractor with the dtype of the policy.
+    """
+    if isinstance(pipe, FeatureGraphExtractor) and pipe.dtype is None and policy.features != 'float64':
+        return clone(pipe).set_params(dtype=policy.features)
+
+    return pipe
+
+
+def extract_features(data, pipe=feature_extraction_graph, cache=None, dtype_policy=None):
+    """
+    Extract features from data, using a pipeline that can be applied to each image in the data.
+
+    The pipeline is applied once to the whole dataframe, the extractors restart their computations at the start of every image.
+
+    Args:
+        data (pandas.core.frame.DataFrame or iterable): The HW dataframe, or an iterable of (participant_info, recording) pairs as yielded by the readers' iter_recordings, to extract features in a streaming fashion.
+        pipe (scikit-learn transformer): The pipeline to be applied to each image in 'data', defaults to feature_extraction_graph, which gives the same features as feature_extraction_pipe with each intermediate computed once.
+        cache (FeatureCache): A cache of the features of every image, keyed by the image's samples and the pipeline's parameters, so that only new images, or images extracted with a different pipeline, are computed, by default nothing is cached.
+        dtype_policy (DtypePolicy or str): The dtypes of the features, e.g. 'compact' for float32 features, by default they are left as the pipeline computes them, i.e. float64.
+
+    Returns:
+        data_extracted (Pandas DataFrame or generator): The new dataframe with extracted features, or a generator of (participant_info, recording) pairs with the extracted features when data is an iterable of recordings.
+    """
+    policy = None if dtype_policy is None else get_policy(dtype_policy)
+    if policy is not None:
+        pipe = _with_policy(pipe, policy)
+
+    if not isinstance(data, pd.DataFrame):
+        return _iter_extract_features(data, pipe, policy)
+
+    logger.info('Started extracting features.')
+
+    with stage('extract_features', cached=cache is not None) as record:
+        data, starts = contiguous_groups(data)
 
-    data_extracted = None
+        single_level = not isinstance(data.index, pd.MultiIndex)
+        if single_level:
+            data = data.set_axis(pd.MultiIndex.from_arrays([data.index]), axis=0)
 
-    for ix in indexes:
-        img = data.loc[ix]
+        data_extracted = pipe.transform(data) if cache is None else _extract_features_cached(data, pipe, cache)
 
-        ext_img = pipe.transform(img)
+        if policy is not None:
+            policy.cast_features(data_extracted)
 
-        if data_extracted is None:
-            data_extracted = ext_img
-            continue
+        if single_level:
+            data_extracted.index = data_extracted.index.get_level_values(0)
 
-        data_extracted = pd.concat([data_extracted, ext_img])
+        record.count('recordings', starts.shape[0])
+        record.count('samples', data_extracted.shape[0])
     
     print('The following features were extracted successfully:', list(data_extracted.columns[7:]))
     print('Number of features:', data_extracted.columns[7:].shape[0])
@@ -0,0 +1,167 @@
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+
+
+# part of every signature, to be increased whenever the computation of the features changes (e.g. FEATURE_GRAPH, replace_inf), so that the features cached by the previous code, e.g. in a spill directory, aren't served anymore
+FEATURE_CACHE_VERSION = 1
+
+
+def _column_bytes(values):
+    """
+    Get the bytes a column of a recording is keyed by.
+
+    Args:
+        values (numpy.ndarray): The values of the column.
+
+    Returns:
+        data (bytes): The buffer of a numeric column, or the hashes of the values of any other column, whose buffer holds pointers to the values.
+    """
+    if values.dtype.kind in 'biufcmM':
+        return np.ascontiguousarray(values).tobytes()
+
+    return pd.util.hash_array(np.asarray(values, dtype=object)).tobytes()
+
+
+def pipe_signature(pipe):
+    """
+    Describe the parameters of a transformer, or of every step of a pipeline, as a string.
+
+    Args:
+        pipe (scikit-learn transformer): The pipeline whose parameters (window_size, handle_inf, column keys...) the features depend on.
+
+    Returns:
+        signature (str): A JSON string of the parameters, where the non primitive values are replaced by their type, and of FEATURE_CACHE_VERSION.
+    """
+    params = {'': pipe, '__version__': FEATURE_CACHE_VERSION}
+    params.update(pipe.get_params(deep=True))
+
+    described = dict()
+    for key, value in params.items():
+        if value is None or isinstance(value, (str, int, float, bool)):
+            described[key] = value
+        elif isinstance(value, (tuple, list)) and all(v is None or isinstance(v, (str, int, float, bool)) for v in value):
+            described[key] = list(value)
+        else:
+            described[key] = type(value).__module__ + '.' + getattr(value, '__qualname__', type(value).__qualname__)
+
+    return json.dumps(described, sort_keys=True)
+
+
+class FeatureCache:
+    """
+    A content-addressed cache of extracted features, with a bounded in-memory LRU that spills evicted entries to disk.
+
+    Attributes:
+        max_entries (int): The maximum number of recordings kept in memory.
+        spill_dir (pathlib.Path): The directory the evicted entries are spilled to, None to drop them.
+        hits (int): The number of lookups served from memory.
+        disk_hits (int): The number of lookups served from the spill directory.
+        misses (int): The number of lookups that found nothing.
+        evictions (int): The number of entries evicted from memory.
+    """
+
+
+    def __init__(self, max_entries=1024, spill_dir=None):
+        """
+        Initializes a new FeatureCache.
+
+        Args:
+            max_entries (int): The maximum number of recordings kept in memory, defaults to 1024.
+            spill_dir (str or pathlib.Path): The directory the evicted entries are spilled to, by default they are dropped.
+        """
+        assert max_entries >= 1, "The cache should hold at least one entry."
+
+        self.max_entries = max_entries
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def key(self, signature, recording):
+        """
+        Compute the key of a recording's features.
+
+        Args:
+            signature (str): The signature of the pipeline, and of the recording's columns, see pipe_signature.
+            recording (numpy.ndarray or list[numpy.ndarray]): The raw samples of the recording, one per row, or its columns, which may have different dtypes.
+
+        Returns:
+            key (str): The hexadecimal digest of the signature and samples.
+        """
+        columns = list(recording.T) if isinstance(recording, np.ndarray) else recording
+
+        digest = hashlib.blake2b(signature.encode('utf-8'), digest_size=20)
+        for values in columns:
+            values = np.asarray(values)
+            digest.update((values.dtype.str + str(values.shape)).encode('utf-8'))
+            digest.update(_column_bytes(values))
+
+        return digest.hexdigest()
+
+
+    def get(self, key):
+        """
+        Look up the features of a recording.
+
+        Args:
+            key (str): The key of the recording, see key.
+
+        Returns:
+            features (pandas.core.frame.DataFrame): The cached features, None if they aren't cached.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        if self.spill_dir is not None and (self.spill_dir / (key + '.pkl')).exists():
+            features = pd.read_pickle(self.spill_dir / (key + '.pkl'))
+            self.disk_hits += 1
+            self._store(key, features)
+            return features
+
+        self.misses += 1
+
+        return None
+
+
+    def put(self, key, features):
+        """
+        Cache the features of a recording.
+
+        Args:
+            key (str): The key of the recording, see key.
+            features (pandas.core.frame.DataFrame): The features, the cache keeps its own copy.
+        """
+        self._store(key, features.copy())
+
+
+    def _store(self, key, features):
+        self._entries[key] = features
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self.evictions += 1
+
+            if self.spill_dir is not None and not (self.spill_dir / (evicted_key + '.pkl')).exists():
+                self.spill_dir.mkdir(parents=True, exist_ok=True)
+                evicted.to_pickle(self.spill_dir / (evicted_key + '.pkl'))
+
+
+    def counters(self):
+        """
+        Get the counters of the cache.
+
+        Returns:
+            counters (dict): The hits, disk_hits, misses and evictions.
+        """
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses, 'evictions': self.evictions}
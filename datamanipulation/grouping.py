@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+
+def group_starts(X):
+    """
+    Find where each recording starts in a HW dataframe.
+
+    Recordings are the runs of equal index entries of a MultiIndexed dataframe (e.g. indexed by ['ID', 'Language', 'Task']), any other dataframe is taken as a single recording.
+
+    Args:
+        X (pandas.core.frame.DataFrame): The HW dataframe, with the rows of each recording next to each other.
+
+    Returns:
+        starts (numpy.ndarray): The position of the first row of each recording.
+    """
+    if X.shape[0] == 0:
+        return np.empty(0, dtype=np.int64)
+
+    if not isinstance(X.index, pd.MultiIndex):
+        return np.zeros(1, dtype=np.int64)
+
+    codes = np.vstack(X.index.codes)
+    changed = (codes[:, 1:] != codes[:, :-1]).any(axis=0)
+
+    return np.flatnonzero(np.concatenate(([True], changed)))
+
+
+def grouped_change(values, starts):
+    """
+    Calculate the change between consecutive values, restarting at each recording, where the change of the first value is the value itself.
+
+    Args:
+        values (array-like): The values.
+        starts (numpy.ndarray): The position of the first row of each recording.
+
+    Returns:
+        change (numpy.ndarray): The float64 change of each value.
+    """
+    values = np.asarray(values, dtype=np.float64)
+
+    change = np.empty_like(values)
+    change[1:] = values[1:] - values[:-1]
+    change[starts] = values[starts]
+
+    return change
+
+
+def replace_inf(roc, starts):
+    """
+    Replace, within each recording, -inf by the lowest finite value, inf by the highest finite value, and NaN by 0.
+
+    Args:
+        roc (array-like): The values.
+        starts (numpy.ndarray): The position of the first row of each recording.
+
+    Returns:
+        roc (numpy.ndarray): The float64 values without infinities nor NaNs.
+    """
+    roc = np.array(roc, dtype=np.float64)
+    if roc.shape[0] == 0:
+        return roc
+
+    finite = np.isfinite(roc)
+    if finite.all():
+        # e.g. the rates over the time of uniformly resampled recordings
+        return roc
+
+    lengths = np.diff(np.append(starts, roc.shape[0]))
+
+    lowest_finite = np.minimum.reduceat(np.where(finite, roc, np.inf), starts)
+    highest_finite = np.maximum.reduceat(np.where(finite, roc, -np.inf), starts)
+    lowest_finite[~np.isfinite(lowest_finite)] = 0
+    highest_finite[~np.isfinite(highest_finite)] = 0
+
+    neg_inf = np.isneginf(roc)
+    pos_inf = np.isposinf(roc)
+    roc[neg_inf] = np.repeat(lowest_finite, lengths)[neg_inf]
+    roc[pos_inf] = np.repeat(highest_finite, lengths)[pos_inf]
+    roc[np.isnan(roc)] = 0
+
+    return roc
+
+
+def contiguous_groups(data):
+    """
+    Gather the rows of every recording next to each other, the recordings keeping the order of their first appearance, and find where each one starts.
+
+    Recordings are the rows sharing the same index entry, e.g. the same ['ID', 'Language', 'Task'].
+
+    Args:
+        data (pandas.core.frame.DataFrame): The HW dataframe.
+
+    Returns:
+        data (pandas.core.frame.DataFrame): The dataframe, reordered only if the rows of a recording weren't next to each other.
+        starts (numpy.ndarray): The position of the first row of each recording.
+    """
+    if data.shape[0] == 0:
+        return data, np.empty(0, dtype=np.int64)
+
+    codes = pd.factorize(data.index)[0]
+
+    if (np.diff(codes) < 0).any():
+        order = np.argsort(codes, kind='stable')
+        data = data.iloc[order]
+        codes = codes[order]
+
+    return data, np.flatnonzero(np.diff(codes, prepend=-1))
@@ -1,3 +1,7 @@
+import numpy as np
+import pandas as pd
+
+
 def is_parkinsonian(participant_series):
     """
     Check if a participant is parkinsonian or not.
@@ -20,3 +24,31 @@ def is_parkinsonian(participant_series):
             return 1
     return -1
 
+
+def label_parkinsonian(info):
+    """
+    Check which participants are parkinsonian, for a whole info dataframe at once, with the same rules as is_parkinsonian.
+
+    Args:
+        info (pandas.DataFrame): The info dataframe, with a 'Pathology' column, or 'Dementia' and 'Other Dementia' columns.
+
+    Returns:
+        labels (pandas.Series): 1 for the parkinsonian participants, 0 for the healthy ones and -1 for the others, indexed like info.
+    """
+    def lower(col):
+        if col not in info.columns:
+            return pd.Series(np.nan, index=info.index, dtype=object)
+        # non string values, e.g. NaNs, become NaN
+        return info[col].astype(object).str.lower()
+
+    pathology = lower('Pathology')
+    dementia = lower('Dementia')
+    other_dementia = lower('Other Dementia')
+
+    labels = np.select(
+        [pathology == 'none', pathology == 'parkinson', pathology.notna(), dementia == 'no', other_dementia == 'parkinson'],
+        [0, 1, -1, 0, 1],
+        -1
+    )
+
+    return pd.Series(labels, index=info.index)
@@ -0,0 +1,229 @@
+import math
+import numpy as np
+import pandas as pd
+from .extraction import FEATURE_GRAPH, DEFAULT_FEATURES, FeatureGraphExtractor, _same, _distance, _distance_2d, _roc, _slant, _change
+
+
+_RAW = None
+
+
+def _divide(numerator, denominator):
+    """
+    Divide two floats like numpy does, i.e. to an infinity or NaN instead of raising ZeroDivisionError.
+    """
+    if denominator != 0:
+        return numerator / denominator
+    if numerator != numerator or numerator == 0:
+        return math.nan
+
+    return math.copysign(math.inf, numerator) * math.copysign(1.0, denominator)
+
+
+class IncrementalFeatureEngine:
+    """
+    Compute the kinematic features of FEATURE_GRAPH one sample at a time, e.g. while a participant is still writing on the tablet, in constant time and memory per sample.
+
+    The state of every node of the graph is explicit: the previous value of the changes, and the lowest and highest finite values of the rates of change, which replace their infinities.
+    The features of a sample are the same as the ones of FeatureGraphExtractor and ROCExtractor only while no infinity is replaced. When a rate of change is infinite, the batch extractors replace it by the extreme of the whole recording, which isn't known yet, so it's replaced by the extreme of the samples seen so far, and the value of that sample differs from theirs. This is frequent, e.g. the Slope is infinite whenever the pen moves vertically, so most recordings have such samples, see n_inf_replaced.
+    finish gives the per-sample values as they are, and only with keep_samples and recompute the features of the whole recording exactly like the batch extractor, which keeps every sample in memory.
+
+    Attributes:
+        features (list[str]): The features of every sample, in order.
+        columns (list[str]): The raw columns of every sample, in order.
+        handle_inf (bool): Whether the infinities of the rates of change are replaced, and their NaNs by 0.
+        n_samples (int): The number of samples of the current recording.
+        n_inf_replaced (int): The number of infinities of the current recording that were replaced by an extreme of the samples seen so far.
+    """
+
+
+    def __init__(self, features=None, columns=['Time', 'X', 'Y', 'P', 'Az', 'Al'], handle_inf=True, keep_samples=False):
+        """
+        Initializes a new IncrementalFeatureEngine.
+
+        Args:
+            features (list[str]): The features to compute, in order, defaults to DEFAULT_FEATURES like FeatureGraphExtractor.
+            columns (list[str]): The raw columns of every sample, in order, defaults to ['Time', 'X', 'Y', 'P', 'Az', 'Al'].
+            handle_inf (bool): Whether to replace the infinities of the rates of change by the finite extremes of their recording, and their NaNs by 0.
+            keep_samples (bool): Whether to keep the samples of the current recording, which finish needs to compute the exact features again, by default they aren't kept, so that the memory is constant.
+        """
+        self.features = list(DEFAULT_FEATURES if features is None else features)
+        self.columns = list(columns)
+        self.handle_inf = handle_inf
+        self.keep_samples = keep_samples
+
+        unknown_features = [feature for feature in self.features if feature not in FEATURE_GRAPH]
+        assert len(unknown_features) == 0, "The following features don't exist: " + str(unknown_features)
+
+        self._plan = list()
+        self._positions = dict()
+        for feature in self.features:
+            self._add_node(feature)
+        self._outputs = [self._positions[feature] for feature in self.features]
+
+        self.reset()
+
+
+    def _add_node(self, node):
+        """
+        Add a node, after the nodes it depends on, to the plan of the computations of a sample.
+
+        Args:
+            node (str): The node of FEATURE_GRAPH, or a raw column.
+
+        Returns:
+            position (int): The position of the node in the plan.
+        """
+        if node in self._positions:
+            return self._positions[node]
+
+        if node not in FEATURE_GRAPH:
+            assert node in self.columns, "The column " + str(node) + " is needed, but isn't one of the columns " + str(self.columns) + "."
+            step = (_RAW, (self.columns.index(node),))
+        else:
+            func, inputs = FEATURE_GRAPH[node]
+            step = (func, tuple(self._add_node(input_node) for input_node in inputs))
+
+        self._positions[node] = len(self._plan)
+        self._plan.append(step)
+
+        return self._positions[node]
+
+
+    def reset(self):
+        """
+        Forget the current recording, to start a new one.
+        """
+        n_nodes = len(self._plan)
+
+        self._values = [0.0] * n_nodes
+        self._previous = [0.0] * n_nodes
+        self._lowest = [math.inf] * n_nodes
+        self._highest = [-math.inf] * n_nodes
+
+        self.n_samples = 0
+        self.n_inf_replaced = 0
+        self._samples = list()
+
+
+    def _rate(self, position, numerator, denominator):
+        rate = _divide(numerator, denominator)
+
+        if not self.handle_inf:
+            return rate
+
+        if rate == rate and rate not in (math.inf, -math.inf):
+            if rate < self._lowest[position]:
+                self._lowest[position] = rate
+            if rate > self._highest[position]:
+                self._highest[position] = rate
+            return rate
+
+        if rate != rate:
+            return 0.0
+
+        self.n_inf_replaced += 1
+        extreme = self._highest[position] if rate > 0 else self._lowest[position]
+
+        return extreme if extreme not in (math.inf, -math.inf) else 0.0
+
+
+    def update(self, sample):
+        """
+        Compute the features of the next sample of the recording.
+
+        Args:
+            sample (array-like): The raw values of the sample, in the order of columns.
+
+        Returns:
+            features (numpy.ndarray): The float64 value of every feature of the sample, in the order of features.
+        """
+        sample = [float(value) for value in sample]
+        assert len(sample) == len(self.columns), "A sample should have a value per column " + str(self.columns) + "."
+
+        values = self._values
+        first = self.n_samples == 0
+
+        for position, (func, inputs) in enumerate(self._plan):
+            if func is _RAW:
+                value = sample[inputs[0]]
+            elif func is _change:
+                current = values[inputs[0]]
+                value = current if first else current - self._previous[position]
+                self._previous[position] = current
+            elif func is _roc:
+                value = self._rate(position, values[inputs[0]], values[inputs[1]])
+            elif func is _same:
+                value = values[inputs[0]]
+            elif func is _distance:
+                value = abs(values[inputs[0]])
+            elif func is _distance_2d:
+                value = math.sqrt(values[inputs[0]] * values[inputs[0]] + values[inputs[1]] * values[inputs[1]])
+            elif func is _slant:
+                # numpy's arctan like the batch extractor, math.atan may differ from it by an ulp
+                value = math.degrees(float(np.arctan(_divide(values[inputs[0]], values[inputs[1]]))))
+                value = 0.0 if value != value else value
+            else:
+                raise ValueError("The node function " + func.__name__ + " can't be computed incrementally.")
+
+            values[position] = value
+
+        self.n_samples += 1
+        if self.keep_samples:
+            self._samples.append(sample)
+
+        return np.array([values[position] for position in self._outputs])
+
+
+    def update_chunk(self, samples):
+        """
+        Compute the features of the next samples of the recording, one at a time.
+
+        Args:
+            samples (numpy.ndarray or pandas.core.frame.DataFrame): The raw samples, one per row, with a column per column, a dataframe's columns being selected by name.
+
+        Returns:
+            features (numpy.ndarray): A float64 array of shape (n_samples, n_features).
+        """
+        if isinstance(samples, pd.DataFrame):
+            samples = samples[self.columns].to_numpy()
+
+        features = np.empty((len(samples), len(self.features)))
+        for i, sample in enumerate(samples):
+            features[i] = self.update(sample)
+
+        return features
+
+
+    @property
+    def exact(self):
+        """
+        Whether the features computed so far are the ones the batch extractor would give for the samples seen so far, i.e. no infinity was replaced.
+        """
+        return self.n_inf_replaced == 0
+
+
+    def finish(self, features=None, recompute=False):
+        """
+        Get the features of the whole recording, then reset the engine for the next recording.
+
+        Args:
+            features (numpy.ndarray): The features returned by update and update_chunk for every sample of the recording.
+            recompute (bool): Whether to get the features exactly like FeatureGraphExtractor, computing them again from the kept samples if an infinity was replaced, or if features isn't given, which needs keep_samples.
+
+        Returns:
+            features (numpy.ndarray): A float64 array of shape (n_samples, n_features), the given features unless they are recomputed.
+        """
+        assert features is not None or recompute, "The features of the recording should be given, unless they are recomputed."
+
+        if features is not None and (self.exact or not recompute):
+            assert len(features) == self.n_samples, "The features should have a row per sample of the recording."
+            features = np.asarray(features, dtype=np.float64)
+        else:
+            assert self.keep_samples, "The samples should be kept to compute the exact features of the recording."
+            samples = pd.DataFrame(np.array(self._samples, dtype=np.float64).reshape((self.n_samples, len(self.columns))), columns=self.columns)
+            extracted = FeatureGraphExtractor(self.features, handle_inf=self.handle_inf, copy=False).transform(samples)
+            features = extracted[self.features].to_numpy(dtype=np.float64)
+
+        self.reset()
+
+        return features
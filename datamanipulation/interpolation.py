@@ -1,16 +1,117 @@
+import logging
 from sklearn.base import BaseEstimator, TransformerMixin
-import tensorflow as tf
 import numpy as np
+from .grouping import group_starts
+from monitoring.stages import stage
+
+
+logger = logging.getLogger('pd_classification')
+
+
+NUMPY_RESIZE_METHODS = ['bilinear', 'linear', 'nearest']
+
+
+def _source_positions(lengths, new_length):
+    """
+    Map every position of the resized images to a position in the original images, with half pixel centers and float32 arithmetic like tensorflow.image.resize.
+
+    Args:
+        lengths (numpy.ndarray): The length of every image.
+        new_length (int): The length of the resized images.
+
+    Returns:
+        positions (numpy.ndarray): An array of shape (n_images, new_length) of the source positions.
+    """
+    scale = lengths.astype(np.float32) / np.float32(new_length)
+    return (np.arange(new_length, dtype=np.float32) + np.float32(0.5))[np.newaxis, :] * scale[:, np.newaxis]
+
+
+def resize_linear(samples, starts, new_length):
+    """
+    Linearly resample every image to new_length rows in one batched pass, giving the same values as tensorflow.image.resize with the bilinear method.
+
+    Args:
+        samples (numpy.ndarray): The rows of all the images one after the other, of shape (n_samples, n_columns).
+        starts (numpy.ndarray): The position of the first row of each image.
+        new_length (int): The length of the resized images.
+
+    Returns:
+        images (numpy.ndarray): A float32 array of shape (n_images, new_length, n_columns).
+    """
+    lengths = np.diff(np.append(starts, samples.shape[0]))
+
+    positions = _source_positions(lengths, new_length) - np.float32(0.5)
+    floor = np.floor(positions)
+    lerp = (positions - floor)[:, :, np.newaxis]
+
+    lower = np.maximum(floor, 0).astype(np.int64) + starts[:, np.newaxis]
+    upper = np.minimum(np.ceil(positions), (lengths - 1)[:, np.newaxis]).astype(np.int64) + starts[:, np.newaxis]
+
+    samples = samples.astype(np.float32, copy=False)
+
+    return samples[lower] + (samples[upper] - samples[lower]) * lerp
+
+
+def resize_nearest(samples, starts, new_length):
+    """
+    Resample every image to new_length rows by taking the nearest rows, in one batched pass, giving the same values as tensorflow.image.resize with the nearest method.
+
+    Args:
+        samples (numpy.ndarray): The rows of all the images one after the other, of shape (n_samples, n_columns).
+        starts (numpy.ndarray): The position of the first row of each image.
+        new_length (int): The length of the resized images.
+
+    Returns:
+        images (numpy.ndarray): An array of shape (n_images, new_length, n_columns), of the dtype of samples.
+    """
+    lengths = np.diff(np.append(starts, samples.shape[0]))
+
+    nearest = np.minimum(np.floor(_source_positions(lengths, new_length)), (lengths - 1)[:, np.newaxis]).astype(np.int64)
+
+    # a pure gather, so the values keep the dtype of samples
+    return samples[nearest + starts[:, np.newaxis]]
+
+
+def resize_tensorflow(samples, starts, new_length, resize_method):
+    """
+    Resample every image to new_length rows with tensorflow.image.resize, batching the images of equal length together.
+
+    Args:
+        samples (numpy.ndarray): The rows of all the images one after the other, of shape (n_samples, n_columns).
+        starts (numpy.ndarray): The position of the first row of each image.
+        new_length (int): The length of the resized images.
+        resize_method (str): A tensorflow.image.ResizeMethod, e.g. 'bilinear' or 'bicubic'.
+
+    Returns:
+        images (numpy.ndarray): A float32 array of shape (n_images, new_length, n_columns).
+    """
+    import tensorflow as tf
+
+    bounds = np.append(starts, samples.shape[0])
+    lengths = np.diff(bounds)
+    images = np.empty((starts.shape[0], new_length, samples.shape[1]), dtype=np.float32)
+
+    for length in np.unique(lengths):
+        batch = np.flatnonzero(lengths == length)
+        rows = starts[batch][:, np.newaxis] + np.arange(length)
+
+        images[batch] = tf.image.resize(
+            samples[rows][..., np.newaxis],
+            (new_length, samples.shape[1]),
+            method=resize_method
+        ).numpy().reshape((batch.shape[0], new_length, samples.shape[1]))
+
+    return images
 
 
 class Interpolator(BaseEstimator, TransformerMixin):
-    def __init__(self, label_col, resize_method=tf.image.ResizeMethod.BILINEAR, new_shape_mode="mean"):
+    def __init__(self, label_col, resize_method='bilinear', new_shape_mode="mean", backend='auto'):
         """
         Initialize the interpolator.
 
         Args:
             label_col (str): The column to be taken as label to the supervised data.
-            resize_method (tensorflow.image.ResizeMethod.*, default: tensorflow.images.ResizeMethod.BILINEAR): A tensorflow image resizing method.
+            resize_method (str or tensorflow.image.ResizeMethod.*, default: 'bilinear'): The resizing method, 'bilinear' (or 'linear') and 'nearest' are supported by the numpy backend, any tensorflow image resizing method (e.g. 'bicubic') by the tensorflow backend.
             new_shape_mode (str): One of the following:
                 'min': For the new shape to be the minimum of the number of datapoints.
                 'max': For the new shape to be the maximum of the number of datapoints.
@@ -18,19 +119,36 @@ class Interpolator(BaseEstimator, TransformerMixin):
                 '25%': For the new shape to be the first quartile of the number of datapoints.
                 '50%': For the new shape to be the median of the number of datapoints.
                 '75%': For the new shape to be the third quartile of the number of datapoints.
+            backend (str): 'numpy', 'tensorflow', or 'auto' to use numpy whenever it supports resize_method.
         """
         assert new_shape_mode in ['min', 'max', 'mean', '25%', '50%', '75%'], "The new_shape_mode should be one of the following: 'min', 'max', 'mean', '25%', '50%' or '75%'."
+        assert backend in ['auto', 'numpy', 'tensorflow'], "The backend should be one of the following: 'auto', 'numpy' or 'tensorflow'."
+        assert backend != 'numpy' or resize_method in NUMPY_RESIZE_METHODS, "The numpy backend only supports the following resize methods: " + str(NUMPY_RESIZE_METHODS)
 
         self.resize_method = resize_method
         self.new_shape_mode = new_shape_mode
         self.label_col = label_col
+        self.backend = backend
 
 
     def fit(self, X, y=None):
         """
         Find the new shape.
         """
-        self.new_length_ = int(X.groupby(['ID', 'Language', 'Task']).count()['X'].describe()[self.new_shape_mode])
+        if not X.index.is_monotonic_increasing:
+            X = X.sort_index(kind='stable')
+
+        lengths = np.diff(np.append(group_starts(X), X.shape[0]))
+
+        if self.new_shape_mode == 'min':
+            self.new_length_ = int(lengths.min())
+        elif self.new_shape_mode == 'max':
+            self.new_length_ = int(lengths.max())
+        elif self.new_shape_mode == 'mean':
+            self.new_length_ = int(lengths.mean())
+        else:
+            self.new_length_ = int(np.percentile(lengths, float(self.new_shape_mode[:-1])))
+
         return self
 
 
@@ -38,27 +156,29 @@ class Interpolator(BaseEstimator, TransformerMixin):
         """
         Scale the images.
         """
-        print('Started image interpolation.')
+        logger.info('Started image interpolation.')
+
+        numpy_backend = self.backend == 'numpy' or (self.backend == 'auto' and self.resize_method in NUMPY_RESIZE_METHODS)
 
-        grouping = X.groupby(['ID', 'Language', 'Task']).first()
+        with stage('interpolation', backend='numpy' if numpy_backend else 'tensorflow', new_length=self.new_length_) as record:
+            if not X.index.is_monotonic_increasing:
+                X = X.sort_index(kind='stable')
 
-        new_y = grouping[self.label_col].values
+            starts = group_starts(X)
 
-        indexes = grouping.index
+            new_y = X[self.label_col].values[starts]
 
-        images = [X.loc[ix].drop(self.label_col, axis=1).values for ix in indexes]
+            samples = X.drop(self.label_col, axis=1).values
 
-        new_shape = (self.new_length_, images[0].shape[1])
-        
-        for i in range(len(images)):
-            images[i] = tf.image.resize(
-                images[i].reshape((images[i].shape[0], images[i].shape[1], 1)),
-                new_shape,
-                method=self.resize_method
-            ).numpy().reshape(new_shape)
+            if numpy_backend:
+                resize = resize_nearest if self.resize_method == 'nearest' else resize_linear
+                new_X = resize(samples, starts, self.new_length_)
+            else:
+                new_X = resize_tensorflow(samples, starts, self.new_length_, self.resize_method)
 
-        new_X = np.array(images)
+            record.count('recordings', starts.shape[0])
+            record.count('samples', samples.shape[0])
 
-        print('Interpolation done.')
+        logger.info('Interpolation done.')
 
-        return new_X, new_y
\ No newline at end of file
+        return new_X, new_y
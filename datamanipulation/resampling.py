@@ -0,0 +1,289 @@
+import logging
+from sklearn.base import BaseEstimator, TransformerMixin
+import numpy as np
+import pandas as pd
+from .grouping import contiguous_groups
+from monitoring.stages import stage
+
+
+logger = logging.getLogger('pd_classification')
+
+
+IRREGULARITY_COLUMNS = ['Samples', 'Duration', 'Mean step', 'Longer steps', 'Shorter steps', 'Repeated times', 'Backward steps', 'Gaps', 'Longest step']
+
+
+def _time_steps(times, starts):
+    """
+    Calculate the step between consecutive times, restarting at each recording, where the step of the first time is 0.
+
+    Args:
+        times (numpy.ndarray): The float64 times.
+        starts (numpy.ndarray): The position of the first row of each recording.
+
+    Returns:
+        steps (numpy.ndarray): The step of each time.
+    """
+    steps = np.empty_like(times)
+    steps[1:] = times[1:] - times[:-1]
+    steps[starts] = 0
+
+    return steps
+
+
+def _irregularity(times, starts, step, gap_factor):
+    """
+    Calculate the sampling irregularity statistics of every recording, in one pass over all of them.
+
+    Args:
+        times (numpy.ndarray): The float64 times of all the recordings one after the other, in the order they were recorded.
+        starts (numpy.ndarray): The position of the first row of each recording.
+        step (float): The expected step between two samples.
+        gap_factor (float): A step longer than gap_factor * step is a gap.
+
+    Returns:
+        stats (numpy.ndarray): An array of shape (n_recordings, len(IRREGULARITY_COLUMNS)).
+    """
+    stats = np.zeros((starts.shape[0], len(IRREGULARITY_COLUMNS)))
+    if starts.shape[0] == 0:
+        return stats
+
+    steps = _time_steps(times, starts)
+    not_first = np.ones(times.shape[0], dtype=bool)
+    not_first[starts] = False
+
+    def count(mask):
+        return np.add.reduceat((mask & not_first).astype(np.int64), starts)
+
+    lengths = np.diff(np.append(starts, times.shape[0]))
+    durations = np.maximum.reduceat(times, starts) - np.minimum.reduceat(times, starts)
+
+    stats[:, 0] = lengths
+    stats[:, 1] = durations
+    stats[:, 2] = np.divide(durations, lengths - 1, out=np.zeros_like(durations), where=lengths > 1)
+    stats[:, 3] = count(steps > step)
+    stats[:, 4] = count((steps > 0) & (steps < step))
+    stats[:, 5] = count(steps == 0)
+    stats[:, 6] = count(steps < 0)
+    stats[:, 7] = count(steps > gap_factor * step)
+    stats[:, 8] = np.maximum.reduceat(steps, starts)
+
+    return stats
+
+
+def _recordings(data):
+    """
+    Gather the rows of every recording next to each other, a dataframe without a MultiIndex being taken as a single recording like group_starts does.
+
+    Args:
+        data (pandas.core.frame.DataFrame): The HW dataframe.
+
+    Returns:
+        data (pandas.core.frame.DataFrame): The dataframe, see contiguous_groups.
+        starts (numpy.ndarray): The position of the first row of each recording.
+    """
+    if data.shape[0] == 0:
+        return data, np.empty(0, dtype=np.int64)
+
+    if not isinstance(data.index, pd.MultiIndex):
+        return data, np.zeros(1, dtype=np.int64)
+
+    return contiguous_groups(data)
+
+
+def _irregularity_frame(stats, index):
+    frame = pd.DataFrame(stats, columns=IRREGULARITY_COLUMNS, index=index)
+    counts = ['Samples', 'Longer steps', 'Shorter steps', 'Repeated times', 'Backward steps', 'Gaps']
+    frame[counts] = frame[counts].astype(np.int64)
+
+    return frame
+
+
+def estimate_step(data, time_col='Time'):
+    """
+    Estimate the sampling step of HW recordings, as the median of their positive time steps.
+
+    Args:
+        data (pandas.core.frame.DataFrame): The HW dataframe.
+        time_col (str): The column of the times.
+
+    Returns:
+        step (float): The median step, 1 if there's no positive step.
+    """
+    data, starts = _recordings(data)
+    steps = _time_steps(data[time_col].to_numpy(dtype=np.float64), starts)
+    steps = steps[steps > 0]
+
+    return float(np.median(steps)) if steps.shape[0] else 1.0
+
+
+def sampling_irregularity(data, step=None, gap_factor=4, time_col='Time'):
+    """
+    Find the irregular time steps of every HW recording, in one pass over all of them rather than a loop over the recordings.
+
+    For example, the share of the samples coming later than expected, like calc_variable_time_change2 of the pipeline notebook, is stats['Longer steps'].sum() / stats['Samples'].sum(), and the share of the recordings with an irregular step is (stats['Longer steps'] + stats['Shorter steps'] > 0).mean().
+
+    Args:
+        data (pandas.core.frame.DataFrame): The HW dataframe.
+        step (float): The expected step between two samples, e.g. 8 (ms), estimated by estimate_step by default.
+        gap_factor (float): A step longer than gap_factor * step is a gap, e.g. the pen was lifted.
+        time_col (str): The column of the times.
+
+    Returns:
+        stats (pandas.core.frame.DataFrame): The statistics of every recording, indexed like the recordings:
+            'Samples': The number of samples.
+            'Duration': The time between the first and last samples.
+            'Mean step': The duration divided by the number of steps.
+            'Longer steps': The number of steps longer than step.
+            'Shorter steps': The number of positive steps shorter than step.
+            'Repeated times': The number of samples with the time of the previous one.
+            'Backward steps': The number of samples earlier than the previous one.
+            'Gaps': The number of steps longer than gap_factor * step.
+            'Longest step': The longest step.
+    """
+    data, starts = _recordings(data)
+    if step is None:
+        step = estimate_step(data, time_col)
+
+    stats = _irregularity(data[time_col].to_numpy(dtype=np.float64), starts, step, gap_factor)
+
+    return _irregularity_frame(stats, data.index[starts])
+
+
+def resample_uniform(times, values, starts, step, gap_factor=4):
+    """
+    Linearly resample every recording onto a uniform time grid, starting at its first time, in one batched pass over all of them.
+
+    The samples of a recording are put in time order first, and of the samples sharing a time the last one is kept.
+
+    Args:
+        times (numpy.ndarray): The float64 times of all the recordings one after the other.
+        values (numpy.ndarray): The values to resample, of shape (n_samples, n_columns).
+        starts (numpy.ndarray): The position of the first row of each recording.
+        step (float): The step of the grid.
+        gap_factor (float): A step longer than gap_factor * step is a gap.
+
+    Returns:
+        new_times (numpy.ndarray): The float64 times of the grid of every recording, one after the other.
+        new_values (numpy.ndarray): The float64 resampled values, of shape (n_new_samples, n_columns).
+        new_starts (numpy.ndarray): The position of the first new row of each recording.
+        in_gap (numpy.ndarray): Whether each new row is strictly inside a gap of its recording.
+    """
+    if starts.shape[0] == 0:
+        return times, values, starts, np.zeros(0, dtype=bool)
+
+    lengths = np.diff(np.append(starts, times.shape[0]))
+    recording = np.repeat(np.arange(starts.shape[0]), lengths)
+
+    # time order within each recording, which also keeps the recordings in order
+    order = np.lexsort((times, recording))
+    times = times[order]
+    values = values[order]
+
+    first = np.minimum.reduceat(times, starts)
+    last = np.maximum.reduceat(times, starts)
+    new_lengths = np.floor((last - first) / step).astype(np.int64) + 1
+    new_starts = np.cumsum(new_lengths) - new_lengths
+
+    new_recording = np.repeat(np.arange(starts.shape[0]), new_lengths)
+    elapsed = (np.arange(new_lengths.sum()) - np.repeat(new_starts, new_lengths)) * step
+    new_times = np.repeat(first, new_lengths) + elapsed
+
+    # the recordings are laid one after the other on a single time line, so that a single search finds the samples around every new time
+    offsets = np.cumsum(last - first + 1) - (last - first + 1)
+    line = times - np.repeat(first, lengths) + np.repeat(offsets, lengths)
+    new_line = elapsed + offsets[new_recording]
+
+    ends = np.repeat(starts + lengths - 1, new_lengths)
+    lower = np.searchsorted(line, new_line, side='right') - 1
+    upper = np.minimum(lower + 1, ends)
+
+    span = times[upper] - times[lower]
+    lerp = np.divide(new_times - times[lower], span, out=np.zeros_like(span), where=span > 0)
+
+    new_values = values[lower] + (values[upper] - values[lower]) * lerp[:, np.newaxis]
+    in_gap = (span > gap_factor * step) & (lerp > 0)
+
+    return new_times, new_values, new_starts, in_gap
+
+
+class TimeResampler(BaseEstimator, TransformerMixin):
+    def __init__(self, step=None, gap='fill', gap_factor=4, time_col='Time', pressure_col='P', exclude=['PD'], gap_col=None):
+        """
+        Initialize the time resampler, which linearly resamples every recording onto a uniform time grid, so that every time step is the same and the rates of change over time are never infinite.
+
+        Args:
+            step (float): The step of the grid, e.g. 8 (ms), by default the median time step of the recordings it's fitted on.
+            gap (str): What to do with the new samples strictly inside a gap, i.e. a step longer than gap_factor * step:
+                'fill': To interpolate them linearly like the other samples.
+                'pen_up': To interpolate them, but with a pressure of 0, since the pen was lifted.
+            gap_factor (float): A step longer than gap_factor * step is a gap.
+            time_col (str): The column of the times.
+            pressure_col (str): The column of the pressure, set to 0 in the gaps with gap='pen_up'.
+            exclude (list[str]): The columns that are constant in a recording, e.g. the label, which are repeated rather than resampled.
+            gap_col (str): The name of a column to add, that is 1 for the new samples inside a gap and 0 elsewhere, by default none is added.
+        """
+        assert gap in ['fill', 'pen_up'], "The gap should be 'fill' or 'pen_up'."
+        assert step is None or step > 0, "The step should be positive."
+        assert gap_factor >= 1, "The gap_factor should be at least 1."
+
+        self.step = step
+        self.gap = gap
+        self.gap_factor = gap_factor
+        self.time_col = time_col
+        self.pressure_col = pressure_col
+        self.exclude = exclude
+        self.gap_col = gap_col
+
+
+    def fit(self, X, y=None):
+        """
+        Find the step of the grid.
+        """
+        self.step_ = float(self.step) if self.step is not None else estimate_step(X, self.time_col)
+
+        return self
+
+
+    def transform(self, X, y=None):
+        """
+        Resample the recordings, and keep their sampling irregularity statistics, see sampling_irregularity, in irregularity_.
+        """
+        logger.info('Started time resampling.')
+
+        with stage('time_resampling', step=self.step_, gap=self.gap) as record:
+            X, starts = _recordings(X)
+
+            resampled_cols = [col for col in X.columns if col not in self.exclude and col != self.time_col]
+            times = X[self.time_col].to_numpy(dtype=np.float64)
+
+            self.irregularity_ = _irregularity_frame(_irregularity(times, starts, self.step_, self.gap_factor), X.index[starts])
+
+            new_times, new_values, new_starts, in_gap = resample_uniform(times, X[resampled_cols].to_numpy(dtype=np.float64), starts, self.step_, self.gap_factor)
+            new_lengths = np.diff(np.append(new_starts, new_times.shape[0]))
+
+            columns = dict()
+            for col in X.columns:
+                if col == self.time_col:
+                    integral = np.issubdtype(X[col].dtype, np.integer) and float(self.step_).is_integer()
+                    columns[col] = new_times.astype(X[col].dtype) if integral else new_times
+                elif col in resampled_cols:
+                    columns[col] = new_values[:, resampled_cols.index(col)]
+                else:
+                    columns[col] = np.repeat(X[col].to_numpy()[starts], new_lengths)
+
+            if self.gap == 'pen_up' and self.pressure_col in resampled_cols:
+                columns[self.pressure_col][in_gap] = 0
+
+            if self.gap_col is not None:
+                columns[self.gap_col] = in_gap.astype(np.int8)
+
+            new_X = pd.DataFrame(columns, index=X.index[starts].repeat(new_lengths))
+
+            record.count('recordings', starts.shape[0])
+            record.count('samples', X.shape[0])
+            record.count('resampled', new_X.shape[0])
+            record.count('gap_samples', int(in_gap.sum()))
+
+        logger.info('Resampling done.')
+
+        return new_X
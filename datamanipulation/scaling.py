@@ -0,0 +1,239 @@
+from pathlib import Path
+import json
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+
+class StreamingStandardScaler(BaseEstimator, TransformerMixin):
+    """
+    Standardize the features of HW dataframes, with statistics that can be accumulated over chunks of recordings with partial_fit, so that the data never has to fit in memory at once.
+
+    The chunk statistics are merged with the parallel algorithm of Chan et al., which stays numerically stable where the naive sum of squares doesn't.
+
+    Attributes:
+        columns_ (list[str]): The standardized columns.
+        n_samples_seen_ (numpy.ndarray): The number of non NaN values seen per column.
+        mean_ (numpy.ndarray): The mean of every column.
+        var_ (numpy.ndarray): The variance of every column, with ddof degrees of freedom.
+        scale_ (numpy.ndarray): The standard deviation of every column, 1 for the constant ones.
+    """
+
+
+    def __init__(self, exclude=['ID', 'PD'], ddof=1, copy=False, dtype='float64'):
+        """
+        Initializes a new StreamingStandardScaler.
+
+        Args:
+            exclude (list[str]): The columns that are never scaled, e.g. the label and ID columns.
+            ddof (int): The delta degrees of freedom of the standard deviation, defaults to 1 like pandas.DataFrame.std.
+            copy (bool): Whether to scale a copy of X, by default X itself is scaled in place.
+            dtype (str): The dtype of the standardized columns, e.g. 'float32' to keep compact features compact, the statistics are always float64.
+        """
+        self.exclude = exclude
+        self.ddof = ddof
+        self.copy = copy
+        self.dtype = dtype
+
+
+    def _reset(self):
+        for attribute in ['columns_', 'n_samples_seen_', 'mean_', 'var_', 'scale_', '_m2']:
+            if hasattr(self, attribute):
+                delattr(self, attribute)
+
+
+    def fit(self, X, y=None):
+        """
+        Compute the statistics from scratch.
+
+        Args:
+            X (pandas.core.frame.DataFrame or iterable): The HW dataframe, or an iterable of chunks, either dataframes or (participant_info, recording) pairs as yielded by the readers' iter_recordings.
+
+        Returns:
+            self (StreamingStandardScaler): The fitted scaler.
+        """
+        self._reset()
+
+        chunks = [X] if isinstance(X, pd.DataFrame) else X
+        for chunk in chunks:
+            self.partial_fit(chunk[1] if isinstance(chunk, tuple) else chunk)
+
+        assert hasattr(self, 'columns_'), "There were no chunks to fit the scaler on."
+
+        return self
+
+
+    def partial_fit(self, X, y=None):
+        """
+        Update the statistics with a chunk of recordings.
+
+        Args:
+            X (pandas.core.frame.DataFrame): A chunk of the HW dataframe.
+
+        Returns:
+            self (StreamingStandardScaler): The updated scaler.
+        """
+        if not hasattr(self, 'columns_'):
+            self.columns_ = [col for col in X.columns if col not in self.exclude]
+            self.n_samples_seen_ = np.zeros(len(self.columns_), dtype=np.int64)
+            self.mean_ = np.zeros(len(self.columns_))
+            self._m2 = np.zeros(len(self.columns_))
+
+        values = X[self.columns_].to_numpy(dtype=np.float64)
+        finite = ~np.isnan(values)
+
+        count = finite.sum(axis=0)
+        mean = np.where(finite, values, 0).sum(axis=0) / np.maximum(count, 1)
+        m2 = (np.where(finite, values - mean, 0) ** 2).sum(axis=0)
+
+        total = self.n_samples_seen_ + count
+        delta = mean - self.mean_
+        weight = count / np.maximum(total, 1)
+
+        self.mean_ = self.mean_ + delta * weight
+        self._m2 = self._m2 + m2 + delta ** 2 * self.n_samples_seen_ * weight
+        self.n_samples_seen_ = total
+
+        self._update_scale()
+
+        return self
+
+
+    def _update_scale(self):
+        self.var_ = self._m2 / np.maximum(self.n_samples_seen_ - self.ddof, 1)
+        self.scale_ = np.sqrt(self.var_)
+        self.scale_[self.scale_ == 0] = 1.0
+
+
+    def transform(self, X, y=None):
+        """
+        Standardize the columns of X, leaving the excluded columns untouched.
+
+        Args:
+            X (pandas.core.frame.DataFrame): The HW dataframe, with the columns the scaler was fitted on.
+
+        Returns:
+            X_scaled (pandas.core.frame.DataFrame): X, or its copy, standardized.
+        """
+        assert hasattr(self, 'columns_'), "The scaler should be fitted before transforming."
+
+        X_out = X.copy() if self.copy else X
+        X_out[self.columns_] = ((X[self.columns_].to_numpy(dtype=np.float64) - self.mean_) / self.scale_).astype(self.dtype, copy=False)
+
+        return X_out
+
+
+    def inverse_transform(self, X, y=None):
+        """
+        Undo the standardization of the columns of X.
+
+        Args:
+            X (pandas.core.frame.DataFrame): A dataframe standardized by the scaler.
+
+        Returns:
+            X_original (pandas.core.frame.DataFrame): X, or its copy, in the original units.
+        """
+        X_out = X.copy() if self.copy else X
+        X_out[self.columns_] = (X[self.columns_].to_numpy(dtype=np.float64) * self.scale_ + self.mean_).astype(self.dtype, copy=False)
+
+        return X_out
+
+
+    def get_state(self):
+        """
+        Get the parameters and statistics of the scaler, as a JSON serializable dictionary.
+
+        Returns:
+            state (dict): The 'params', 'columns', 'n_samples_seen', 'mean' and 'm2' of the scaler.
+        """
+        assert hasattr(self, 'columns_'), "Only a fitted scaler has a state."
+
+        return {
+            'params': self.get_params(),
+            'columns': list(self.columns_),
+            'n_samples_seen': self.n_samples_seen_.tolist(),
+            'mean': self.mean_.tolist(),
+            'm2': self._m2.tolist(),
+        }
+
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Restore a scaler from its state, which can keep being updated with partial_fit.
+
+        Args:
+            state (dict): The state returned by get_state.
+
+        Returns:
+            scaler (StreamingStandardScaler): The fitted scaler.
+        """
+        scaler = cls(**state['params'])
+        scaler.columns_ = list(state['columns'])
+        scaler.n_samples_seen_ = np.array(state['n_samples_seen'], dtype=np.int64)
+        scaler.mean_ = np.array(state['mean'], dtype=np.float64)
+        scaler._m2 = np.array(state['m2'], dtype=np.float64)
+        scaler._update_scale()
+
+        return scaler
+
+
+    @classmethod
+    def from_mean_std(cls, mean_std, n_samples=None, **params):
+        """
+        Build a scaler from the statistics computed in the notebooks, e.g. the mean_std dictionary of the training set.
+
+        Unlike the notebooks, the constant columns, of standard deviation 0, are left centered rather than divided by 0.
+
+        Args:
+            mean_std (dict): A dictionary mapping every standardized column, in order, to its (mean, standard deviation).
+            n_samples (int): The number of samples the statistics were computed on, needed to keep updating the scaler with partial_fit.
+            **params: The parameters of the scaler, e.g. ddof, defaults to the ones of pandas.DataFrame.std.
+
+        Returns:
+            scaler (StreamingStandardScaler): The fitted scaler.
+        """
+        scaler = cls(**params)
+        scaler.columns_ = list(mean_std.keys())
+
+        std = np.array([mean_std[col][1] for col in scaler.columns_], dtype=np.float64)
+        n_seen = 0 if n_samples is None else n_samples
+
+        scaler.n_samples_seen_ = np.full(len(scaler.columns_), n_seen, dtype=np.int64)
+        scaler.mean_ = np.array([mean_std[col][0] for col in scaler.columns_], dtype=np.float64)
+        scaler._m2 = std ** 2 * max(n_seen - scaler.ddof, 1)
+        scaler._update_scale()
+
+        return scaler
+
+
+    def save(self, path):
+        """
+        Save the parameters and statistics of the scaler into a JSON file.
+
+        Args:
+            path (str or pathlib.Path): The file to save the scaler into.
+        """
+        state = self.get_state()
+
+        f = open(Path(path), 'w')
+        json.dump(state, f, indent=2)
+        f.close()
+
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a scaler saved with save, which can keep being updated with partial_fit.
+
+        Args:
+            path (str or pathlib.Path): The file the scaler was saved into.
+
+        Returns:
+            scaler (StreamingStandardScaler): The fitted scaler.
+        """
+        f = open(Path(path), 'r')
+        state = json.load(f)
+        f.close()
+
+        return cls.from_state(state)
@@ -0,0 +1,209 @@
+"""
+Save and restore the fitted preprocessing chain of a model together with its weights, so that a scoring job starts without the training set.
+
+A bundle is a directory with:
+    bundle.json: The format version, the state of the RecordingPreprocessor (its length, columns, features and scaler statistics), the architecture of the keras model, and where each of its weights is in weights.bin.
+    weights.bin: The weights of the model, one after the other, read in a single pass rather than memory-mapped when they are loaded, see _read_weights.
+
+Usage:
+    scaler = StreamingStandardScaler.from_mean_std(mean_std)
+    save_bundle('gru.bundle', RecordingPreprocessor(5758, scaler), model)
+    ...
+    preprocessor, model = load_bundle('gru.bundle')
+    probabilities = model(preprocessor.transform(recordings))
+"""
+from pathlib import Path
+import json
+import os
+import platform
+import shutil
+import sys
+import numpy as np
+
+
+BUNDLE_FORMAT_VERSION = 1
+
+MANIFEST_NAME = 'bundle.json'
+WEIGHTS_NAME = 'weights.bin'
+
+# the offset of every weight in weights.bin is a multiple of it, so that the weights are aligned views of the file's buffer
+_ALIGNMENT = 64
+
+
+def _write_weights(path, weights):
+    """
+    Write arrays one after the other into a file.
+
+    Args:
+        path (pathlib.Path): The file.
+        weights (list[numpy.ndarray]): The arrays.
+
+    Returns:
+        entries (list[dict]): The 'dtype', 'shape' and 'offset' of every array.
+    """
+    entries = list()
+
+    f = open(path, 'wb')
+    for weight in weights:
+        weight = np.ascontiguousarray(weight)
+
+        offset = -(-f.tell() // _ALIGNMENT) * _ALIGNMENT
+        f.write(b'\0' * (offset - f.tell()))
+        f.write(weight.tobytes())
+
+        entries.append({'dtype': weight.dtype.str, 'shape': list(weight.shape), 'offset': offset})
+    f.close()
+
+    return entries
+
+
+def _read_weights(path, entries):
+    """
+    Read the arrays written by _write_weights.
+
+    The file is read at once, the arrays being views of its buffer. It isn't memory-mapped: set_weights copies every array into the variables of the model, so every page of a map would be read anyway, and the map would keep the file open, which prevents save_bundle from replacing the bundle on Windows.
+
+    Args:
+        path (pathlib.Path): The file.
+        entries (list[dict]): The 'dtype', 'shape' and 'offset' of every array.
+
+    Returns:
+        weights (list[numpy.ndarray]): The arrays.
+    """
+    if not entries:
+        return list()
+
+    buffer = np.fromfile(path, dtype=np.uint8)
+
+    weights = list()
+    for entry in entries:
+        dtype = np.dtype(entry['dtype'])
+        size = int(np.prod(entry['shape'], dtype=np.int64)) * dtype.itemsize
+
+        weights.append(buffer[entry['offset']:entry['offset'] + size].view(dtype).reshape(entry['shape']))
+
+    return weights
+
+
+def save_bundle(path, preprocessor, model=None, metadata={}):
+    """
+    Save the fitted preprocessing of a model, and the model, into a bundle.
+
+    The bundle is written next to its path then moved into place, the bundle it replaces being moved aside first and deleted last, so that a job loading it never sees half a bundle, and the previous bundle is kept if the process dies in between.
+
+    Args:
+        path (str or pathlib.Path): The directory of the bundle, an existing bundle there is replaced.
+        preprocessor (RecordingPreprocessor): The fitted preprocessing.
+        model (tensorflow.keras.Model): The trained model, whose architecture can be serialized by to_json, by default only the preprocessing is saved.
+        metadata (dict): Any JSON serializable information to keep along, e.g. the cross validation accuracy.
+    """
+    path = Path(path)
+    assert not path.exists() or (path / MANIFEST_NAME).exists(), str(path) + " exists and isn't a bundle, it won't be replaced."
+
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'preprocessing': preprocessor.get_state(),
+        'model': None,
+        'metadata': metadata,
+        'versions': {'python': platform.python_version(), 'numpy': np.__version__},
+    }
+
+    tmp_path = path.with_name(path.name + '.tmp')
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir(parents=True)
+
+    if model is not None:
+        input_shape = list(model.input_shape)
+        assert input_shape[1] in (None, preprocessor.length), "The model takes images of " + str(input_shape[1]) + " samples, but the preprocessor gives " + str(preprocessor.length) + "."
+
+        manifest['model'] = {
+            'architecture': json.loads(model.to_json()),
+            'input_shape': input_shape,
+            'weights': _write_weights(tmp_path / WEIGHTS_NAME, model.get_weights()),
+        }
+        manifest['versions']['tensorflow'] = sys.modules['tensorflow'].__version__ if 'tensorflow' in sys.modules else None
+
+    f = open(tmp_path / MANIFEST_NAME, 'w')
+    json.dump(manifest, f, indent=2)
+    f.close()
+
+    # the old bundle is moved aside rather than deleted first, so that there is always a whole bundle at path, or in old_path if the process dies in between
+    old_path = path.with_name(path.name + '.old')
+    if old_path.exists():
+        shutil.rmtree(old_path)
+
+    if path.exists():
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+
+    if old_path.exists():
+        shutil.rmtree(old_path)
+
+
+def _bundle_dir(path):
+    """
+    Find the directory of a whole bundle, which is path.old while save_bundle replaces the bundle at path, or if it died doing so.
+
+    Args:
+        path (pathlib.Path): The directory of the bundle.
+
+    Returns:
+        bundle_dir (pathlib.Path): The directory of the bundle to load.
+    """
+    old_path = path.with_name(path.name + '.old')
+    if not (path / MANIFEST_NAME).exists() and (old_path / MANIFEST_NAME).exists():
+        return old_path
+
+    return path
+
+
+def read_manifest(path):
+    """
+    Read the manifest of a bundle, checking its format version.
+
+    Args:
+        path (str or pathlib.Path): The directory of the bundle.
+
+    Returns:
+        manifest (dict): The manifest, see save_bundle.
+    """
+    f = open(_bundle_dir(Path(path)) / MANIFEST_NAME, 'r')
+    manifest = json.load(f)
+    f.close()
+
+    assert manifest.get('format_version') == BUNDLE_FORMAT_VERSION, "The bundle has the format version " + str(manifest.get('format_version')) + ", only the version " + str(BUNDLE_FORMAT_VERSION) + " can be loaded."
+
+    return manifest
+
+
+def load_bundle(path, load_model=True):
+    """
+    Restore the fitted preprocessing of a model, and the model, from a bundle, without recomputing anything.
+
+    Args:
+        path (str or pathlib.Path): The directory of the bundle.
+        load_model (bool): Whether to restore the model, which imports tensorflow, set to False to only get the preprocessing.
+
+    Returns:
+        preprocessor (RecordingPreprocessor): The fitted preprocessing.
+        model (tensorflow.keras.Model): The model with its weights, None if load_model is False or the bundle has no model.
+    """
+    from modeling.preprocessing import RecordingPreprocessor
+
+    path = _bundle_dir(Path(path))
+    manifest = read_manifest(path)
+
+    preprocessor = RecordingPreprocessor.from_state(manifest['preprocessing'])
+
+    model = None
+    if load_model and manifest['model'] is not None:
+        import tensorflow as tf
+
+        model = tf.keras.models.model_from_json(json.dumps(manifest['model']['architecture']))
+        if not model.built:
+            model.build(tuple(manifest['model']['input_shape']))
+
+        model.set_weights(_read_weights(path / WEIGHTS_NAME, manifest['model']['weights']))
+
+    return preprocessor, model
@@ -0,0 +1,200 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import multiprocessing
+import os
+import tempfile
+import numpy as np
+
+
+logger = logging.getLogger('pd_classification')
+
+
+_THREAD_VARS = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS']
+
+
+def _limit_threads(threads):
+    """
+    Cap the threads of tensorflow in the current process.
+
+    The threads of the math libraries numpy uses are read from the environment when numpy is imported, so they are capped by cross_validate in the environment the workers are started with.
+
+    Args:
+        threads (int): The number of threads of every intra-op thread pool.
+    """
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+    import tensorflow as tf
+
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError:
+        # tensorflow was already initialized in this process, its thread pools can't be resized anymore
+        pass
+
+
+def _memmap_batches(X, y, index, batch_size, shuffle=False, seed=None):
+    """
+    Build a keras Sequence of the batches of a fold, every batch being gathered from the memory-mapped dataset when the model asks for it, so that the fold is never copied as a whole.
+
+    Args:
+        X (numpy.ndarray): The memory-mapped images.
+        y (numpy.ndarray): The memory-mapped labels.
+        index (numpy.ndarray): The rows of the fold.
+        batch_size (int): The number of images of a batch.
+        shuffle (bool): Whether to shuffle the rows before every epoch, like model.fit does with arrays.
+        seed (int): The seed of the shuffling.
+
+    Returns:
+        batches (tensorflow.keras.utils.Sequence): The batches of (images, labels).
+    """
+    import tensorflow as tf
+
+    class MemmapBatches(tf.keras.utils.Sequence):
+        def __init__(self):
+            super().__init__()
+            self.index = np.asarray(index)
+            self.rng = np.random.default_rng(seed)
+            self.on_epoch_end()
+
+        def __len__(self):
+            return -(-self.index.shape[0] // batch_size)
+
+        def __getitem__(self, i):
+            rows = self.index[i * batch_size:(i + 1) * batch_size]
+            return np.asarray(X[rows]), np.asarray(y[rows])
+
+        def on_epoch_end(self):
+            if shuffle:
+                self.index = self.rng.permutation(self.index)
+
+    return MemmapBatches()
+
+
+def _run_fold(fold):
+    """
+    Train a model on one fold and evaluate it on the fold's validation set.
+
+    Args:
+        fold (dict): The fold number, train_index, val_index, the paths of the memory-mapped X and y, build_model, fit_kwargs, threshold and threads.
+
+    Returns:
+        result (dict): The fold number, its accuracy and confusion matrix, and the history of the training.
+    """
+    if fold['threads'] is not None:
+        _limit_threads(fold['threads'])
+
+    from sklearn.metrics import accuracy_score, confusion_matrix
+
+    X = np.load(fold['X_path'], mmap_mode='r')
+    y = np.load(fold['y_path'], mmap_mode='r')
+
+    # the batches are gathered from the shared file one at a time, only the labels of the validation set are copied
+    fit_kwargs = dict(fold['fit_kwargs'])
+    batch_size = fit_kwargs.pop('batch_size', None) or 32
+    shuffle = fit_kwargs.pop('shuffle', True)
+
+    train_batches = _memmap_batches(X, y, fold['train_index'], batch_size, shuffle, seed=fold['fold'])
+    val_batches = _memmap_batches(X, y, fold['val_index'], batch_size)
+    y_val = np.asarray(y[fold['val_index']])
+
+    model = fold['build_model']()
+    history = model.fit(train_batches, validation_data=val_batches, shuffle=False, **fit_kwargs)
+
+    y_pred = (model.predict(val_batches, verbose=0) > fold['threshold']).astype(int).reshape(-1)
+
+    return {
+        'fold': fold['fold'],
+        'accuracy': accuracy_score(y_val, y_pred),
+        'confusion': confusion_matrix(y_val, y_pred, labels=fold['labels']),
+        'history': history.history,
+    }
+
+
+def cross_validate(build_model, X, y, n_splits=5, random_state=42, fit_kwargs={}, threshold=0.5, workers=None, threads_per_worker=None, mmap_dir=None):
+    """
+    Run a stratified k-fold cross validation of a keras model, training the folds in parallel worker processes.
+
+    The dataset is written once to memory-mapped files that all the workers share, instead of copying the full padded tensor for every fold. Every worker reads the batches of its fold from them as it trains, so a worker only holds a batch of images at a time, rather than the about 80% of the dataset its training set is.
+
+    Args:
+        build_model (function): A picklable function (i.e. defined at the top level of a module) returning a new compiled keras model for binary classification.
+        X (numpy.ndarray): The padded (or interpolated) images, e.g. of shape (n_images, length, n_features).
+        y (numpy.ndarray): The label of each image.
+        n_splits (int): The number of folds.
+        random_state (int): The seed of the StratifiedKFold shuffling, defaults to 42 like the notebooks.
+        fit_kwargs (dict): The keyword arguments of model.fit, e.g. {'epochs': 10, 'batch_size': 30}, the batches being shuffled before every epoch unless shuffle is False.
+        threshold (float): The probability above which an image is predicted as positive.
+        workers (int): The number of worker processes, defaults to the number of folds, 1 to run the folds one after the other in the current process.
+        threads_per_worker (int): The number of threads of tensorflow and of the math libraries of numpy in every worker, defaults to the number of CPUs divided by workers.
+        mmap_dir (str or pathlib.Path): The directory of the memory-mapped dataset, by default a temporary directory that is deleted afterwards, the files are kept in a given directory.
+
+    Returns:
+        results (dict): The 'accuracies' and 'confusions' of the folds in fold order, like the notebooks collect them, their 'mean_accuracy', and the training 'histories'.
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    workers = n_splits if workers is None else workers
+    assert workers >= 1, "The number of workers should be a positive integer."
+
+    if threads_per_worker is None and workers > 1:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+
+    kf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    splits = list(kf.split(np.zeros(len(y)), y))
+
+    tmp_dir = tempfile.TemporaryDirectory() if mmap_dir is None else None
+    data_dir = Path(tmp_dir.name) if mmap_dir is None else Path(mmap_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        np.save(data_dir / 'X.npy', np.ascontiguousarray(X))
+        np.save(data_dir / 'y.npy', np.asarray(y))
+
+        folds = [{
+            'fold': i,
+            'train_index': train_index,
+            'val_index': val_index,
+            'X_path': str(data_dir / 'X.npy'),
+            'y_path': str(data_dir / 'y.npy'),
+            'build_model': build_model,
+            'fit_kwargs': fit_kwargs,
+            'threshold': threshold,
+            'threads': threads_per_worker,
+            'labels': np.unique(y),
+        } for i, (train_index, val_index) in enumerate(splits)]
+
+        logger.info('Started cross validation of %d folds with %d worker(s).', n_splits, min(workers, n_splits))
+
+        if workers == 1:
+            results = [_run_fold(fold) for fold in folds]
+        else:
+            # the workers inherit the environment when they start, before they import numpy, which reads its threads from it
+            saved_env = {var: os.environ.get(var) for var in _THREAD_VARS}
+            if threads_per_worker is not None:
+                os.environ.update({var: str(threads_per_worker) for var in _THREAD_VARS})
+
+            try:
+                # tensorflow isn't fork safe, so the workers are started from a fresh interpreter
+                with ProcessPoolExecutor(max_workers=min(workers, n_splits), mp_context=multiprocessing.get_context('spawn')) as executor:
+                    results = list(executor.map(_run_fold, folds))
+            finally:
+                for var, value in saved_env.items():
+                    if value is None:
+                        os.environ.pop(var, None)
+                    else:
+                        os.environ[var] = value
+    finally:
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+    accuracies = [result['accuracy'] for result in results]
+    print("Mean Accuracy:", np.mean(accuracies))
+
+    return {
+        'accuracies': accuracies,
+        'confusions': np.array([result['confusion'] for result in results]),
+        'mean_accuracy': np.mean(accuracies),
+        'histories': [result['history'] for result in results],
+    }
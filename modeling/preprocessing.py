@@ -0,0 +1,151 @@
+import re
+import numpy as np
+import pandas as pd
+from dataaccess.taskparser import find_data_start, parse_samples
+from datamanipulation.extraction import FeatureGraphExtractor
+from datamanipulation.interpolation import resize_linear, resize_nearest
+
+
+class RecordingPreprocessor:
+    """
+    The fitted preprocessing chain from raw recordings to the input of a model: the feature extraction, the standardization, and the padding or interpolation to a fixed length.
+
+    Attributes:
+        length (int): The number of samples of every image fed to the model, e.g. the padded length of the training set, or the new_length_ of its Interpolator.
+        scaler (StreamingStandardScaler): The scaler fitted on the extracted training set, None if the features aren't standardized.
+        columns (list[str]): The columns of the images, in order.
+    """
+
+
+    def __init__(self, length, scaler=None, columns=None, resize='pad', padding_value=0, resize_method='bilinear', features=None, handle_inf=True, data_header=['Time', 'X', 'Y', 'P', 'Az', 'Al']):
+        """
+        Initializes a new RecordingPreprocessor.
+
+        Args:
+            length (int): The number of samples of every image fed to the model.
+            scaler (StreamingStandardScaler): The scaler fitted on the extracted training set, by default the features aren't standardized.
+            columns (list[str]): The columns of the images, in order, defaults to the columns of the scaler, i.e. the raw columns then the features like get_samples gives them.
+            resize (str): 'pad' to pad the images after their last sample, and keep the last length samples of the longer ones, like pad_sequences, or 'interpolate' to resize them like the Interpolator.
+            padding_value (float): The value of the padded samples, defaults to 0 like the notebooks.
+            resize_method (str): 'bilinear' or 'nearest', the method of the interpolation.
+            features (list[str]): The features extracted, defaults to DEFAULT_FEATURES.
+            handle_inf (bool): Whether the infinities of the rates of change were replaced when extracting the training set.
+            data_header (list[str]): The ordered raw columns of the recordings.
+        """
+        assert resize in ['pad', 'interpolate'], "The resize should be 'pad' or 'interpolate'."
+        assert resize != 'interpolate' or resize_method in ['bilinear', 'linear', 'nearest'], "The resize_method should be 'bilinear' or 'nearest'."
+        assert scaler is not None or columns is not None, "The columns of the images are needed when there is no scaler."
+
+        self.length = int(length)
+        self.scaler = scaler
+        self.columns = list(scaler.columns_ if columns is None else columns)
+        self.resize = resize
+        self.padding_value = padding_value
+        self.resize_method = resize_method
+        self.data_header = list(data_header)
+        self.features = None if features is None else list(features)
+        self.handle_inf = handle_inf
+        self.extractor = FeatureGraphExtractor(self.features, handle_inf=handle_inf, copy=False)
+
+        self.header_reg = r'^[ \t]*' + r'[ \t]+'.join(re.escape(col) for col in self.data_header[:2]) + r'\b'
+
+
+    def get_state(self):
+        """
+        Get the fitted state of the preprocessing, as a JSON serializable dictionary.
+
+        Returns:
+            state (dict): The parameters of the preprocessor, and the state of its scaler.
+        """
+        return {
+            'length': self.length,
+            'columns': self.columns,
+            'resize': self.resize,
+            'padding_value': self.padding_value,
+            'resize_method': self.resize_method,
+            'features': self.features,
+            'handle_inf': self.handle_inf,
+            'data_header': self.data_header,
+            'scaler': None if self.scaler is None else self.scaler.get_state(),
+        }
+
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Restore a preprocessor from its fitted state.
+
+        Args:
+            state (dict): The state returned by get_state.
+
+        Returns:
+            preprocessor (RecordingPreprocessor): The preprocessor.
+        """
+        from datamanipulation.scaling import StreamingStandardScaler
+
+        params = dict(state)
+        scaler_state = params.pop('scaler')
+        scaler = None if scaler_state is None else StreamingStandardScaler.from_state(scaler_state)
+
+        return cls(scaler=scaler, **params)
+
+
+    def parse(self, recording):
+        """
+        Turn a raw recording into an array of samples.
+
+        Args:
+            recording (str or array-like): The content of a task file, with or without its header and the lines above it, or the samples, one per row, with a column per data header.
+
+        Returns:
+            samples (numpy.ndarray): An array of shape (n_samples, len(data_header)).
+        """
+        if isinstance(recording, (str, bytes)):
+            text = recording.decode('ISO-8859-1') if isinstance(recording, bytes) else recording
+            start = find_data_start(text, self.header_reg)
+            samples = parse_samples(text if start is None else text[start:], len(self.data_header))[0]
+        else:
+            samples = np.asarray(recording)
+
+        assert samples.ndim == 2 and samples.shape[1] == len(self.data_header), "A recording should have a column per data header " + str(self.data_header) + "."
+        assert samples.shape[0] > 0, "A recording should have at least one sample."
+
+        return samples
+
+
+    def transform(self, recordings):
+        """
+        Preprocess a batch of raw recordings into the input of the model.
+
+        The recordings are extracted and standardized together, in a single pass.
+
+        Args:
+            recordings (list): The raw recordings, see parse.
+
+        Returns:
+            images (numpy.ndarray): A float32 array of shape (n_recordings, length, len(columns)).
+        """
+        samples = [self.parse(recording) for recording in recordings]
+        lengths = np.array([s.shape[0] for s in samples])
+        starts = np.cumsum(lengths) - lengths
+
+        index = pd.MultiIndex.from_arrays([np.repeat(np.arange(len(samples)), lengths)])
+        data = pd.DataFrame(np.concatenate(samples), columns=self.data_header, index=index)
+
+        data = self.extractor.transform(data)
+        if self.scaler is not None:
+            data = self.scaler.transform(data)
+
+        values = data[self.columns].to_numpy(dtype=np.float32)
+
+        if self.resize == 'interpolate':
+            resize = resize_nearest if self.resize_method == 'nearest' else resize_linear
+            return resize(values, starts, self.length)
+
+        images = np.full((len(samples), self.length, len(self.columns)), self.padding_value, dtype=np.float32)
+        for i, (start, n) in enumerate(zip(starts, lengths)):
+            # like pad_sequences, the first samples of the longer recordings are truncated
+            kept = min(n, self.length)
+            images[i, :kept] = values[start + n - kept:start + n]
+
+        return images
@@ -0,0 +1,366 @@
+"""
+Score raw recordings with a trained model, from a local HTTP service that micro-batches the concurrent requests.
+
+Usage:
+    python -m modeling.serving --bundle BUNDLE [--host HOST] [--port PORT] [--max-batch-size N] [--max-latency-ms MS]
+    python -m modeling.serving --model MODEL --scaler SCALER --length LENGTH [--resize pad|interpolate] [--host HOST] [--port PORT] [--max-batch-size N] [--max-latency-ms MS]
+
+Endpoints:
+    POST /score: The body is a task file in the 'Time X Y P Az Al' text format, or a JSON object with the 'samples' of a recording, or the 'recordings' of a batch, each either a text or a list of samples.
+    GET /metrics: The latency and throughput of the service.
+    GET /health: 'ok' once the model is loaded.
+"""
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Gather the requests made concurrently into batches, run by a single thread, so that the model is called once per batch rather than once per request.
+
+    A batch is run as soon as it has max_batch_size requests, or max_latency_ms after its first request arrived.
+
+    Attributes:
+        max_batch_size (int): The maximum number of requests of a batch.
+        max_latency_ms (float): The maximum time, in ms, the first request of a batch waits for others.
+    """
+
+
+    def __init__(self, predict, max_batch_size=32, max_latency_ms=10):
+        """
+        Initializes a new MicroBatcher, and starts its thread.
+
+        Args:
+            predict (function): A function taking a list of requests and returning a result per request, in order.
+            max_batch_size (int): The maximum number of requests of a batch.
+            max_latency_ms (float): The maximum time, in ms, the first request of a batch waits for others.
+        """
+        assert max_batch_size >= 1, "The maximum batch size should be a positive integer."
+
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_latency_ms = max_latency_ms
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._reset_metrics()
+
+        self._thread = threading.Thread(target=self._run, name='MicroBatcher', daemon=True)
+        self._thread.start()
+
+
+    def _reset_metrics(self):
+        self._started = time.perf_counter()
+        self._n_requests = 0
+        self._n_batches = 0
+        self._n_errors = 0
+        self._latencies = list()
+        self._predict_seconds = 0.0
+
+
+    def submit(self, request):
+        """
+        Queue a request for the next batch.
+
+        Args:
+            request (object): The request, e.g. a preprocessed image.
+
+        Returns:
+            future (concurrent.futures.Future): The future of the result of the request.
+        """
+        future = Future()
+        self._queue.put((request, future, time.perf_counter()))
+
+        return future
+
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        if batch[0] is None:
+            return None
+
+        deadline = time.perf_counter() + self.max_latency_ms / 1000
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is None:
+                # the batcher is closing, the gathered requests are still run
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            start = time.perf_counter()
+            try:
+                results = self.predict([request for request, _, _ in batch])
+                error = None
+            except Exception as e:
+                results, error = None, e
+            end = time.perf_counter()
+
+            for i, (_, future, submitted) in enumerate(batch):
+                if error is None:
+                    future.set_result(results[i])
+                else:
+                    future.set_exception(error)
+
+            with self._lock:
+                self._n_requests += len(batch)
+                self._n_batches += 1
+                self._n_errors += len(batch) if error is not None else 0
+                self._predict_seconds += end - start
+                self._latencies += [end - submitted for _, _, submitted in batch]
+                # the latencies of the last requests are enough for the percentiles
+                del self._latencies[:-10000]
+
+
+    def metrics(self, reset=False):
+        """
+        Get the latency and throughput of the batches run so far.
+
+        Args:
+            reset (bool): Whether to start measuring again afterwards.
+
+        Returns:
+            metrics (dict): The number of requests, batches and errors, the mean batch size, the latency percentiles in ms from the submission of a request to its result, the time spent predicting, and the throughput in requests per second.
+        """
+        with self._lock:
+            elapsed = time.perf_counter() - self._started
+            latencies = np.array(self._latencies) * 1000
+
+            metrics = {
+                'requests': self._n_requests,
+                'batches': self._n_batches,
+                'errors': self._n_errors,
+                'mean_batch_size': self._n_requests / self._n_batches if self._n_batches else 0.0,
+                'latency_ms_p50': float(np.percentile(latencies, 50)) if latencies.size else 0.0,
+                'latency_ms_p95': float(np.percentile(latencies, 95)) if latencies.size else 0.0,
+                'latency_ms_p99': float(np.percentile(latencies, 99)) if latencies.size else 0.0,
+                'predict_seconds': self._predict_seconds,
+                'throughput_rps': self._n_requests / elapsed if elapsed > 0 else 0.0,
+            }
+
+            if reset:
+                self._reset_metrics()
+
+        return metrics
+
+
+    def close(self):
+        """
+        Stop the thread once the queued requests are run.
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+
+class ScoringService:
+    """
+    Score raw recordings with a trained model and its fitted preprocessing, loaded once.
+
+    The recordings are preprocessed in the threads of the requests, and the model is called by a MicroBatcher.
+
+    Attributes:
+        model (tensorflow.keras.Model): The trained model, with a single sigmoid output.
+        preprocessor (RecordingPreprocessor): The fitted preprocessing of the model.
+        batcher (MicroBatcher): The micro-batcher of the model's calls.
+    """
+
+
+    def __init__(self, model, preprocessor, max_batch_size=32, max_latency_ms=10):
+        """
+        Initializes a new ScoringService.
+
+        Args:
+            model (tensorflow.keras.Model): The trained model, with a single sigmoid output.
+            preprocessor (RecordingPreprocessor): The fitted preprocessing of the model.
+            max_batch_size (int): The maximum number of recordings the model is called with at once.
+            max_latency_ms (float): The maximum time, in ms, a recording waits for others to be batched with.
+        """
+        self.model = model
+        self.preprocessor = preprocessor
+        self.batcher = MicroBatcher(self._predict, max_batch_size, max_latency_ms)
+
+
+    def _predict(self, images):
+        # calling the model directly avoids the per call overhead of model.predict on small batches
+        probabilities = self.model(np.stack(images), training=False)
+
+        return np.asarray(probabilities, dtype=np.float64).reshape(len(images), -1)[:, 0].tolist()
+
+
+    def score_async(self, recordings):
+        """
+        Preprocess recordings, and queue them to be scored.
+
+        Args:
+            recordings (list): The raw recordings, see RecordingPreprocessor.parse.
+
+        Returns:
+            futures (list[concurrent.futures.Future]): The future of the PD probability of every recording.
+        """
+        images = self.preprocessor.transform(recordings)
+
+        return [self.batcher.submit(image) for image in images]
+
+
+    def score(self, recordings):
+        """
+        Score recordings.
+
+        Args:
+            recordings (list): The raw recordings, see RecordingPreprocessor.parse.
+
+        Returns:
+            probabilities (list[float]): The PD probability of every recording.
+        """
+        return [future.result() for future in self.score_async(recordings)]
+
+
+    def close(self):
+        self.batcher.close()
+
+
+class _ScoringHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send(200, 'ok')
+        elif self.path == '/metrics':
+            self._send(200, self.service.batcher.metrics())
+        else:
+            self._send(404, {'error': 'Unknown path ' + self.path + '.'})
+
+
+    def do_POST(self):
+        if self.path != '/score':
+            self._send(404, {'error': 'Unknown path ' + self.path + '.'})
+            return
+
+        start = time.perf_counter()
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        try:
+            if self.headers.get('Content-Type', '').startswith('application/json'):
+                request = json.loads(body)
+                if not isinstance(request, dict):
+                    raise ValueError("The JSON body should be an object with the 'samples' of a recording or the 'recordings' of a batch.")
+                batched = 'recordings' in request
+                recordings = request['recordings'] if batched else [request['samples']]
+            else:
+                batched = False
+                recordings = [body]
+
+            probabilities = self.service.score(recordings)
+        except (AssertionError, KeyError, TypeError, ValueError) as e:
+            self._send(400, {'error': str(e)})
+            return
+        except Exception as e:
+            # e.g. the model failed, the client still gets an answer
+            self._send(500, {'error': type(e).__name__ + ': ' + str(e)})
+            return
+
+        response = {'probabilities': probabilities} if batched else {'probability': probabilities[0]}
+        response['latency_ms'] = (time.perf_counter() - start) * 1000
+
+        self._send(200, response)
+
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(service, host='127.0.0.1', port=8000):
+    """
+    Build the HTTP server of a scoring service, every request being handled in a thread of its own.
+
+    Args:
+        service (ScoringService): The scoring service.
+        host (str): The address to listen on, defaults to the local host only.
+        port (int): The port to listen on, 0 for any free port.
+
+    Returns:
+        server (http.server.ThreadingHTTPServer): The server, to be run with serve_forever.
+    """
+    handler = type('ScoringHandler', (_ScoringHandler,), {'service': service})
+
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Score raw recordings with a trained model, from a local HTTP service.')
+    parser.add_argument('--bundle', default=None, help='The bundle of the model and its fitted preprocessing, saved by modeling.bundle.save_bundle.')
+    parser.add_argument('--model', default=None, help='The saved keras model, when there is no bundle.')
+    parser.add_argument('--scaler', default=None, help='The JSON file of the StreamingStandardScaler fitted on the training set, when there is no bundle.')
+    parser.add_argument('--length', type=int, default=None, help='The number of samples of the images the model was trained on, when there is no bundle.')
+    parser.add_argument('--resize', default='pad', choices=['pad', 'interpolate'], help='How the recordings are brought to the length.')
+    parser.add_argument('--host', default='127.0.0.1', help='The address to listen on.')
+    parser.add_argument('--port', type=int, default=8000, help='The port to listen on.')
+    parser.add_argument('--max-batch-size', type=int, default=32, help='The maximum number of recordings scored at once.')
+    parser.add_argument('--max-latency-ms', type=float, default=10, help='The maximum time a recording waits for others to be batched with.')
+    parser.add_argument('--threads', type=int, default=None, help='The number of threads of tensorflow, by default all the CPUs.')
+    args = parser.parse_args()
+
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    os.environ.setdefault('CUDA_VISIBLE_DEVICES', '')
+
+    assert args.bundle is not None or None not in (args.model, args.scaler, args.length), "Either a bundle, or a model, a scaler and a length are needed."
+
+    import tensorflow as tf
+
+    if args.threads is not None:
+        tf.config.threading.set_intra_op_parallelism_threads(args.threads)
+
+    if args.bundle is not None:
+        from modeling.bundle import load_bundle
+
+        preprocessor, model = load_bundle(args.bundle)
+    else:
+        from datamanipulation.scaling import StreamingStandardScaler
+        from modeling.preprocessing import RecordingPreprocessor
+
+        model = tf.keras.models.load_model(args.model)
+        preprocessor = RecordingPreprocessor(args.length, StreamingStandardScaler.load(args.scaler), resize=args.resize)
+
+    service = ScoringService(model, preprocessor, args.max_batch_size, args.max_latency_ms)
+    server = make_server(service, args.host, args.port)
+
+    print('Scoring on http://' + args.host + ':' + str(server.server_address[1]) + '/score')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,125 @@
+"""
+Report the memory the data takes at every stage of the pipeline.
+
+Usage:
+    report = MemoryReport()
+    info, data = reader.load_french()
+    report.add('load_french', data)
+    extracted = extract_features(data)
+    report.add('extract_features', extracted)
+    report.print()
+"""
+
+
+def nbytes(obj):
+    """
+    Count the bytes held by the data of an object, deeply, i.e. including the python strings of object columns.
+
+    Args:
+        obj (object): A pandas DataFrame, Series or Index, a numpy array, or a list, tuple or dict of them.
+
+    Returns:
+        n_bytes (int): The number of bytes, 0 for any other object.
+    """
+    if hasattr(obj, 'memory_usage') and hasattr(obj, 'columns'):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if hasattr(obj, 'memory_usage'):
+        return int(obj.memory_usage(deep=True))
+    if hasattr(obj, 'nbytes'):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sum(nbytes(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(nbytes(value) for value in obj)
+
+    return 0
+
+
+def column_nbytes(data):
+    """
+    Count the bytes held by every column of a dataframe, and by its index.
+
+    Args:
+        data (pandas.core.frame.DataFrame): The dataframe.
+
+    Returns:
+        n_bytes (dict): A dictionary mapping 'Index' and every column to its number of bytes.
+    """
+    usage = data.memory_usage(index=True, deep=True)
+
+    return {str(key): int(value) for key, value in usage.items()}
+
+
+class MemoryReport:
+    """
+    The bytes held by the outputs of the stages of a pipeline.
+
+    Attributes:
+        entries (list[dict]): The 'stage', 'bytes', 'dtypes' and 'columns' of every stage, in the order they were added.
+    """
+
+
+    def __init__(self):
+        self.entries = list()
+
+
+    def add(self, stage, obj):
+        """
+        Measure the output of a stage.
+
+        Args:
+            stage (str): The name of the stage.
+            obj (object): The output of the stage, see nbytes.
+
+        Returns:
+            obj (object): The same object, so that the call can wrap the stage.
+        """
+        entry = {'stage': stage, 'bytes': nbytes(obj), 'dtypes': None, 'columns': None}
+
+        if hasattr(obj, 'columns'):
+            entry['dtypes'] = {str(dtype): int(count) for dtype, count in obj.dtypes.astype(str).value_counts().items()}
+            entry['columns'] = column_nbytes(obj)
+        elif hasattr(obj, 'dtype'):
+            entry['dtypes'] = {str(obj.dtype): 1}
+        elif isinstance(obj, (list, tuple)) and len(obj) and hasattr(obj[0], 'dtype'):
+            entry['dtypes'] = {str(obj[0].dtype): len(obj)}
+
+        self.entries.append(entry)
+
+        return obj
+
+
+    def totals(self):
+        """
+        Get the bytes of every stage.
+
+        Returns:
+            totals (dict): A dictionary mapping every stage to its number of bytes.
+        """
+        return {entry['stage']: entry['bytes'] for entry in self.entries}
+
+
+    def table(self):
+        """
+        Format the report as a table, with the size of every stage in MB, its ratio to the first stage, and its dtypes.
+
+        Returns:
+            table (str): The table.
+        """
+        lines = ['{:<24} {:>10} {:>8}  {}'.format('Stage', 'MB', 'Ratio', 'Dtypes')]
+
+        reference = self.entries[0]['bytes'] if self.entries else 0
+
+        for entry in self.entries:
+            ratio = entry['bytes'] / reference if reference else 1.0
+            dtypes = ', '.join(str(count) + ' ' + dtype for dtype, count in (entry['dtypes'] or {}).items())
+            lines.append('{:<24} {:>10.2f} {:>7.2f}x  {}'.format(entry['stage'], entry['bytes'] / 2 ** 20, ratio, dtypes))
+
+        return '\n'.join(lines)
+
+
+    def print(self):
+        """
+        Print the report as a table.
+        """
+        print(self.table())
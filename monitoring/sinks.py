@@ -0,0 +1,84 @@
+import json
+import logging
+
+
+class LoggingSink:
+    """
+    A sink that logs every stage record as a single line.
+    """
+
+
+    def __init__(self, logger=None, level=logging.INFO):
+        """
+        Initializes a new LoggingSink.
+
+        Args:
+            logger (logging.Logger): The logger, defaults to the 'pd_classification' logger.
+            level (int): The level of the log records.
+        """
+        self.logger = logging.getLogger('pd_classification') if logger is None else logger
+        self.level = level
+
+
+    def emit(self, record):
+        counters = ' '.join(key + '=' + str(value) for key, value in record['counters'].items())
+        self.logger.log(self.level, '%s took %.3fs %s', record['stage'], record['seconds'], counters)
+
+
+class JsonLinesSink:
+    """
+    A sink that appends every stage record to a JSON lines file.
+    """
+
+
+    def __init__(self, path):
+        """
+        Initializes a new JsonLinesSink.
+
+        Args:
+            path (str or pathlib.Path): The file the records are appended to.
+        """
+        self.path = path
+
+
+    def emit(self, record):
+        f = open(self.path, 'a')
+        f.write(json.dumps(record, default=str) + '\n')
+        f.close()
+
+
+class MemorySink:
+    """
+    A sink that keeps every stage record in memory, e.g. for tests and notebooks.
+
+    Attributes:
+        records (list[dict]): The records, in the order the stages ended.
+    """
+
+
+    def __init__(self):
+        self.records = list()
+
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+    def totals(self):
+        """
+        Sum the time and counters of the records per stage.
+
+        Returns:
+            totals (dict): A dictionary mapping every stage to its total 'seconds', number of 'calls', and summed counters.
+        """
+        totals = dict()
+
+        for record in self.records:
+            total = totals.setdefault(record['stage'], {'seconds': 0.0, 'calls': 0})
+            total['seconds'] += record['seconds']
+            total['calls'] += 1
+
+            for key, value in record['counters'].items():
+                total[key] = total.get(key, 0) + value
+
+        return totals
@@ -0,0 +1,203 @@
+"""
+Structured timing and counters of the stages of the pipeline.
+
+A stage records its wall time, its counters (files and bytes read, lines parsed and rejected, recordings produced...), and memory, then hands the record to every registered sink. While no sink is registered, stage does nothing but yield a shared record whose count is a no-op.
+
+The memory of a record is:
+    process_peak_memory_mb: The peak resident memory of the whole process since it started, not of the stage, which excludes the worker processes.
+    stage_peak_traced_mb: The peak of the memory allocated by Python while the stage ran, in any thread, only while tracemalloc is tracing.
+
+The progress messages of the loaders and transformers are logged to the 'pd_classification' logger, at the INFO level, and the lines they ignored at the WARNING level.
+
+Example:
+    import logging
+    from monitoring.stages import add_sink
+    from monitoring.sinks import LoggingSink
+
+    logging.basicConfig(level=logging.INFO)
+    add_sink(LoggingSink())
+"""
+from contextlib import contextmanager
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+_sinks = list()
+# the names of the stages entered, per thread, so that the stages of threads running at once don't nest into each other
+_local = threading.local()
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = list()
+        _local.traced_peaks = list()
+
+    return _local.stack
+
+
+def _enter_traced():
+    """
+    Start measuring the traced peak of a stage, handing the peak measured so far to the stage it's nested in.
+    """
+    peaks = _local.traced_peaks
+    if peaks:
+        peaks[-1] = max(peaks[-1], tracemalloc.get_traced_memory()[1])
+
+    tracemalloc.reset_peak()
+    peaks.append(0)
+
+
+def _exit_traced():
+    """
+    Stop measuring the traced peak of a stage.
+
+    Returns:
+        peak (int): The peak of the traced memory while the stage ran, in bytes.
+    """
+    peaks = _local.traced_peaks
+    peak = max(peaks.pop(), tracemalloc.get_traced_memory()[1])
+
+    # the peak of the stage is also a peak of the stage it's nested in
+    tracemalloc.reset_peak()
+    if peaks:
+        peaks[-1] = max(peaks[-1], peak)
+
+    return peak
+
+
+def add_sink(sink):
+    """
+    Register a sink, which receives the record of every stage from now on.
+
+    Args:
+        sink (object): An object with an emit(record) method, e.g. one of monitoring.sinks.
+    """
+    _sinks.append(sink)
+
+
+def remove_sink(sink):
+    """
+    Unregister a sink.
+
+    Args:
+        sink (object): A sink registered with add_sink.
+    """
+    _sinks.remove(sink)
+
+
+def enabled():
+    """
+    Check whether any sink is registered.
+
+    Returns:
+        enabled (bool): True if stages are being recorded.
+    """
+    return len(_sinks) > 0
+
+
+def peak_memory_mb():
+    """
+    Get the peak resident memory of the current process so far, i.e. since it started rather than during a stage, excluding its child processes.
+
+    Returns:
+        peak (float): The peak resident set size in MiB, None where the resource module is unavailable.
+    """
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in bytes on macOS, and in KiB elsewhere
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+class StageRecord:
+    """
+    The record of a stage, filled while the stage runs.
+
+    Attributes:
+        stage (str): The name of the stage, prefixed with the names of its enclosing stages, e.g. 'load_french/parse'.
+        counters (dict): The counters of the stage.
+        fields (dict): The constant fields of the stage, e.g. its arguments.
+    """
+
+
+    def __init__(self, stage, fields):
+        self.stage = stage
+        self.counters = dict()
+        self.fields = fields
+
+
+    def count(self, name, n=1):
+        """
+        Increment a counter of the stage.
+
+        Args:
+            name (str): The name of the counter, e.g. 'lines_rejected'.
+            n (int): The increment.
+        """
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+
+
+class _NullRecord:
+    def count(self, name, n=1):
+        pass
+
+
+_NULL_RECORD = _NullRecord()
+
+
+@contextmanager
+def stage(name, **fields):
+    """
+    Record a stage of the pipeline.
+
+    Args:
+        name (str): The name of the stage.
+        **fields: Constant fields added to the record, e.g. workers=4.
+
+    Yields:
+        record (StageRecord): The record of the stage, to count things on.
+    """
+    if not _sinks:
+        yield _NULL_RECORD
+        return
+
+    stack = _stack()
+    record = StageRecord('/'.join(stack + [name]), fields)
+    stack.append(name)
+
+    traced = tracemalloc.is_tracing()
+    if traced:
+        _enter_traced()
+
+    start = time.perf_counter()
+
+    try:
+        yield record
+    finally:
+        seconds = time.perf_counter() - start
+        stack.pop()
+
+        event = {
+            'stage': record.stage,
+            'seconds': seconds,
+            'counters': record.counters,
+            'process_peak_memory_mb': peak_memory_mb(),
+            'timestamp': time.time(),
+        }
+        if traced and tracemalloc.is_tracing():
+            event['stage_peak_traced_mb'] = _exit_traced() / 2 ** 20
+        elif traced:
+            _local.traced_peaks.pop()
+        event.update(record.fields)
+
+        for sink in list(_sinks):
+            sink.emit(event)
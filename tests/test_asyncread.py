@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+from benchmarks.corpus import generate_corpus
+from dataaccess.asyncread import map_participants_async
+from dataaccess.filedatareader import FileDataReader
+
+
+def test_unreadable_files_are_skipped(tmp_path):
+    paths = [tmp_path / 'file.txt', tmp_path / 'missing.txt', tmp_path / 'directory.txt']
+    paths[0].write_bytes(b'content')
+    paths[2].mkdir()
+
+    async def read(bounded_io, path):
+        return await bounded_io.read(path)
+
+    assert map_participants_async(read, paths, max_in_flight=2) == [b'content', None, None]
+
+
+def test_async_load_skips_like_the_sync_load(tmp_path):
+    french_dir = generate_corpus(tmp_path, n_participants=4, min_rows=20, max_rows=40, missing_task_rate=0.2, seed=3)
+
+    # a task file that can't be read, here a directory in its place
+    task_file = sorted(french_dir.glob('*/*/Test2.txt'))[0]
+    task_file.unlink()
+    task_file.mkdir()
+
+    reader = FileDataReader(tmp_path)
+    info, data = reader.load_french()
+    async_info, async_data = reader.load_french(max_in_flight=4)
+
+    pd.testing.assert_frame_equal(async_info, info)
+    pd.testing.assert_frame_equal(async_data, data)
+
+
+def test_unreadable_info_file_raises_like_the_sync_load(tmp_path):
+    french_dir = generate_corpus(tmp_path, n_participants=2, min_rows=20, max_rows=40, seed=4)
+    (sorted(french_dir.iterdir())[0] / 'Info.txt').unlink()
+
+    reader = FileDataReader(tmp_path)
+    with pytest.raises(FileNotFoundError):
+        reader.load_french()
+    with pytest.raises(FileNotFoundError):
+        reader.load_french(max_in_flight=4)
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from datamanipulation.bucketing import BucketedBatches
+
+
+def _images(lengths, n_features=3):
+    return [np.full((length, n_features), i + 1, dtype=np.float32) for i, length in enumerate(lengths)]
+
+
+def test_every_image_is_batched_once():
+    X = _images([5, 7, 20, 22, 3, 40, 41, 9])
+    y = np.arange(len(X)) % 2
+    batches = BucketedBatches(X, y, indices=np.arange(1, len(X)), batch_size=2, n_buckets=3, random_state=0)
+
+    seen = list()
+    for X_batch, y_batch in batches:
+        assert X_batch.shape[0] <= 2
+        for image in X_batch:
+            i = int(image[0, 0]) - 1
+            assert np.all(image[:X[i].shape[0]] == i + 1)
+            assert np.all(image[X[i].shape[0]:] == 0)
+            seen.append(i)
+
+    assert sorted(seen) == list(range(1, len(X)))
+    assert batches.epoch_stats_[0]['real_steps'] == sum(image.shape[0] for image in X[1:])
+
+
+def test_no_images_to_batch():
+    X = _images([5, 7])
+
+    with pytest.raises(AssertionError, match='indices is empty'):
+        BucketedBatches(X, [0, 1], indices=np.array([], dtype=np.int64))
+
+    with pytest.raises(AssertionError, match='X is empty'):
+        BucketedBatches([], [])
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datamanipulation.extraction import FeatureGraphExtractor
+from datamanipulation.scaling import StreamingStandardScaler
+from modeling.bundle import load_bundle, read_manifest, save_bundle
+from modeling.preprocessing import RecordingPreprocessor
+
+
+DATA_HEADER = ['Time', 'X', 'Y', 'P', 'Az', 'Al']
+
+
+def _recordings(n_recordings=4, seed=0):
+    rng = np.random.default_rng(seed)
+    recordings = list()
+    for _ in range(n_recordings):
+        n_rows = int(rng.integers(20, 40))
+        samples = rng.integers(0, 2000, (n_rows, len(DATA_HEADER)))
+        samples[:, 0] = np.cumsum(rng.integers(7, 9, n_rows))
+        recordings.append(samples)
+
+    return recordings
+
+
+def _preprocessor(recordings, length=32):
+    lengths = [samples.shape[0] for samples in recordings]
+    index = pd.MultiIndex.from_arrays([np.repeat(np.arange(len(recordings)), lengths)])
+    data = pd.DataFrame(np.concatenate(recordings), columns=DATA_HEADER, index=index)
+
+    extracted = FeatureGraphExtractor(copy=False).transform(data)
+
+    return RecordingPreprocessor(length, StreamingStandardScaler().fit(extracted))
+
+
+def test_preprocessing_round_trip(tmp_path):
+    preprocessor = _preprocessor(_recordings())
+    save_bundle(tmp_path / 'model.bundle', preprocessor, metadata={'accuracy': 0.5})
+
+    loaded, model = load_bundle(tmp_path / 'model.bundle')
+
+    assert model is None
+    assert read_manifest(tmp_path / 'model.bundle')['metadata'] == {'accuracy': 0.5}
+    assert loaded.get_state() == preprocessor.get_state()
+
+
+def test_model_round_trip(tmp_path):
+    tf = pytest.importorskip('tensorflow')
+
+    recordings = _recordings()
+    preprocessor = _preprocessor(recordings)
+
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input((preprocessor.length, len(preprocessor.columns))),
+        tf.keras.layers.GRU(4),
+        tf.keras.layers.Dense(1, activation='sigmoid'),
+    ])
+
+    save_bundle(tmp_path / 'model.bundle', preprocessor, model)
+    loaded_preprocessor, loaded_model = load_bundle(tmp_path / 'model.bundle')
+
+    assert loaded_preprocessor.length == preprocessor.length
+    assert loaded_preprocessor.columns == preprocessor.columns
+    assert loaded_preprocessor.scaler.columns_ == preprocessor.scaler.columns_
+    np.testing.assert_array_equal(loaded_preprocessor.scaler.n_samples_seen_, preprocessor.scaler.n_samples_seen_)
+    np.testing.assert_array_equal(loaded_preprocessor.scaler.mean_, preprocessor.scaler.mean_)
+    np.testing.assert_array_equal(loaded_preprocessor.scaler.scale_, preprocessor.scaler.scale_)
+
+    weights = model.get_weights()
+    loaded_weights = loaded_model.get_weights()
+    assert len(loaded_weights) == len(weights)
+    for loaded_weight, weight in zip(loaded_weights, weights):
+        assert loaded_weight.dtype == weight.dtype
+        np.testing.assert_array_equal(loaded_weight, weight)
+
+    images = preprocessor.transform(recordings)
+    np.testing.assert_array_equal(loaded_preprocessor.transform(recordings), images)
+    np.testing.assert_array_equal(loaded_model(images, training=False).numpy(), model(images, training=False).numpy())
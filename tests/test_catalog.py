@@ -0,0 +1,77 @@
+import io
+import contextlib
+import os
+import pickle
+import pandas as pd
+from benchmarks.corpus import generate_corpus
+from dataaccess.catalog import CorpusCatalog
+from dataaccess.filedatareader_v2 import FileDataReader
+
+
+TASKS_PER_LANG = {'fr': [0, 1, 2, 3, 4, 5, 6], 'ar': [0, 1, 2]}
+
+
+def _load(reader, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return reader.load_data(TASKS_PER_LANG, **kwargs)
+
+
+def _count_refreshes(monkeypatch):
+    calls = list()
+    refresh_participant = CorpusCatalog.refresh_participant
+
+    def counting(self, participant_id, save=True):
+        calls.append(participant_id)
+        return refresh_participant(self, participant_id, save)
+
+    monkeypatch.setattr(CorpusCatalog, 'refresh_participant', counting)
+
+    return calls
+
+
+def test_catalog_matches_the_directories(tmp_path):
+    generate_corpus(tmp_path, n_participants=6, min_rows=20, max_rows=60, missing_task_rate=0.3, seed=1)
+
+    expected = _load(FileDataReader(tmp_path))
+    cataloged = _load(FileDataReader(tmp_path, catalog_path=tmp_path / 'catalog.json'))
+
+    pd.testing.assert_frame_equal(expected, cataloged)
+
+
+def test_warm_lookups_of_missing_tasks_dont_rescan(tmp_path, monkeypatch):
+    generate_corpus(tmp_path, n_participants=6, min_rows=20, max_rows=60, missing_task_rate=0.3, seed=1)
+    _load(FileDataReader(tmp_path, catalog_path=tmp_path / 'catalog.json'))
+
+    calls = _count_refreshes(monkeypatch)
+    reader = FileDataReader(tmp_path, catalog_path=tmp_path / 'catalog.json')
+    _load(reader)
+    _load(reader)
+
+    assert calls == []
+    assert reader.catalog.get('P00000', 'ar', 0) is None
+    assert calls == []
+
+
+def test_added_task_file_is_found(tmp_path, monkeypatch):
+    generate_corpus(tmp_path, n_participants=3, min_rows=20, max_rows=60, missing_task_rate=0, seed=1)
+    task_file = tmp_path / 'HW-FRENCH' / 'P00001' / 'Session1' / 'Test7.txt'
+    os.rename(task_file, tmp_path / 'Test7.txt')
+
+    _load(FileDataReader(tmp_path, catalog_path=tmp_path / 'catalog.json'))
+    os.rename(tmp_path / 'Test7.txt', task_file)
+
+    calls = _count_refreshes(monkeypatch)
+    reader = FileDataReader(tmp_path, catalog_path=tmp_path / 'catalog.json')
+
+    assert reader.catalog.get('P00001', 'fr', 6) is not None
+    assert calls == ['P00001']
+    assert reader.load_hw('P00001', 'fr', 6).shape[0] > 0
+
+
+def test_worker_copies_dont_save(tmp_path):
+    generate_corpus(tmp_path, n_participants=2, min_rows=20, max_rows=60, seed=1)
+    reader = FileDataReader(tmp_path, catalog_path=tmp_path / 'catalog.json')
+    _load(reader)
+
+    assert reader.catalog.autosave
+    assert not pickle.loads(pickle.dumps(reader.catalog)).autosave
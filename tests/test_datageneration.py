@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+from datamanipulation.datageneration import get_samples
+from datamanipulation.grouping import contiguous_groups
+from dataaccess.recordingstore import RecordingStore
+
+
+def _hw_data(n_recordings=2, n_samples=3):
+    index = pd.MultiIndex.from_product([['P0', 'P1'][:n_recordings], ['French'], range(n_samples)], names=['ID', 'Language', 'Sample']).droplevel('Sample')
+    return pd.DataFrame({'PD': np.repeat([1, 0][:n_recordings], n_samples), 'Time': np.arange(n_recordings * n_samples), 'X': np.arange(n_recordings * n_samples) * 2}, index=index)
+
+
+def test_empty_frame():
+    data = _hw_data().iloc[:0]
+
+    grouped, starts = contiguous_groups(data)
+    assert grouped.shape[0] == 0
+    assert starts.shape == (0,)
+
+    X, y = get_samples(data, 'PD')
+    assert X == []
+    assert y.shape == (0,)
+
+    samples, offsets, y = get_samples(data, 'PD', flat=True)
+    assert samples.shape == (0, 2)
+    assert list(offsets) == [0]
+    assert y.shape == (0,)
+
+
+def test_empty_stream():
+    X, y = get_samples(iter([]), 'PD')
+    assert X == []
+    assert y.shape == (0,)
+
+    samples, offsets, y = get_samples(iter([]), 'PD', flat=True)
+    assert samples.shape[0] == 0
+    assert list(offsets) == [0]
+    assert y.shape == (0,)
+
+
+def test_frame_and_stream_agree():
+    data = _hw_data()
+
+    X, y = get_samples(data, 'PD')
+    X_stream, y_stream = get_samples(((None, recording) for _, recording in data.groupby(level=[0, 1], sort=False)), 'PD')
+
+    assert [x.tolist() for x in X] == [x.tolist() for x in X_stream]
+    assert y.tolist() == y_stream.tolist() == [1, 0]
+
+
+def test_recording_store_round_trip(tmp_path):
+    data = _hw_data()
+    store = RecordingStore.from_dataframe(data, meta_columns=['PD'])
+
+    pd.testing.assert_frame_equal(store.to_dataframe(), data)
+
+    store.save(tmp_path)
+    loaded = RecordingStore.load(tmp_path)
+    assert isinstance(loaded.samples, np.memmap)
+    pd.testing.assert_frame_equal(loaded.to_dataframe(), data)
+
+
+def test_samples_of_a_recording_store(tmp_path):
+    data = _hw_data()
+    RecordingStore.from_dataframe(data, meta_columns=['PD']).save(tmp_path)
+    store = RecordingStore.load(tmp_path)
+
+    X, y = get_samples(data, 'PD')
+    X_store, y_store = get_samples(store, 'PD')
+    assert [x.tolist() for x in X] == [x.tolist() for x in X_store]
+    assert y.tolist() == y_store.tolist()
+    assert all(np.shares_memory(x, store.samples) for x in X_store)
+
+    samples, offsets, y = get_samples(data, 'PD', flat=True)
+    samples_store, offsets_store, y_store = get_samples(store, 'PD', flat=True)
+    assert np.array_equal(samples, samples_store)
+    assert offsets.tolist() == offsets_store.tolist()
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datamanipulation.extraction import DEFAULT_FEATURES, FeatureGraphExtractor
+from datamanipulation.incremental import IncrementalFeatureEngine
+
+
+COLUMNS = ['Time', 'X', 'Y', 'P', 'Az', 'Al']
+
+
+def _recording(vertical_moves, seed=0, n_rows=50):
+    rng = np.random.default_rng(seed)
+    samples = rng.integers(0, 500, (n_rows, len(COLUMNS))).astype(np.float64)
+    samples[:, 0] = np.cumsum(rng.integers(7, 9, n_rows))
+
+    # the pen moves vertically, so the Slope is infinite
+    for row in vertical_moves:
+        samples[row, 1] = samples[row - 1, 1]
+
+    return samples
+
+
+def _batch_features(samples):
+    extracted = FeatureGraphExtractor(DEFAULT_FEATURES, copy=False).transform(pd.DataFrame(samples, columns=COLUMNS))
+    return extracted[DEFAULT_FEATURES].to_numpy(dtype=np.float64)
+
+
+def test_features_match_the_batch_extractor_without_infinities():
+    samples = _recording([])
+    engine = IncrementalFeatureEngine()
+
+    features = engine.update_chunk(samples)
+
+    assert engine.exact
+    np.testing.assert_allclose(engine.finish(features), _batch_features(samples), rtol=1e-13)
+    assert engine.n_samples == 0
+
+
+def test_replaced_infinities_differ_unless_recomputed():
+    # a steeper slope after the vertical move, so the extreme of the samples seen so far isn't the one of the whole recording
+    samples = _recording([5])
+    samples[30, 2] = samples[29, 2] + 10000
+    batch = _batch_features(samples)
+
+    engine = IncrementalFeatureEngine()
+    features = engine.update_chunk(samples)
+
+    assert engine.n_inf_replaced > 0
+    assert not np.allclose(features, batch)
+    np.testing.assert_array_equal(engine.finish(features), features)
+
+    engine.update_chunk(samples)
+    with pytest.raises(AssertionError, match='samples should be kept'):
+        engine.finish(recompute=True)
+
+    engine = IncrementalFeatureEngine(keep_samples=True)
+    features = engine.update_chunk(samples)
+    np.testing.assert_allclose(engine.finish(features, recompute=True), batch, rtol=1e-13)
@@ -0,0 +1,71 @@
+import os
+import numpy as np
+import pandas as pd
+from benchmarks.corpus import generate_corpus
+from dataaccess.filedatareader import FileDataReader
+from dataaccess.loadcache import LoadCache
+
+
+def _count_parses(monkeypatch):
+    parsed = list()
+    fetch_participant = FileDataReader._fetch_participant
+
+    def counting(self, patient_dir, tasks, info_only=False, projection={}):
+        parsed.append(patient_dir.name)
+        return fetch_participant(self, patient_dir, tasks, info_only, projection)
+
+    monkeypatch.setattr(FileDataReader, '_fetch_participant', counting)
+
+    return parsed
+
+
+def test_only_changed_participants_are_parsed_again(tmp_path, monkeypatch):
+    french_dir = generate_corpus(tmp_path / 'corpus', n_participants=5, min_rows=20, max_rows=50, seed=2)
+    reader = FileDataReader(tmp_path / 'corpus', cache_dir=tmp_path / 'cache')
+    parsed = _count_parses(monkeypatch)
+
+    info, data = reader.load_french()
+    assert sorted(parsed) == sorted(info.index)
+
+    del parsed[:]
+    cached_info, cached_data = reader.load_french()
+    assert parsed == []
+    pd.testing.assert_frame_equal(cached_data, data)
+
+    # touch a task file of a single participant
+    participant_id = sorted(info.index)[2]
+    task_file = sorted((french_dir / participant_id).glob('*/Test*.txt'))[0]
+    stat = task_file.stat()
+    os.utime(task_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    reloaded_info, reloaded_data = reader.load_french()
+    assert parsed == [participant_id]
+    pd.testing.assert_frame_equal(reloaded_data, data)
+
+    del parsed[:]
+    reader.load_french()
+    assert parsed == []
+
+
+def test_entry_is_swapped_in_whole(tmp_path):
+    cache = LoadCache(tmp_path / 'cache', {'corpus': 'a'})
+
+    def participant(participant_id, n_rows):
+        return {'ID': participant_id, 'fingerprint': [['Info.txt', 1, 1]], 'info': {'ID': participant_id}, 'n_rejected': 0,
+                'hw_data': np.full((n_rows, 6), n_rows, dtype=np.int32), 'task_col': np.ones(n_rows, dtype=np.int64)}
+
+    cache.save([participant('P1', 3)], 6)
+    loaded = cache.load()
+    cache.save([participant('P1', 4), participant('P2', 2)], 6)
+
+    # the first entry is still readable by the load that mapped it
+    assert loaded['P1']['hw_data'].tolist() == [[3] * 6] * 3
+
+    reloaded = cache.load()
+    assert sorted(reloaded) == ['P1', 'P2']
+    assert reloaded['P1']['hw_data'].shape == (4, 6)
+    assert sorted(path.name for path in (tmp_path / 'cache').iterdir()) == [cache.entry_dir.name]
+
+    # an entry moved aside by a save that died is still loaded
+    os.replace(cache.entry_dir, cache.old_dir)
+    assert sorted(cache.load()) == ['P1', 'P2']
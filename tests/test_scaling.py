@@ -0,0 +1,94 @@
+import json
+import numpy as np
+import pandas as pd
+from datamanipulation.scaling import StreamingStandardScaler
+
+
+def _features(seed=0, n_participants=12):
+    rng = np.random.default_rng(seed)
+    frames = list()
+    for i in range(n_participants):
+        n_rows = int(rng.integers(1, 60))
+        frames.append(pd.DataFrame({
+            'ID': 'P' + str(i),
+            'Speed': rng.normal(3, 2, n_rows),
+            # a large offset, where the naive sum of squares loses the variance
+            'Time': 1e9 + rng.normal(0, 1, n_rows),
+            'Slope': np.where(rng.random(n_rows) < 0.1, np.nan, rng.normal(-1, 5, n_rows)),
+            'PD': i % 2,
+        }))
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def _notebook_mean_std(data):
+    # the mean_std path of the pipeline notebook
+    mean_std = dict()
+    for col in data.columns[1:]:
+        mean_std[col] = (data[col].mean(), data[col].std())
+
+    return mean_std
+
+
+def test_chunked_partial_fit_matches_pandas():
+    data = _features()
+    mean_std = _notebook_mean_std(data.drop(columns='PD'))
+
+    scaler = StreamingStandardScaler()
+    bounds = [0, 1, 1, 40, 41, 200, data.shape[0]]
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        scaler.partial_fit(data.iloc[start:stop])
+
+    assert scaler.columns_ == list(mean_std)
+    np.testing.assert_allclose(scaler.mean_, [mean for mean, _ in mean_std.values()], rtol=1e-12)
+    # the values around 1e9 only have 7 significant digits around their mean, where the naive sum of squares would have none
+    np.testing.assert_allclose(scaler.scale_, [std for _, std in mean_std.values()], rtol=1e-6)
+    assert scaler.n_samples_seen_.tolist() == data[scaler.columns_].count().tolist()
+
+    standardized = scaler.transform(data.copy())
+    for col, (mean, std) in mean_std.items():
+        np.testing.assert_allclose(standardized[col], (data[col] - mean) / std, rtol=1e-6, atol=1e-6)
+
+
+def test_fit_on_recordings_matches_pandas():
+    data = _features(seed=1)
+    recordings = [({'ID': participant_id}, recording) for participant_id, recording in data.groupby('ID', sort=False)]
+
+    scaler = StreamingStandardScaler().fit(iter(recordings))
+    reference = StreamingStandardScaler.from_mean_std(_notebook_mean_std(data.drop(columns='PD')), n_samples=data.shape[0])
+
+    np.testing.assert_allclose(scaler.mean_, reference.mean_, rtol=1e-12)
+    np.testing.assert_allclose(scaler.scale_, reference.scale_, rtol=1e-6)
+
+
+def test_state_round_trip(tmp_path):
+    data = _features(seed=2)
+    first, second = data.iloc[:150], data.iloc[150:]
+
+    scaler = StreamingStandardScaler(dtype='float32').partial_fit(first)
+    restored = StreamingStandardScaler.from_state(json.loads(json.dumps(scaler.get_state())))
+
+    assert restored.get_params() == scaler.get_params()
+    assert restored.columns_ == scaler.columns_
+    np.testing.assert_array_equal(restored.n_samples_seen_, scaler.n_samples_seen_)
+    np.testing.assert_array_equal(restored.mean_, scaler.mean_)
+    np.testing.assert_array_equal(restored.var_, scaler.var_)
+    np.testing.assert_array_equal(restored.scale_, scaler.scale_)
+
+    # the restored scaler keeps being updated like the original
+    scaler.partial_fit(second)
+    restored.partial_fit(second)
+    np.testing.assert_array_equal(restored.mean_, scaler.mean_)
+    np.testing.assert_array_equal(restored.scale_, scaler.scale_)
+
+    scaler.save(tmp_path / 'scaler.json')
+    loaded = StreamingStandardScaler.load(tmp_path / 'scaler.json')
+    pd.testing.assert_frame_equal(loaded.transform(data.copy()), scaler.transform(data.copy()))
+
+
+def test_constant_columns_are_centered():
+    data = pd.DataFrame({'ID': ['P0'] * 4, 'Speed': [1.0, 2.0, 3.0, 4.0], 'Pressure': [5.0] * 4})
+
+    standardized = StreamingStandardScaler(copy=True).fit(data).transform(data)
+
+    assert standardized['Pressure'].tolist() == [0.0] * 4
@@ -0,0 +1,85 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+import numpy as np
+from modeling.preprocessing import RecordingPreprocessor
+from modeling.serving import MicroBatcher, ScoringService, make_server
+
+
+class _FailingModel:
+    def __call__(self, images, training=False):
+        raise RuntimeError('the model failed')
+
+
+class _ConstantModel:
+    def __call__(self, images, training=False):
+        return np.full((len(images), 1), 0.25)
+
+
+def _post(server, body):
+    request = urllib.request.Request('http://127.0.0.1:' + str(server.server_address[1]) + '/score', data=json.dumps(body).encode('utf-8'), headers={'Content-Type': 'application/json'})
+    try:
+        response = urllib.request.urlopen(request, timeout=10)
+        return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def _serve(model):
+    service = ScoringService(model, RecordingPreprocessor(4, columns=['X', 'Y']), max_latency_ms=1)
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return service, server
+
+
+def _stop(service, server):
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def test_batcher_counts_errors():
+    def predict(requests):
+        raise RuntimeError('the model failed')
+
+    batcher = MicroBatcher(predict, max_latency_ms=1)
+    future = batcher.submit(1)
+
+    try:
+        future.result(timeout=10)
+        assert False, 'the error should be raised by the future'
+    except RuntimeError:
+        pass
+
+    batcher.close()
+    metrics = batcher.metrics()
+    assert metrics['requests'] == 1
+    assert metrics['errors'] == 1
+
+
+def test_model_failure_answers_500():
+    service, server = _serve(_FailingModel())
+    try:
+        status, body = _post(server, {'samples': [[0, 1, 2, 3, 4, 5]]})
+    finally:
+        _stop(service, server)
+
+    assert status == 500
+    assert 'the model failed' in body['error']
+    assert service.batcher.metrics()['errors'] == 1
+
+
+def test_bad_requests_answer_400():
+    service, server = _serve(_ConstantModel())
+    try:
+        assert _post(server, [1, 2])[0] == 400
+        assert _post(server, {'samples': 5})[0] == 400
+
+        status, body = _post(server, {'recordings': [[[0, 1, 2, 3, 4, 5]], [[0, 1, 2, 3, 4, 5], [8, 2, 3, 4, 5, 6]]]})
+    finally:
+        _stop(service, server)
+
+    assert status == 200
+    assert body['probabilities'] == [0.25, 0.25]
@@ -0,0 +1,49 @@
+import tracemalloc
+import numpy as np
+from monitoring.sinks import MemorySink
+from monitoring.stages import add_sink, remove_sink, stage
+
+
+def _records(run):
+    sink = MemorySink()
+    add_sink(sink)
+    try:
+        run()
+    finally:
+        remove_sink(sink)
+
+    return {record['stage']: record for record in sink.records}
+
+
+def test_process_peak_is_labelled_as_such():
+    def run():
+        with stage('outer'):
+            pass
+
+    record = _records(run)['outer']
+
+    assert 'process_peak_memory_mb' in record
+    assert 'stage_peak_traced_mb' not in record
+
+
+def test_traced_peak_is_per_stage():
+    def run():
+        with stage('outer'):
+            with stage('big'):
+                block = np.ones(2 ** 22)
+                del block
+
+            with stage('small'):
+                block = np.ones(2 ** 10)
+                del block
+
+    tracemalloc.start()
+    try:
+        records = _records(run)
+    finally:
+        tracemalloc.stop()
+
+    assert records['outer/big']['stage_peak_traced_mb'] >= 32
+    assert records['outer/small']['stage_peak_traced_mb'] < 1
+    # the peak of a nested stage is also a peak of the stage it's nested in
+    assert records['outer']['stage_peak_traced_mb'] >= records['outer/big']['stage_peak_traced_mb']
@@ -0,0 +1,143 @@
+import re
+import numpy as np
+from dataaccess.taskparser import count_samples, parse_samples, parse_task_text, read_task_file
+
+
+HEADER_REG = r'^[ \t]*Time[ \t]+X'
+N_COLS = 6
+
+PREAMBLE = 'Subject: P0001\nTask 1\nTime X Y P Az Al\n'
+
+ROWS = [
+    [0, 100, 200, 512, 1800, 450],
+    [8, 101, -199, 520, 1790, 460],
+    [16, 103, 198, 0, 1780, 470],
+]
+
+
+def _baseline_parse(text, header_reg, n_cols):
+    """
+    The line by line reader the decoder replaced, on the lines of a task file read in text mode.
+    """
+    rows = list()
+    n_rejected = 0
+    reg_match = None
+
+    for line in text.splitlines():
+        line = re.sub(r"[ \t]+", " ", line).strip()
+
+        if not reg_match:
+            reg_match = re.match(header_reg, line)
+            continue
+
+        try:
+            line_data = np.array(line.split(" ")).astype(np.int32).tolist()
+        except ValueError:
+            n_rejected += 1
+            continue
+
+        rows.append(line_data[:n_cols])
+
+    return rows, n_rejected
+
+
+def _text(lines, newline='\n'):
+    return PREAMBLE.replace('\n', newline) + newline.join(lines) + newline
+
+
+def _line(row, sep=' '):
+    return sep.join(str(value) for value in row)
+
+
+def test_well_formed_lines_match_the_baseline():
+    text = _text([_line(ROWS[0]), '\t' + _line(ROWS[1], ' \t '), _line(ROWS[2], '   ') + '  '])
+
+    hw_data, n_rejected = parse_task_text(text, HEADER_REG, N_COLS)
+    rows, baseline_rejected = _baseline_parse(text, HEADER_REG, N_COLS)
+
+    assert hw_data.dtype == np.int32
+    assert hw_data.tolist() == rows == ROWS
+    assert n_rejected == baseline_rejected == 0
+
+
+def test_malformed_lines_are_rejected_like_the_baseline():
+    lines = [_line(ROWS[0]), '0 1.5 2 3 4 5', 'Time X Y P Az Al', _line(ROWS[1]), '8 100 x 512 1800 450', _line(ROWS[2])]
+    text = _text(lines)
+
+    hw_data, n_rejected = parse_task_text(text, HEADER_REG, N_COLS)
+    rows, baseline_rejected = _baseline_parse(text, HEADER_REG, N_COLS)
+
+    assert hw_data.tolist() == rows == ROWS
+    assert n_rejected == baseline_rejected == 3
+
+
+def test_blank_lines_are_skipped():
+    text = _text([_line(ROWS[0]), '', '   ', _line(ROWS[1]), _line(ROWS[2])])
+
+    hw_data, n_rejected = parse_task_text(text, HEADER_REG, N_COLS)
+
+    assert hw_data.tolist() == ROWS
+    assert n_rejected == 0
+
+
+def test_short_and_long_lines_are_rejected():
+    # the baseline kept a short line with NaN in its missing columns, and a long line truncated to the data header
+    text = _text([_line(ROWS[0]), '8 101 -199', _line(ROWS[1]), _line(ROWS[2] + [7])])
+
+    hw_data, n_rejected = parse_task_text(text, HEADER_REG, N_COLS)
+    rows, baseline_rejected = _baseline_parse(text, HEADER_REG, N_COLS)
+
+    assert hw_data.tolist() == ROWS[:2]
+    assert n_rejected == 2
+    assert rows == [ROWS[0], [8, 101, -199], ROWS[1], ROWS[2]]
+    assert baseline_rejected == 0
+
+
+def test_crlf_line_endings(tmp_path):
+    lines = [_line(ROWS[0]), '0 1.5 2 3 4 5', _line(ROWS[1]), _line(ROWS[2])]
+    text = _text(lines, '\r\n')
+
+    hw_data, n_rejected = parse_task_text(text, HEADER_REG, N_COLS)
+    assert hw_data.tolist() == ROWS
+    assert n_rejected == 1
+
+    task_file = tmp_path / 'Test1.txt'
+    task_file.write_bytes(text.encode('ISO-8859-1'))
+
+    hw_data, n_rejected = read_task_file(task_file, HEADER_REG, N_COLS)
+    rows, baseline_rejected = _baseline_parse(task_file.read_text(encoding='ISO-8859-1'), HEADER_REG, N_COLS)
+
+    assert hw_data.tolist() == rows == ROWS
+    assert n_rejected == baseline_rejected == 1
+
+
+def test_missing_header_gives_no_samples():
+    hw_data, n_rejected = parse_task_text(_line(ROWS[0]) + '\n', HEADER_REG, N_COLS)
+
+    assert hw_data.shape == (0, N_COLS)
+    assert n_rejected == 0
+
+
+def test_known_number_of_samples():
+    body = '\r\n'.join(_line(row) for row in ROWS) + '\r\n'
+
+    hw_data, n_rejected = parse_samples(body, N_COLS, n_samples=3)
+    assert hw_data.tolist() == ROWS
+    assert n_rejected == 0
+
+    hw_data, n_rejected = parse_samples(body, N_COLS, usecols=[1, 2], n_samples=3)
+    assert hw_data.tolist() == [row[1:3] for row in ROWS]
+    assert hw_data.flags['C_CONTIGUOUS']
+
+
+def test_known_number_of_samples_falls_back_on_malformed_lines():
+    body = '\n'.join([_line(ROWS[0]), '0 1.5 2 3 4 5', _line(ROWS[1]), '8 101 -199', _line(ROWS[2])]) + '\n'
+
+    assert count_samples(body, N_COLS) == (3, 2)
+
+    # a stale count, e.g. the file changed since it was counted, is matched line by line too
+    for n_samples in [3, 2, 4]:
+        hw_data, n_rejected = parse_samples(body, N_COLS, n_samples=n_samples)
+
+        assert hw_data.tolist() == ROWS
+        assert n_rejected == 2